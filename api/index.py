@@ -2,22 +2,49 @@
 AI Playlist Generator - Vercel Serverless Entry Point
 """
 
-from fastapi import FastAPI, HTTPException
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import HTMLResponse, FileResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
-import requests
-import base64
-import os
+from contextlib import asynccontextmanager
 import json
+import os
+import sys
 from datetime import datetime
 
+# Shared modules live in the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from spotify_auth import token_manager
+from spotify_api import get_spotify_token, search_cache
+from singleflight import SingleFlight
+from track import Track, share_playlist
+from fast_json import json_response, StaticJSON
+from history_store import history_store, history_scope
+from cache_warmer import WARM_HEADER
+from query_planner import fan_out_search, candidate_pool_size, MAX_POOL_SIZE
+from query_table import LANGUAGES, GENRES, ERAS
+from timing import StageTimings
+from metrics import MetricsMiddleware, cache_collector, metrics_response
+from tracing import DEBUG_TOKEN, TracingMiddleware, debug_router, traced
+from upstream_limiter import upstream_limiter
+import spotify_account
+import spotify_http
+import query_table
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await spotify_http.aclose()
+
+
 app = FastAPI(
     title="AI Playlist Generator",
     description="Generate Spotify playlists based on your mood",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -29,6 +56,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request IDs, spans and opt-in profiling (?debug=trace / ?debug=profile, needs DEBUG_TOKEN)
+app.add_middleware(TracingMiddleware)
+if DEBUG_TOKEN:
+    app.include_router(debug_router)
+
+# Request counts and latency per route, served at /metrics
+app.add_middleware(MetricsMiddleware)
+
 # ---------- MODELS ----------
 class MoodInput(BaseModel):
     mind_speed: str = "normal"
@@ -38,56 +73,22 @@ class MoodInput(BaseModel):
     language: str = "any"
     genre: str = "any"
     era: str = "any"
-    song_count: int = 5
+    song_count: int = Field(5, ge=1, le=MAX_POOL_SIZE)
 
 class NaturalLanguageInput(BaseModel):
     text: str
     language: str = "any"
     genre: str = "any"
     era: str = "any"
-    song_count: int = 5
+    song_count: int = Field(5, ge=1, le=MAX_POOL_SIZE)
 
 class PlaylistResponse(BaseModel):
     success: bool
     query: str
-    songs: List[dict]
+    songs: List[Track]
     generated_at: str
 
 # ---------- CONFIGURATION ----------
-LANGUAGES = {
-    "any": "",
-    "english": "",
-    "hindi": "bollywood hindi",
-    "punjabi": "punjabi bhangra",
-    "tamil": "tamil kollywood",
-    "telugu": "telugu tollywood",
-    "korean": "kpop",
-    "spanish": "reggaeton spanish",
-    "japanese": "jpop japanese"
-}
-
-GENRES = {
-    "any": "",
-    "pop": "pop",
-    "rock": "rock",
-    "hiphop": "hip hop rap",
-    "electronic": "electronic edm",
-    "classical": "classical",
-    "jazz": "jazz",
-    "rnb": "r&b soul",
-    "bollywood": "bollywood filmi",
-    "lofi": "lofi chill beats",
-    "metal": "metal"
-}
-
-ERAS = {
-    "any": "",
-    "90s": "90s 1990s",
-    "2000s": "2000s",
-    "2010s": "2010s",
-    "latest": "2023 2024 new"
-}
-
 # Activity presets
 ACTIVITY_PRESETS = {
     "studying": {"mind_speed": "racing", "lyrics": "no", "context": "alone", "distraction": "low"},
@@ -104,89 +105,8 @@ ACTIVITY_PRESETS = {
     "chill": {"mind_speed": "slow", "lyrics": "sometimes", "context": "alone", "distraction": "low"}
 }
 
-# ---------- HISTORY STORAGE ----------
-playlist_history = []
-
-# ---------- SPOTIFY FUNCTIONS ----------
-def get_spotify_token():
-    client_id = os.getenv("SPOTIFY_CLIENT_ID")
-    client_secret = os.getenv("SPOTIFY_CLIENT_SECRET")
-
-    if not client_id or not client_secret:
-        raise HTTPException(status_code=500, detail="Spotify credentials not configured")
-
-    auth_str = f"{client_id}:{client_secret}"
-    b64_auth = base64.b64encode(auth_str.encode()).decode()
-
-    url = "https://accounts.spotify.com/api/token"
-    headers = {
-        "Authorization": f"Basic {b64_auth}",
-        "Content-Type": "application/x-www-form-urlencoded"
-    }
-    data = {"grant_type": "client_credentials"}
-
-    try:
-        res = requests.post(url, headers=headers, data=data)
-        res.raise_for_status()
-        return res.json()["access_token"]
-    except requests.RequestException as e:
-        raise HTTPException(status_code=500, detail=f"Spotify auth failed: {str(e)}")
-
-
-def search_spotify(query: str, token: str, limit: int = 5) -> List[dict]:
-    headers = {"Authorization": f"Bearer {token}"}
-    params = {
-        "q": query,
-        "type": "track",
-        "limit": limit
-    }
-
-    url = "https://api.spotify.com/v1/search"
-    try:
-        res = requests.get(url, headers=headers, params=params)
-        res.raise_for_status()
-        tracks = res.json()["tracks"]["items"]
-        
-        return [{
-            "id": track["id"],
-            "name": track["name"],
-            "artist": track["artists"][0]["name"],
-            "album": track["album"]["name"],
-            "image": track["album"]["images"][0]["url"] if track["album"]["images"] else None,
-            "preview_url": track.get("preview_url"),
-            "spotify_url": track["external_urls"]["spotify"],
-            "duration_ms": track["duration_ms"]
-        } for track in tracks]
-    except requests.RequestException as e:
-        raise HTTPException(status_code=500, detail=f"Spotify search failed: {str(e)}")
-
-
-def build_search_query(mind_speed, lyrics, context, distraction):
-    keywords = []
-    
-    if mind_speed == "racing":
-        keywords.extend(["energetic", "upbeat", "fast"])
-    elif mind_speed == "slow":
-        keywords.extend(["calm", "relaxing", "slow"])
-    else:
-        keywords.extend(["moderate", "balanced"])
-    
-    if lyrics == "no":
-        keywords.append("instrumental")
-    elif lyrics == "yes":
-        keywords.append("vocal")
-    
-    if context == "with people":
-        keywords.append("party")
-    
-    if distraction == "low":
-        keywords.extend(["ambient", "focus"])
-    elif distraction == "high":
-        keywords.extend(["dance", "exciting"])
-    
-    return " ".join(keywords)
-
-
+# ---------- TEXT PARSING ----------
+@traced()
 def parse_natural_language(text):
     text_lower = text.lower()
     
@@ -228,6 +148,71 @@ def parse_natural_language(text):
     }
 
 
+# ---------- PLAYLIST PIPELINE ----------
+generate_flights = SingleFlight(clone=share_playlist)
+
+cache_collector("search", search_cache.stats, {"hits": "hit", "stale_hits": "stale", "misses": "miss"})
+cache_collector("token", token_manager.stats, {"hits": "hit", "misses": "miss"})
+cache_collector("coalescing", generate_flights.stats, {"coalesced": "hit", "executions": "miss"})
+
+
+def mood_key(mood: MoodInput) -> tuple:
+    return tuple(sorted(mood.dict().items()))
+
+
+async def build_playlist(mood: MoodInput):
+    """Run query building and search; returns (query, songs, timings)"""
+    timings = StageTimings()
+    
+    # Same query table as app.py, filled lazily to keep cold starts short
+    with timings.stage("plan"):
+        search_query, plan, market = query_table.lookup(
+            mood.mind_speed, mood.lyrics, mood.context, mood.distraction,
+            mood.language, mood.genre, mood.era
+        )
+    
+    with timings.stage("token"):
+        token = await get_spotify_token()
+    # Sub-queries and pages run concurrently, in the language's market
+    with timings.stage("search"):
+        songs = await fan_out_search(plan, token, pool_size=candidate_pool_size(mood.song_count), market=market)
+    
+    return search_query, songs[:mood.song_count], timings
+
+
+def sse_event(event: str, data) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=Track.as_dict)}\n\n"
+
+
+async def stream_playlist(mood: MoodInput, request: Request):
+    """
+    Same events as app.py's stream: the query, each song, then "done".
+    Songs are not re-ranked here, so they all follow the search.
+    """
+    try:
+        search_query, songs, _ = await generate_flights.do(mood_key(mood), lambda: build_playlist(mood))
+        yield sse_event("query", {"query": search_query})
+        for index, song in enumerate(songs):
+            yield sse_event("song", {"index": index, "song": song})
+        
+        generated_at = datetime.now().isoformat()
+        await history_store.aappend(history_scope(request), {
+            "mood": mood.dict(),
+            "query": search_query,
+            "songs": [s.name for s in songs],
+            "timestamp": generated_at
+        })
+        yield sse_event("done", {
+            "success": True,
+            "query": search_query,
+            "count": len(songs),
+            "generated_at": generated_at
+        })
+    except HTTPException as e:
+        yield sse_event("error", {"status_code": e.status_code, "error": e.detail})
+
+
 # ---------- API ROUTES ----------
 
 @app.get("/", response_class=HTMLResponse)
@@ -235,49 +220,55 @@ async def home():
     return FileResponse("templates/index.html")
 
 
-@app.post("/api/generate", response_model=PlaylistResponse)
-async def generate_playlist(mood: MoodInput):
-    search_query = build_search_query(
-        mood.mind_speed,
-        mood.lyrics,
-        mood.context,
-        mood.distraction
-    )
-    
-    if mood.language in LANGUAGES and LANGUAGES[mood.language]:
-        search_query = f"{search_query} {LANGUAGES[mood.language]}"
+async def generate_playlist(mood: MoodInput, request: Request, response: Response) -> tuple:
+    """Run the pipeline for a mood and record it; returns (PlaylistResponse content, timings)"""
+    search_query, songs, timings = await generate_flights.do(mood_key(mood), lambda: build_playlist(mood))
     
-    if mood.genre in GENRES and GENRES[mood.genre]:
-        search_query = f"{search_query} {GENRES[mood.genre]}"
+    playlist = {
+        "success": True,
+        "query": search_query,
+        "songs": songs,
+        "generated_at": datetime.now().isoformat()
+    }
     
-    if mood.era in ERAS and ERAS[mood.era]:
-        search_query = f"{search_query} {ERAS[mood.era]}"
+    # The cache warmer's requests are not history
+    if request.headers.get(WARM_HEADER) != "1":
+        await history_store.aappend(history_scope(request, response), {
+            "mood": mood.dict(),
+            "query": search_query,
+            "songs": [s.name for s in songs],
+            "timestamp": playlist["generated_at"]
+        })
     
-    token = get_spotify_token()
-    fetch_limit = min(mood.song_count * 2, 20)
-    songs = search_spotify(search_query, token, limit=fetch_limit)
+    return playlist, timings
+
+
+@app.post("/api/generate", response_model=PlaylistResponse)
+async def generate(mood: MoodInput, request: Request, response: Response):
+    playlist, timings = await generate_playlist(mood, request, response)
     
-    songs = songs[:mood.song_count]
+    # Songs are trusted Tracks: encode directly instead of validating a response model
+    with timings.stage("response"):
+        fast = json_response(playlist, response)
     
-    response = PlaylistResponse(
-        success=True,
-        query=search_query,
-        songs=songs,
-        generated_at=datetime.now().isoformat()
+    # Per-stage latency, visible in browser dev tools
+    fast.headers["Server-Timing"] = timings.server_timing()
+    return fast
+
+
+@app.post("/api/generate/stream")
+async def generate_playlist_stream(mood: MoodInput, request: Request):
+    response = StreamingResponse(
+        stream_playlist(mood, request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
-    
-    playlist_history.append({
-        "mood": mood.dict(),
-        "query": search_query,
-        "songs": [s["name"] for s in songs],
-        "timestamp": response.generated_at
-    })
-    
+    history_scope(request, response)
     return response
 
 
 @app.post("/api/generate-from-text")
-async def generate_from_natural_language(input: NaturalLanguageInput):
+async def generate_from_natural_language(input: NaturalLanguageInput, request: Request, response: Response):
     result = parse_natural_language(input.text)
     
     if not result["success"]:
@@ -290,220 +281,70 @@ async def generate_from_natural_language(input: NaturalLanguageInput):
     parsed["song_count"] = input.song_count
     
     mood = MoodInput(**parsed)
-    playlist = await generate_playlist(mood)
+    playlist, timings = await generate_playlist(mood, request, response)
+    playlist["parsed_input"] = result
     
-    return {
-        **playlist.dict(),
-        "parsed_input": result
-    }
-
-
-@app.get("/api/config")
-async def get_config():
-    return {
-        "languages": list(LANGUAGES.keys()),
-        "genres": list(GENRES.keys()),
-        "eras": list(ERAS.keys()),
-        "song_counts": [5, 10, 15]
-    }
+    fast = json_response(playlist, response)
+    fast.headers["Server-Timing"] = timings.server_timing()
+    return fast
 
 
-@app.get("/api/activities")
-async def get_activities():
-    return {
-        "activities": list(ACTIVITY_PRESETS.keys()),
-        "presets": ACTIVITY_PRESETS
-    }
-
+# Static for the life of the process: encoded once, revalidated by ETag
+CONFIG_PAYLOAD = StaticJSON({
+    "languages": list(LANGUAGES.keys()),
+    "genres": list(GENRES.keys()),
+    "eras": list(ERAS.keys()),
+    "song_counts": [5, 10, 15]
+})
+ACTIVITIES_PAYLOAD = StaticJSON({
+    "activities": list(ACTIVITY_PRESETS.keys()),
+    "presets": ACTIVITY_PRESETS
+})
 
-@app.get("/api/history")
-async def get_history():
-    return {"history": playlist_history[-10:]}
-
-
-@app.delete("/api/history")
-async def clear_history():
-    global playlist_history
-    playlist_history = []
-    return {"success": True, "message": "History cleared"}
 
+@app.get("/api/config")
+async def get_config(request: Request):
+    return CONFIG_PAYLOAD.respond(request)
 
-# ---------- SPOTIFY OAUTH (Cookie-based for Vercel) ----------
-from fastapi import Request, Response
-from fastapi.responses import RedirectResponse
-import urllib.parse
 
-REDIRECT_URI = os.getenv("SPOTIFY_REDIRECT_URI", "https://moodtunes-sigma.vercel.app/callback")
-SCOPES = "playlist-modify-public playlist-modify-private user-read-private"
+@app.get("/api/activities")
+async def get_activities(request: Request):
+    return ACTIVITIES_PAYLOAD.respond(request)
 
 
-@app.get("/login")
-async def spotify_login():
-    """Redirect to Spotify authorization"""
-    client_id = os.getenv("SPOTIFY_CLIENT_ID")
-    
-    auth_url = (
-        f"https://accounts.spotify.com/authorize?"
-        f"client_id={client_id}&"
-        f"response_type=code&"
-        f"redirect_uri={urllib.parse.quote(REDIRECT_URI)}&"
-        f"scope={urllib.parse.quote(SCOPES)}"
-    )
-    
-    return RedirectResponse(url=auth_url)
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus text exposition of request, stage, upstream and cache metrics"""
+    return metrics_response()
 
 
-@app.get("/callback")
-async def spotify_callback(code: str = None, error: str = None):
-    """Handle Spotify OAuth callback - store token in cookie"""
-    
-    if error:
-        return RedirectResponse(url="/?error=auth_failed")
-    
-    if not code:
-        return RedirectResponse(url="/?error=no_code")
-    
-    # Exchange code for tokens
-    client_id = os.getenv("SPOTIFY_CLIENT_ID")
-    client_secret = os.getenv("SPOTIFY_CLIENT_SECRET")
-    
-    auth_str = f"{client_id}:{client_secret}"
-    b64_auth = base64.b64encode(auth_str.encode()).decode()
-    
-    token_url = "https://accounts.spotify.com/api/token"
-    headers = {
-        "Authorization": f"Basic {b64_auth}",
-        "Content-Type": "application/x-www-form-urlencoded"
-    }
-    data = {
-        "grant_type": "authorization_code",
-        "code": code,
-        "redirect_uri": REDIRECT_URI
+@app.get("/api/stats")
+async def get_stats():
+    return {
+        "token": token_manager.stats(),
+        "search_cache": search_cache.stats(),
+        "coalescing": generate_flights.stats(),
+        "history": history_store.stats(),
+        "query_table": query_table.stats(),
+        "upstream": upstream_limiter.stats()
     }
-    
-    try:
-        res = requests.post(token_url, headers=headers, data=data)
-        res.raise_for_status()
-        tokens = res.json()
-        
-        # Get user profile
-        user_headers = {"Authorization": f"Bearer {tokens['access_token']}"}
-        user_res = requests.get("https://api.spotify.com/v1/me", headers=user_headers)
-        user_data = user_res.json()
-        
-        user_id = user_data.get("id", "default")
-        display_name = user_data.get("display_name", "User")
-        access_token = tokens["access_token"]
-        
-        # Create response with cookies
-        response = RedirectResponse(url=f"/?logged_in={user_id}&name={urllib.parse.quote(display_name)}")
-        
-        # Set HTTP-only cookies (secure in production)
-        response.set_cookie(
-            key="spotify_token",
-            value=access_token,
-            httponly=True,
-            secure=True,
-            samesite="lax",
-            max_age=3600  # 1 hour
-        )
-        response.set_cookie(
-            key="spotify_user",
-            value=user_id,
-            httponly=False,  # JS can read this
-            secure=True,
-            samesite="lax",
-            max_age=3600
-        )
-        response.set_cookie(
-            key="spotify_name",
-            value=display_name,
-            httponly=False,
-            secure=True,
-            samesite="lax",
-            max_age=3600
-        )
-        
-        return response
-        
-    except Exception as e:
-        return RedirectResponse(url=f"/?error={str(e)}")
 
 
-@app.get("/api/me")
-async def get_current_user(request: Request):
-    """Get logged in user info from cookie"""
-    user_id = request.cookies.get("spotify_user")
-    display_name = request.cookies.get("spotify_name")
-    token = request.cookies.get("spotify_token")
-    
-    if user_id and token:
-        return {
-            "logged_in": True,
-            "user_id": user_id,
-            "display_name": display_name or "User"
-        }
-    return {"logged_in": False}
-
-
-class SavePlaylistRequest(BaseModel):
-    playlist_name: str
-    track_ids: List[str]
+@app.get("/api/history")
+async def get_history(request: Request, limit: int = 10, before: Optional[int] = None):
+    page = await history_store.apage(history_scope(request), limit=max(1, min(limit, 100)), before=before)
+    return {
+        "history": page["items"],
+        "next_before": page["next_before"]
+    }
 
 
-@app.post("/api/save-playlist")
-async def save_playlist(req: SavePlaylistRequest, request: Request):
-    """Save playlist to user's Spotify account using cookie token"""
-    
-    access_token = request.cookies.get("spotify_token")
-    spotify_user_id = request.cookies.get("spotify_user")
-    
-    if not access_token or not spotify_user_id:
-        raise HTTPException(status_code=401, detail="Not logged in. Please login with Spotify first.")
-    
-    headers = {"Authorization": f"Bearer {access_token}", "Content-Type": "application/json"}
-    
-    try:
-        # Create playlist
-        create_url = f"https://api.spotify.com/v1/users/{spotify_user_id}/playlists"
-        create_data = {
-            "name": req.playlist_name,
-            "description": "Created by MoodTunes AI 🎵",
-            "public": True
-        }
-        
-        create_res = requests.post(create_url, headers=headers, json=create_data)
-        
-        if create_res.status_code == 401:
-            raise HTTPException(status_code=401, detail="Session expired. Please login again.")
-        
-        create_res.raise_for_status()
-        playlist = create_res.json()
-        
-        # Add tracks
-        add_url = f"https://api.spotify.com/v1/playlists/{playlist['id']}/tracks"
-        track_uris = [f"spotify:track:{tid}" for tid in req.track_ids]
-        
-        add_res = requests.post(add_url, headers=headers, json={"uris": track_uris})
-        add_res.raise_for_status()
-        
-        return {
-            "success": True,
-            "playlist_id": playlist["id"],
-            "playlist_url": playlist["external_urls"]["spotify"],
-            "message": f"Playlist '{req.playlist_name}' saved to Spotify!"
-        }
-        
-    except requests.RequestException as e:
-        raise HTTPException(status_code=500, detail=f"Failed to save playlist: {str(e)}")
-
+@app.delete("/api/history")
+async def clear_history(request: Request):
+    await history_store.aclear(history_scope(request))
+    return {"success": True, "message": "History cleared"}
 
-@app.get("/logout")
-async def logout():
-    """Logout user by clearing cookies"""
-    response = RedirectResponse(url="/")
-    response.delete_cookie("spotify_token")
-    response.delete_cookie("spotify_user")
-    response.delete_cookie("spotify_name")
-    return response
 
+# ---------- SPOTIFY ACCOUNT ----------
+# Login, OAuth callback, logout, /api/me and save-playlist (spotify_account.py)
+app.include_router(spotify_account.router)
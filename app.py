@@ -3,28 +3,69 @@ AI Playlist Generator - FastAPI Backend
 Serves the web interface and handles playlist generation requests
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi.responses import HTMLResponse, FileResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Optional, List
-import requests
-import base64
+from pydantic import BaseModel, Field
+from typing import Optional, List, Union
+from contextlib import asynccontextmanager
+import asyncio
 import os
 import json
 from datetime import datetime
 from dotenv import load_dotenv
 
-from playlist_brain import build_search_query
+# Load .env before the modules below read their settings
+load_dotenv()
+
 from llm_parser import parse_natural_language, get_activity_suggestions, ACTIVITY_PRESETS
+from spotify_auth import token_manager
+from spotify_api import get_spotify_token, search_cache, get_audio_features
+from feature_store import feature_store
+from singleflight import SingleFlight
+from track import Track, share_playlist
+from fast_json import json_response, StaticJSON
+from history_store import history_store, history_scope
+from query_planner import fan_out_search, candidate_pool_size, MAX_POOL_SIZE
+from query_table import QueryEntry, LANGUAGES, GENRES, ERAS
+from mood_scoring import rank_songs
+from timing import StageTimings
+from metrics import MetricsMiddleware, cache_collector, metrics_response
+from tracing import DEBUG_TOKEN, TracingMiddleware, debug_router
+from cache_warmer import cache_warmer, WARM_ENABLED, WARM_HEADER
+from upstream_limiter import upstream_limiter, lane as upstream_lane
+import spotify_http
+import query_table
+import fast_json
+
+
+# Optional local catalog (see track_catalog.py); None means always search Spotify
+CATALOG_PATH = os.getenv("CATALOG_PATH")
+mood_index = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global mood_index
+    await asyncio.to_thread(query_table.warm)
+    if CATALOG_PATH:
+        from track_catalog import load_index
+        mood_index = load_index(CATALOG_PATH)
+        await asyncio.to_thread(mood_index.warm)
+    # Keep popular presets' searches and audio features warm (opt-in)
+    if WARM_ENABLED:
+        cache_warmer.start()
+    yield
+    await cache_warmer.stop()
+    await spotify_http.aclose()
 
-load_dotenv()
 
 app = FastAPI(
     title="AI Playlist Generator",
     description="Generate Spotify playlists based on your mood",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -36,6 +77,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request IDs, spans and opt-in profiling (?debug=trace / ?debug=profile, needs DEBUG_TOKEN)
+app.add_middleware(TracingMiddleware)
+if DEBUG_TOKEN:
+    app.include_router(debug_router)
+
+# Request counts and latency per route, served at /metrics
+app.add_middleware(MetricsMiddleware)
+
 # Mount static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
@@ -48,145 +97,218 @@ class MoodInput(BaseModel):
     language: str = "any"      # NEW: Language filter
     genre: str = "any"         # NEW: Genre filter
     era: str = "any"           # NEW: Era/decade filter
-    song_count: int = 5        # NEW: Number of songs
+    song_count: int = Field(5, ge=1, le=MAX_POOL_SIZE)        # NEW: Number of songs
 
 class NaturalLanguageInput(BaseModel):
     text: str
     language: str = "any"
     genre: str = "any"
     era: str = "any"
-    song_count: int = 5
+    song_count: int = Field(5, ge=1, le=MAX_POOL_SIZE)
+
+class BatchGenerateRequest(BaseModel):
+    # Items with a "text" field are parsed as natural language
+    items: List[Union[NaturalLanguageInput, MoodInput]]
 
 class PlaylistResponse(BaseModel):
     success: bool
     query: str
-    songs: List[dict]
+    songs: List[Track]
     generated_at: str
 
 # ---------- CONFIGURATION ----------
-# Language keywords - these are placed FIRST in search for better results
-LANGUAGES = {
-    "any": "",
-    "english": "",  # Default, no keyword needed
-    "hindi": "bollywood hindi",
-    "punjabi": "punjabi bhangra",
-    "tamil": "tamil kollywood",
-    "telugu": "telugu tollywood",
-    "korean": "kpop",
-    "spanish": "reggaeton spanish",
-    "japanese": "jpop japanese"
-}
-
-# Market codes for Spotify API - helps filter by region
-MARKETS = {
-    "any": None,
-    "english": "US",
-    "hindi": "IN",
-    "punjabi": "IN",
-    "tamil": "IN",
-    "telugu": "IN",
-    "korean": "KR",
-    "spanish": "MX",
-    "japanese": "JP"
-}
-
-GENRES = {
-    "any": "",
-    "pop": "pop",
-    "rock": "rock",
-    "hiphop": "hip hop rap",
-    "electronic": "electronic edm",
-    "classical": "classical",
-    "jazz": "jazz",
-    "rnb": "r&b soul",
-    "bollywood": "bollywood filmi",
-    "lofi": "lofi chill beats",
-    "metal": "metal"
-}
-
-ERAS = {
-    "any": "",
-    "90s": "90s 1990s",
-    "2000s": "2000s",
-    "2010s": "2010s",
-    "latest": "2023 2024 new"
-}
-
-# ---------- HISTORY STORAGE ----------
-playlist_history = []
-
-# ---------- SPOTIFY FUNCTIONS ----------
-def get_spotify_token():
-    """Get Spotify access token using client credentials"""
-    client_id = os.getenv("SPOTIFY_CLIENT_ID")
-    client_secret = os.getenv("SPOTIFY_CLIENT_SECRET")
-
-    if not client_id or not client_secret:
-        raise HTTPException(status_code=500, detail="Spotify credentials not configured")
-
-    auth_str = f"{client_id}:{client_secret}"
-    b64_auth = base64.b64encode(auth_str.encode()).decode()
-
-    url = "https://accounts.spotify.com/api/token"
-    headers = {
-        "Authorization": f"Basic {b64_auth}",
-        "Content-Type": "application/x-www-form-urlencoded"
-    }
-    data = {"grant_type": "client_credentials"}
+# Batch generation limits
+MAX_BATCH_ITEMS = int(os.getenv("MAX_BATCH_ITEMS", "100"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
 
-    try:
-        res = requests.post(url, headers=headers, data=data)
-        res.raise_for_status()
-        return res.json()["access_token"]
-    except requests.RequestException as e:
-        raise HTTPException(status_code=500, detail=f"Spotify auth failed: {str(e)}")
-
-
-def search_spotify(query: str, token: str, limit: int = 5) -> List[dict]:
-    """Search Spotify for tracks matching the query"""
-    headers = {"Authorization": f"Bearer {token}"}
-    params = {
-        "q": query,
-        "type": "track",
-        "limit": limit
-    }
+# ---------- PLAYLIST PIPELINE ----------
+generate_flights = SingleFlight(clone=share_playlist)
+candidate_flights = SingleFlight(clone=share_playlist)
+
+cache_collector("search", search_cache.stats, {"hits": "hit", "stale_hits": "stale", "misses": "miss"})
+cache_collector("token", token_manager.stats, {"hits": "hit", "misses": "miss"})
+cache_collector("coalescing", generate_flights.stats, {"coalesced": "hit", "executions": "miss"})
+cache_collector("audio_features", feature_store.stats, {"hits": "hit", "misses": "miss"})
+
+
+def mood_key(mood: MoodInput) -> tuple:
+    """Hashable identity of a request, used to coalesce identical ones"""
+    return tuple(sorted(mood.dict().items()))
+
+
+def mood_queries(mood: MoodInput) -> QueryEntry:
+    """Search query and sub-query plan for a mood, from the precomputed table"""
+    return query_table.lookup(
+        mood.mind_speed, mood.lyrics, mood.context, mood.distraction,
+        mood.language, mood.genre, mood.era
+    )
+
+
+async def search_candidates(mood: MoodInput, token: str, timings: StageTimings = None):
+    """Search Spotify for a mood; returns (query, ranked candidate songs)"""
+    timings = timings or StageTimings()
+    
+    with timings.stage("plan"):
+        search_query, plan, market = mood_queries(mood)
+    
+    # Fetch extra for scoring; sub-queries and pages run concurrently, in the
+    # language's market so unplayable tracks never reach scoring
+    with timings.stage("search"):
+        songs = await fan_out_search(plan, token, pool_size=candidate_pool_size(mood.song_count), market=market)
+    return search_query, songs
+
+
+def score_songs(mood: MoodInput, songs: List[Track], features: List[dict]) -> List[Track]:
+    """Rank candidates by mood fit (audio features) and keep the best song_count"""
+    return rank_songs(
+        songs, features,
+        mood.mind_speed, mood.lyrics, mood.context, mood.distraction,
+        k=mood.song_count
+    )
 
-    url = "https://api.spotify.com/v1/search"
-    try:
-        res = requests.get(url, headers=headers, params=params)
-        res.raise_for_status()
-        tracks = res.json()["tracks"]["items"]
-        
-        # Format response
-        return [{
-            "id": track["id"],
-            "name": track["name"],
-            "artist": track["artists"][0]["name"],
-            "album": track["album"]["name"],
-            "image": track["album"]["images"][0]["url"] if track["album"]["images"] else None,
-            "preview_url": track.get("preview_url"),
-            "spotify_url": track["external_urls"]["spotify"],
-            "duration_ms": track["duration_ms"]
-        } for track in tracks]
-    except requests.RequestException as e:
-        raise HTTPException(status_code=500, detail=f"Spotify search failed: {str(e)}")
-
-
-def get_audio_features(track_ids: List[str], token: str) -> List[dict]:
-    """Get audio features for filtering"""
-    if not track_ids:
-        return []
-
-    url = "https://api.spotify.com/v1/audio-features"
-    headers = {"Authorization": f"Bearer {token}"}
-    params = {"ids": ",".join(track_ids[:5])}
 
+async def playlist_candidates(mood: MoodInput):
+    """
+    First half of build_playlist: (query, candidates, timings, token).
+    token is None when the local catalog answered; the songs are then final.
+    """
+    timings = StageTimings()
+    
+    # Answer from the local catalog when it covers this mood
+    if mood_index is not None and not LANGUAGES.get(mood.language) and not GENRES.get(mood.genre):
+        with timings.stage("catalog"):
+            songs = mood_index.match(
+                mood.mind_speed, mood.lyrics, mood.context, mood.distraction,
+                count=mood.song_count, era=mood.era
+            )
+        if songs is not None:
+            return mood_queries(mood).query, songs, timings, None
+    
+    with timings.stage("token"):
+        token = await get_spotify_token()
+    search_query, songs = await search_candidates(mood, token, timings)
+    return search_query, songs, timings, token
+
+
+async def build_playlist(mood: MoodInput):
+    """Run query building, search and filtering; returns (query, songs, timings)"""
+    # Coalesced on its own so a stream can show the candidates while they are scored
+    search_query, songs, timings, token = await candidate_flights.do(
+        mood_key(mood), lambda: playlist_candidates(mood)
+    )
+    if token is None:
+        return search_query, songs, timings
+    
+    # Score the whole pool against the mood and keep the best fits
+    with timings.stage("audio_features"):
+        features = await get_audio_features([s.id for s in songs], token)
+    
+    with timings.stage("score"):
+        songs = score_songs(mood, songs, features)
+    return search_query, songs, timings
+
+
+def sse_event(event: str, data) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=Track.as_dict)}\n\n"
+
+
+async def stream_playlist(mood: MoodInput, request: Request):
+    """
+    Yield the playlist as Server-Sent Events: the query and the first
+    song_count candidates in search order as soon as the search is done,
+    then (when they were scored) the mood-ranked songs as one "ranked"
+    event, then a final "done" event. Runs through the same coalesced,
+    catalog-aware pipeline as /api/generate.
+    """
+    key = mood_key(mood)
+    # Start the full pipeline first; the candidate search below joins its flight
+    final = asyncio.ensure_future(generate_flights.do(key, lambda: build_playlist(mood)))
     try:
-        res = requests.get(url, headers=headers, params=params)
-        res.raise_for_status()
-        return res.json()["audio_features"]
-    except:
-        return []
+        search_query, candidates, _, token = await candidate_flights.do(key, lambda: playlist_candidates(mood))
+        yield sse_event("query", {"query": search_query})
+        for index, song in enumerate(candidates[:mood.song_count]):
+            yield sse_event("song", {"index": index, "song": song})
+        
+        search_query, songs, _ = await final
+        if token is not None:
+            yield sse_event("ranked", {"songs": songs})
+        
+        generated_at = datetime.now().isoformat()
+        await history_store.aappend(history_scope(request), {
+            "mood": mood.dict(),
+            "query": search_query,
+            "songs": [s.name for s in songs],
+            "timestamp": generated_at
+        })
+        yield sse_event("done", {
+            "success": True,
+            "query": search_query,
+            "count": len(songs),
+            "generated_at": generated_at
+        })
+    except HTTPException as e:
+        yield sse_event("error", {"status_code": e.status_code, "error": e.detail})
+    finally:
+        # Client gone or search failed: leave the shared pipeline running, but observed
+        if not final.done():
+            final.cancel()
+        elif not final.cancelled():
+            final.exception()
+
+
+def mood_from_text(input: NaturalLanguageInput):
+    """Parse a natural language request into a MoodInput; returns (mood, parse result)"""
+    result = parse_natural_language(input.text)
+    
+    if not result["success"]:
+        raise HTTPException(status_code=400, detail="Could not understand input")
+    
+    # Parsed parameters + user overrides (copy: presets are shared dicts)
+    parsed = dict(result["parsed"])
+    parsed["language"] = input.language
+    parsed["genre"] = input.genre
+    parsed["era"] = input.era
+    parsed["song_count"] = input.song_count
+    
+    return MoodInput(**parsed), result
+
+
+async def build_batch(moods: List[MoodInput]) -> List[tuple]:
+    """
+    Build playlists for several distinct moods at once.
+    Searches run concurrently (bounded by BATCH_CONCURRENCY) and all
+    audio-feature lookups are merged into one call.
+    Returns (query, songs) or an Exception for each mood, in order.
+    """
+    token = await get_spotify_token()
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    
+    async def search(mood):
+        async with semaphore:
+            return await search_candidates(mood, token)
+    
+    searched = await asyncio.gather(*(search(mood) for mood in moods), return_exceptions=True)
+    
+    # One feature lookup for every candidate of every mood
+    track_ids = []
+    for result in searched:
+        if not isinstance(result, Exception):
+            track_ids.extend(s.id for s in result[1])
+    features = {}
+    if track_ids:
+        unique_ids = list(dict.fromkeys(track_ids))
+        features = dict(zip(unique_ids, await get_audio_features(unique_ids, token)))
+    
+    results = []
+    for mood, result in zip(moods, searched):
+        if isinstance(result, Exception):
+            results.append(result)
+            continue
+        search_query, songs = result
+        song_features = [features.get(s.id) for s in songs]
+        results.append((search_query, score_songs(mood, songs, song_features)))
+    return results
 
 
 # ---------- API ROUTES ----------
@@ -197,129 +319,196 @@ async def home():
     return FileResponse("templates/index.html")
 
 
-@app.post("/api/generate", response_model=PlaylistResponse)
-async def generate_playlist(mood: MoodInput):
-    """Generate playlist based on mood parameters"""
-    
-    # Build base search query
-    search_query = build_search_query(
-        mood.mind_speed,
-        mood.lyrics,
-        mood.context,
-        mood.distraction
-    )
+async def generate_playlist(mood: MoodInput, request: Request, response: Response) -> tuple:
+    """Run the pipeline for a mood and record it; returns (PlaylistResponse content, timings)"""
     
-    # Add language filter
-    if mood.language in LANGUAGES and LANGUAGES[mood.language]:
-        search_query = f"{search_query} {LANGUAGES[mood.language]}"
+    # The warmer's own requests are neither demand nor history
+    warming = request.headers.get(WARM_HEADER) == "1"
+    if not warming:
+        cache_warmer.record(mood.dict())
     
-    # Add genre filter
-    if mood.genre in GENRES and GENRES[mood.genre]:
-        search_query = f"{search_query} {GENRES[mood.genre]}"
+    # Identical concurrent requests share one run of the pipeline
+    search_query, songs, timings = await generate_flights.do(mood_key(mood), lambda: build_playlist(mood))
     
-    # Add era filter
-    if mood.era in ERAS and ERAS[mood.era]:
-        search_query = f"{search_query} {ERAS[mood.era]}"
-    
-    # Get Spotify token and search (fetch more than needed for filtering)
-    token = get_spotify_token()
-    fetch_limit = min(mood.song_count * 2, 20)  # Fetch extra for filtering
-    songs = search_spotify(search_query, token, limit=fetch_limit)
+    playlist = {
+        "success": True,
+        "query": search_query,
+        "songs": songs,
+        "generated_at": datetime.now().isoformat()
+    }
     
-    # Filter for instrumental if requested
-    if mood.lyrics == "no" and songs:
-        track_ids = [s["id"] for s in songs]
-        features = get_audio_features(track_ids, token)
-        
-        if features:
-            filtered = []
-            for song, feat in zip(songs, features):
-                if feat and feat.get("instrumentalness", 0) > 0.5:
-                    filtered.append(song)
-            if filtered:
-                songs = filtered
+    # Add to history
+    if not warming:
+        await history_store.aappend(history_scope(request, response), {
+            "mood": mood.dict(),
+            "query": search_query,
+            "songs": [s.name for s in songs],
+            "timestamp": playlist["generated_at"]
+        })
+    return playlist, timings
+
+
+@app.post("/api/generate", response_model=PlaylistResponse)
+async def generate(mood: MoodInput, request: Request, response: Response):
+    """Generate playlist based on mood parameters"""
+    playlist, timings = await generate_playlist(mood, request, response)
     
-    # Take requested number of songs
-    songs = songs[:mood.song_count]
+    # Encoded directly: songs are trusted Tracks, no response model pass needed
+    with timings.stage("response"):
+        fast = json_response(playlist, response)
     
-    # Create response
-    response = PlaylistResponse(
-        success=True,
-        query=search_query,
-        songs=songs,
-        generated_at=datetime.now().isoformat()
+    # Per-stage latency, visible in browser dev tools
+    fast.headers["Server-Timing"] = timings.server_timing()
+    return fast
+
+
+@app.post("/api/generate/stream")
+async def generate_playlist_stream(mood: MoodInput, request: Request):
+    """Generate playlist based on mood parameters, streamed as Server-Sent Events"""
+    cache_warmer.record(mood.dict())
+    response = StreamingResponse(
+        stream_playlist(mood, request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
-    
-    # Add to history
-    playlist_history.append({
-        "mood": mood.dict(),
-        "query": search_query,
-        "songs": [s["name"] for s in songs],
-        "timestamp": response.generated_at
-    })
-    
+    history_scope(request, response)
     return response
 
 
 @app.post("/api/generate-from-text")
-async def generate_from_natural_language(input: NaturalLanguageInput):
+async def generate_from_natural_language(input: NaturalLanguageInput, request: Request, response: Response):
     """Generate playlist from natural language description"""
     
     # Parse natural language
-    result = parse_natural_language(input.text)
+    mood, result = mood_from_text(input)
+    playlist, timings = await generate_playlist(mood, request, response)
+    playlist["parsed_input"] = result
     
-    if not result["success"]:
-        raise HTTPException(status_code=400, detail="Could not understand input")
+    fast = json_response(playlist, response)
+    fast.headers["Server-Timing"] = timings.server_timing()
+    return fast
+
+
+@app.post("/api/generate/batch")
+async def generate_batch(batch: BatchGenerateRequest):
+    """Generate playlists for many moods / text descriptions in one call"""
     
-    # Generate playlist with parsed parameters + user overrides
-    parsed = result["parsed"]
-    parsed["language"] = input.language
-    parsed["genre"] = input.genre
-    parsed["era"] = input.era
-    parsed["song_count"] = input.song_count
+    if len(batch.items) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_ITEMS} items per batch")
     
-    mood = MoodInput(**parsed)
-    playlist = await generate_playlist(mood)
+    # Resolve every item to a MoodInput, remembering per-item parse errors
+    moods = []
+    parsed_inputs = []
+    errors = {}
+    for index, item in enumerate(batch.items):
+        parsed_input = None
+        try:
+            if isinstance(item, NaturalLanguageInput):
+                item, parsed_input = mood_from_text(item)
+        except HTTPException as e:
+            errors[index] = e
+        moods.append(item)
+        parsed_inputs.append(parsed_input)
     
-    return {
-        **playlist.dict(),
-        "parsed_input": result
-    }
+    # Dedupe identical queries
+    unique = {}
+    for index, mood in enumerate(moods):
+        if index not in errors:
+            unique.setdefault(mood_key(mood), mood)
+    # Batch work queues behind interactive requests for Spotify slots
+    with upstream_lane("batch"):
+        built = dict(zip(unique, await build_batch(list(unique.values()))))
+    
+    generated_at = datetime.now().isoformat()
+    results = []
+    for index, mood in enumerate(moods):
+        outcome = errors.get(index) or built[mood_key(mood)]
+        if isinstance(outcome, Exception):
+            status = outcome.status_code if isinstance(outcome, HTTPException) else 500
+            detail = outcome.detail if isinstance(outcome, HTTPException) else str(outcome)
+            results.append({"success": False, "status_code": status, "error": detail})
+            continue
+        
+        search_query, songs = outcome
+        item_result = {
+            "success": True,
+            "query": search_query,
+            "songs": songs,
+            "generated_at": generated_at
+        }
+        if parsed_inputs[index] is not None:
+            item_result["parsed_input"] = parsed_inputs[index]
+        results.append(item_result)
+    
+    return json_response({
+        "success": True,
+        "unique_queries": len(unique),
+        "results": results
+    })
+
+
+# Static for the life of the process: encoded once, revalidated by ETag
+CONFIG_PAYLOAD = StaticJSON({
+    "languages": list(LANGUAGES.keys()),
+    "genres": list(GENRES.keys()),
+    "eras": list(ERAS.keys()),
+    "song_counts": [5, 10, 15]
+})
+ACTIVITIES_PAYLOAD = StaticJSON({
+    "activities": get_activity_suggestions(),
+    "presets": ACTIVITY_PRESETS
+})
 
 
 @app.get("/api/config")
-async def get_config():
+async def get_config(request: Request):
     """Get available filter options"""
-    return {
-        "languages": list(LANGUAGES.keys()),
-        "genres": list(GENRES.keys()),
-        "eras": list(ERAS.keys()),
-        "song_counts": [5, 10, 15]
-    }
+    return CONFIG_PAYLOAD.respond(request)
 
 
 @app.get("/api/activities")
-async def get_activities():
+async def get_activities(request: Request):
     """Get list of activity presets"""
+    return ACTIVITIES_PAYLOAD.respond(request)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus text exposition of request, stage, upstream and cache metrics"""
+    return metrics_response()
+
+
+@app.get("/api/stats")
+async def get_stats():
+    """Get cache and token counters"""
     return {
-        "activities": get_activity_suggestions(),
-        "presets": ACTIVITY_PRESETS
+        "token": token_manager.stats(),
+        "search_cache": search_cache.stats(),
+        "audio_features": feature_store.stats(),
+        "coalescing": generate_flights.stats(),
+        "history": history_store.stats(),
+        "query_table": query_table.stats(),
+        "warmer": cache_warmer.stats(),
+        "upstream": upstream_limiter.stats(),
+        "json": fast_json.stats(),
+        "catalog": mood_index.stats() if mood_index else None
     }
 
 
 @app.get("/api/history")
-async def get_history():
-    """Get playlist generation history"""
+async def get_history(request: Request, limit: int = 10, before: Optional[int] = None):
+    """Get playlist generation history (newest page first, entries oldest first)"""
+    page = await history_store.apage(history_scope(request), limit=max(1, min(limit, 100)), before=before)
     return {
-        "history": playlist_history[-10:]  # Last 10
+        "history": page["items"],
+        "next_before": page["next_before"]
     }
 
 
 @app.delete("/api/history")
-async def clear_history():
+async def clear_history(request: Request):
     """Clear playlist history"""
-    global playlist_history
-    playlist_history = []
+    await history_store.aclear(history_scope(request))
     return {"success": True, "message": "History cleared"}
 
 
@@ -0,0 +1,108 @@
+"""
+Baseline generate route, frozen for benchmarks
+/api/generate as app.py served it before the async client: blocking
+`requests` calls (a token fetch, one search, and audio features for
+lyrics "no") made inside the async route. Only the Spotify base URLs are
+read from SPOTIFY_API_URL / SPOTIFY_ACCOUNTS_URL, so it can run against
+benchmarks/fake_spotify.py. Used by load_test.py as the "before" case.
+"""
+
+import base64
+import os
+import sys
+from datetime import datetime
+from typing import List
+
+import requests
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from playlist_brain import build_search_query  # noqa: E402
+
+API_URL = os.getenv("SPOTIFY_API_URL", "https://api.spotify.com").rstrip("/")
+ACCOUNTS_URL = os.getenv("SPOTIFY_ACCOUNTS_URL", "https://accounts.spotify.com").rstrip("/")
+
+app = FastAPI(title="Baseline generate route")
+
+
+class MoodInput(BaseModel):
+    mind_speed: str = "normal"
+    lyrics: str = "sometimes"
+    context: str = "alone"
+    distraction: str = "medium"
+    song_count: int = 5
+
+
+class PlaylistResponse(BaseModel):
+    success: bool
+    query: str
+    songs: List[dict]
+    generated_at: str
+
+
+def get_spotify_token():
+    auth_str = f"{os.getenv('SPOTIFY_CLIENT_ID')}:{os.getenv('SPOTIFY_CLIENT_SECRET')}"
+    headers = {
+        "Authorization": f"Basic {base64.b64encode(auth_str.encode()).decode()}",
+        "Content-Type": "application/x-www-form-urlencoded"
+    }
+    try:
+        res = requests.post(f"{ACCOUNTS_URL}/api/token", headers=headers, data={"grant_type": "client_credentials"})
+        res.raise_for_status()
+        return res.json()["access_token"]
+    except requests.RequestException as e:
+        raise HTTPException(status_code=500, detail=f"Spotify auth failed: {str(e)}")
+
+
+def search_spotify(query: str, token: str, limit: int = 5) -> List[dict]:
+    headers = {"Authorization": f"Bearer {token}"}
+    try:
+        res = requests.get(f"{API_URL}/v1/search", headers=headers, params={"q": query, "type": "track", "limit": limit})
+        res.raise_for_status()
+        return [{
+            "id": track["id"],
+            "name": track["name"],
+            "artist": track["artists"][0]["name"],
+            "album": track["album"]["name"],
+            "image": track["album"]["images"][0]["url"] if track["album"]["images"] else None,
+            "preview_url": track.get("preview_url"),
+            "spotify_url": track["external_urls"]["spotify"],
+            "duration_ms": track["duration_ms"]
+        } for track in res.json()["tracks"]["items"]]
+    except requests.RequestException as e:
+        raise HTTPException(status_code=500, detail=f"Spotify search failed: {str(e)}")
+
+
+def get_audio_features(track_ids: List[str], token: str) -> List[dict]:
+    if not track_ids:
+        return []
+    headers = {"Authorization": f"Bearer {token}"}
+    try:
+        res = requests.get(f"{API_URL}/v1/audio-features", headers=headers, params={"ids": ",".join(track_ids[:5])})
+        res.raise_for_status()
+        return res.json()["audio_features"]
+    except requests.RequestException:
+        return []
+
+
+@app.post("/api/generate", response_model=PlaylistResponse)
+async def generate_playlist(mood: MoodInput):
+    search_query = build_search_query(mood.mind_speed, mood.lyrics, mood.context, mood.distraction)
+
+    token = get_spotify_token()
+    songs = search_spotify(search_query, token, limit=min(mood.song_count * 2, 20))
+
+    if mood.lyrics == "no" and songs:
+        features = get_audio_features([s["id"] for s in songs], token)
+        filtered = [song for song, feat in zip(songs, features) if feat and feat.get("instrumentalness", 0) > 0.5]
+        if filtered:
+            songs = filtered
+
+    return PlaylistResponse(
+        success=True,
+        query=search_query,
+        songs=songs[:mood.song_count],
+        generated_at=datetime.now().isoformat()
+    )
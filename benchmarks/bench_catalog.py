@@ -0,0 +1,82 @@
+"""
+Benchmark - local track catalog and mood index
+Builds a synthetic catalog and measures ingest, load, index build and
+lookup latency.
+
+    python benchmarks/bench_catalog.py --tracks 1000000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mood_scoring import mood_profile  # noqa: E402
+from track import Track  # noqa: E402
+from track_catalog import CatalogWriter, MoodIndex, TrackCatalog  # noqa: E402
+
+
+def build_synthetic(path: str, count: int, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    energy = rng.beta(2, 2, count)
+    valence = rng.beta(2, 2, count)
+    tempo = rng.normal(120, 25, count)
+    instrumental = np.where(rng.random(count) < 0.25, rng.beta(5, 1.5, count), rng.beta(1, 8, count))
+    speech = rng.beta(1.2, 12, count)
+    years = rng.integers(1980, 2025, count)
+
+    writer = CatalogWriter(path)
+    for i in range(count):
+        track_id = f"{i:022d}"
+        song = Track(track_id, f"Song {i}", f"Artist {i % 50000}", f"Album {i % 200000}",
+                     None, None, f"https://open.spotify.com/track/{track_id}", 180000)
+        features = {
+            "energy": energy[i], "valence": valence[i], "tempo": tempo[i],
+            "instrumentalness": instrumental[i], "speechiness": speech[i]
+        }
+        writer.add(song, features, int(years[i]))
+    writer.close()
+
+
+def timed(fn, repeat: int = 1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tracks", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as path:
+        elapsed, _ = timed(lambda: build_synthetic(path, args.tracks))
+        print(f"ingest {args.tracks:,} tracks        {elapsed:8.2f} s")
+
+        elapsed, catalog = timed(lambda: TrackCatalog.load(path))
+        print(f"load (mmap)                 {elapsed * 1000:8.2f} ms")
+        print(f"feature matrix              {catalog.features.nbytes / 2**20:8.1f} MiB")
+
+        target, weights = mood_profile("racing", "no", "alone", "low")
+        elapsed, _ = timed(lambda: catalog.nearest(target, weights, 2000), repeat=5)
+        print(f"brute-force nearest (k=2000) {elapsed * 1000:7.2f} ms")
+
+        index = MoodIndex(catalog)
+        elapsed, _ = timed(index.warm)
+        print(f"index warm (54 moods)       {elapsed:8.2f} s")
+
+        elapsed, songs = timed(lambda: index.match("racing", "no", "alone", "low", 10), repeat=2000)
+        print(f"lookup, 10 songs            {elapsed * 1e6:8.1f} us   ({len(songs or [])} returned)")
+        elapsed, songs = timed(lambda: index.match("slow", "yes", "with people", "low", 10, era="90s"), repeat=2000)
+        print(f"lookup + era filter         {elapsed * 1e6:8.1f} us   ({len(songs or [])} returned)")
+        print(index.stats())
+
+
+if __name__ == "__main__":
+    main()
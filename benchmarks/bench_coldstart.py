@@ -0,0 +1,205 @@
+"""
+Benchmark - serverless cold start
+What a fresh process pays before its first response: an import-time
+profile of the entry point (python -X importtime, grouped by top-level
+package) and cold-start-to-first-byte for POST /api/generate, measured in
+new interpreter processes against the fake Spotify server.
+
+Two scenarios: "fresh tmp" gives every process its own empty snapshot
+directory, as Vercel gives each cold instance its own /tmp, so it must
+fetch a token; "shared snapshot" reuses one token snapshot file, which
+only happens for restarts on the same host. The budget applies to
+"fresh tmp", the case serverless cold starts actually hit.
+
+    python benchmarks/bench_coldstart.py --app index --runs 10 --budget-ms 1000
+    python benchmarks/bench_coldstart.py --latency 0.05 --json coldstart.json
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter: import the entry point, answer one request
+CHILD = """
+import asyncio, json, sys, time
+started = time.time()
+sys.path.insert(0, {path!r})
+import {module} as entry
+imported = time.time()
+import httpx
+
+async def first_request():
+    transport = httpx.ASGITransport(app=entry.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://coldstart") as client:
+        res = await client.post("/api/generate", json={{"song_count": 10}})
+        return res.status_code
+
+status = asyncio.run(first_request())
+print(json.dumps({{"started": started, "imported": imported, "answered": time.time(), "status": status}}))
+"""
+
+
+def entry_point(app: str):
+    """(sys.path entry, module name) for an app"""
+    return (os.path.join(ROOT, "api"), "index") if app == "index" else (ROOT, "app")
+
+
+def child_env(fake_url: str, snapshot: str) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "SPOTIFY_API_URL": fake_url,
+        "SPOTIFY_ACCOUNTS_URL": fake_url,
+        "SPOTIFY_CLIENT_ID": "coldstart",
+        "SPOTIFY_CLIENT_SECRET": "coldstart",
+        "SPOTIFY_TOKEN_SNAPSHOT": snapshot,
+        "FEATURE_STORE_PATH": os.path.join(tempfile.mkdtemp(prefix="coldstart-"), "features.db"),
+        "WARM_ENABLED": "0",
+        "PYTHONDONTWRITEBYTECODE": "1"
+    })
+    return env
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_fake(latency: float):
+    """Run benchmarks/fake_spotify.py in its own process; returns (process, base URL)"""
+    port = free_port()
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "benchmarks", "fake_spotify.py"), "--port", str(port), "--latency", str(latency)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        try:
+            httpx.get(f"{url}/stats", timeout=0.5)
+            return proc, url
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("fake Spotify did not start")
+
+
+# ---------- IMPORT PROFILE ----------
+def import_profile(app: str, env: dict, runs: int) -> dict:
+    """Median self import time (ms) per top-level package across runs"""
+    path, module = entry_point(app)
+    per_run = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import sys; sys.path.insert(0, {path!r}); import {module}"],
+            cwd=ROOT, env=env, capture_output=True, text=True, check=True
+        ).stderr
+        packages = defaultdict(float)
+        for line in out.splitlines():
+            if not line.startswith("import time:") or "self [us]" in line:
+                continue
+            self_us, _, name = line[len("import time:"):].split("|")
+            packages[name.strip().split(".")[0]] += int(self_us) / 1000
+        per_run.append(packages)
+    names = set().union(*per_run)
+    return {name: statistics.median(run.get(name, 0.0) for run in per_run) for name in names}
+
+
+# ---------- COLD START ----------
+def cold_start(app: str, env: dict) -> dict:
+    """Timings (ms) of one fresh process, from spawn to its first response"""
+    path, module = entry_point(app)
+    spawned = time.time()
+    out = subprocess.run([sys.executable, "-c", CHILD.format(path=path, module=module)],
+                         cwd=ROOT, env=env, capture_output=True, text=True)
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr.strip().splitlines()[-1])
+    child = json.loads(out.stdout.strip().splitlines()[-1])
+    return {
+        "interpreter_ms": (child["started"] - spawned) * 1000,
+        "import_ms": (child["imported"] - child["started"]) * 1000,
+        "first_request_ms": (child["answered"] - child["imported"]) * 1000,
+        "first_byte_ms": (child["answered"] - spawned) * 1000,
+        "status": child["status"]
+    }
+
+
+def summarize(samples: list) -> dict:
+    summary = {
+        key: round(statistics.median(s[key] for s in samples), 1)
+        for key in ("interpreter_ms", "import_ms", "first_request_ms", "first_byte_ms")
+    }
+    summary["max_first_byte_ms"] = round(max(s["first_byte_ms"] for s in samples), 1)
+    summary["ok"] = sum(s["status"] == 200 for s in samples)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--app", choices=("app", "index"), default="index")
+    parser.add_argument("--runs", type=int, default=10, help="fresh processes per scenario")
+    parser.add_argument("--profile-runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15, help="packages listed in the import profile")
+    parser.add_argument("--latency", type=float, default=0.05, help="fake Spotify latency per call (s)")
+    parser.add_argument("--budget-ms", type=float, default=1000, help="allowed median first byte with a fresh tmp")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args(argv)
+
+    fake, fake_url = start_fake(args.latency)
+    shared_snapshot = os.path.join(tempfile.mkdtemp(prefix="coldstart-"), "token.json")
+    try:
+        profile = import_profile(args.app, child_env(fake_url, ""), args.profile_runs)
+
+        scenarios = {
+            # A new empty directory per process, like a new serverless instance
+            "fresh tmp": lambda: child_env(fake_url, os.path.join(tempfile.mkdtemp(prefix="coldstart-"), "token.json")),
+            "shared snapshot": lambda: child_env(fake_url, shared_snapshot)
+        }
+        cold_start(args.app, scenarios["shared snapshot"]())  # writes the shared snapshot
+        samples = defaultdict(list)
+        for _ in range(args.runs):
+            for name, env in scenarios.items():
+                samples[name].append(cold_start(args.app, env()))
+        results = {name: summarize(runs) for name, runs in samples.items()}
+    finally:
+        fake.kill()
+        fake.wait()
+
+    print(f"import profile, {args.app} (median self time of {args.profile_runs} runs, "
+          f"{sum(profile.values()):.0f} ms total)")
+    for name, ms in sorted(profile.items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"  {name:24} {ms:7.1f} ms")
+
+    print(f"\ncold start to first byte, POST /api/generate, {args.runs} processes each, "
+          f"fake latency {args.latency * 1000:.0f} ms")
+    for name, r in results.items():
+        print(f"  {name:16} {r['first_byte_ms']:7.1f} ms   (interpreter {r['interpreter_ms']:.0f}, "
+              f"import {r['import_ms']:.0f}, first request {r['first_request_ms']:.0f}; "
+              f"max {r['max_first_byte_ms']:.0f})   ok {r['ok']}/{args.runs}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"config": {k: v for k, v in vars(args).items() if k != "json"},
+                       "import_profile_ms": profile, "results": results}, f, indent=2)
+
+    # Same-host snapshot reuse does not happen on serverless cold starts
+    fresh = results["fresh tmp"]["first_byte_ms"]
+    if fresh > args.budget_ms:
+        print(f"OVER BUDGET fresh tmp: {fresh:.1f} ms > {args.budget_ms:.0f} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""
+Benchmark - keyword matching in llm_parser
+Compares the old per-keyword substring scan with the compiled
+Aho-Corasick matcher for growing vocabularies and input lengths.
+
+    python benchmarks/bench_keyword_matcher.py
+"""
+
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from keyword_matcher import CategoryMatcher  # noqa: E402
+
+CATEGORIES = ["racing", "slow", "normal", "focus", "party", "calm"]
+
+
+def make_vocabulary(size: int, rng: random.Random) -> dict:
+    words = set()
+    while len(words) < size:
+        length = rng.randint(4, 10)
+        words.add("".join(rng.choice(string.ascii_lowercase) for _ in range(length)))
+    words = sorted(words)
+    keyword_map = {category: [] for category in CATEGORIES}
+    for i, word in enumerate(words):
+        keyword_map[CATEGORIES[i % len(CATEGORIES)]].append(word)
+    return keyword_map
+
+
+def make_text(keyword_map: dict, length: int, rng: random.Random) -> str:
+    vocabulary = [kw for keywords in keyword_map.values() for kw in keywords]
+    filler = ["i", "feel", "like", "music", "for", "the", "today", "some", "with", "and"]
+    words = []
+    while sum(len(w) + 1 for w in words) < length:
+        words.append(rng.choice(vocabulary) if rng.random() < 0.1 else rng.choice(filler))
+    return " ".join(words)
+
+
+def naive_counts(text: str, groups: dict) -> dict:
+    """The previous approach: `kw in text` for every keyword of every map"""
+    text_lower = text.lower()
+    return {
+        group: {category: sum(1 for kw in keywords if kw in text_lower)
+                for category, keywords in keyword_map.items()}
+        for group, keyword_map in groups.items()
+    }
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    rng = random.Random(42)
+    print(f"{'vocab':>7} {'text':>7} {'naive':>11} {'compiled':>11} {'speedup':>8}")
+    for vocab_size in (100, 1_000, 10_000, 50_000):
+        # Four keyword maps, like llm_parser
+        groups = {f"group{g}": make_vocabulary(vocab_size // 4, rng) for g in range(4)}
+        start = time.perf_counter()
+        matcher = CategoryMatcher(groups)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        for text_length in (100, 1_000, 10_000):
+            text = make_text(groups["group0"], text_length, rng)
+            repeat = max(1, 2_000_000 // (vocab_size * text_length // 100 + 1))
+            repeat = min(repeat, 2_000)
+
+            naive = timed(lambda: naive_counts(text, groups), repeat)
+            compiled = timed(lambda: matcher.count(text.lower()), repeat)
+            print(f"{vocab_size:>7} {text_length:>7} {naive * 1e6:>9.1f}us {compiled * 1e6:>9.1f}us "
+                  f"{naive / compiled:>7.1f}x")
+        print(f"{'':>7} (automaton build: {build_ms:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Benchmark - playlist response serialization
+Per-request cost of turning a finished playlist into response bytes:
+the previous response-model path (validate + serialize + JSONResponse),
+the previous generate-from-text path (.dict() + jsonable_encoder), and
+the fast_json path (one encode of the whole payload), with freshly built
+Tracks (new search results) and with Tracks reused from the cache.
+
+    python benchmarks/bench_response.py --songs 100
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import List
+
+from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from pydantic import BaseModel
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_tracks import spotify_item  # noqa: E402
+from fast_json import FastJSONResponse, dumps  # noqa: E402
+from track import Track  # noqa: E402
+
+PARSED_INPUT = {
+    "success": True,
+    "parsed": {"mind_speed": "racing", "lyrics": "no", "context": "alone", "distraction": "low"},
+    "detected_activity": "coding"
+}
+
+
+class PlaylistResponse(BaseModel):
+    """The response model as it was, with songs as dicts"""
+    success: bool
+    query: str
+    songs: List[dict]
+    generated_at: str
+
+
+def old_route_field():
+    """The response field FastAPI builds for response_model=PlaylistResponse"""
+    app = FastAPI()
+
+    @app.post("/api/generate", response_model=PlaylistResponse)
+    async def generate():
+        pass
+
+    return next(route for route in app.routes if getattr(route, "path", None) == "/api/generate").response_field
+
+
+def playlist(songs) -> dict:
+    return {"success": True, "query": "calm instrumental focus", "songs": songs,
+            "generated_at": "2024-01-01T00:00:00.000000"}
+
+
+async def measure(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for i in range(repeat):
+        result = fn(i)
+        if asyncio.iscoroutine(result):
+            await result
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+async def run(songs: int, repeat: int):
+    field = old_route_field()
+    items = [spotify_item(i) for i in range(songs)]
+    dicts = [Track.from_spotify(item).as_dict() for item in items]
+    cached = [Track.from_spotify(item) for item in items]
+    # A new set of Tracks per request, as for new search results
+    fresh = [[Track.from_spotify(item) for item in items] for _ in range(repeat)]
+
+    async def old_generate(_):
+        content = await serialize_response(field=field, response_content=PlaylistResponse(**playlist(dicts)))
+        return JSONResponse(content).body
+
+    def old_from_text(_):
+        model = PlaylistResponse(**playlist(dicts))
+        return JSONResponse(jsonable_encoder({**model.dict(), "parsed_input": PARSED_INPUT})).body
+
+    def fast_fresh(i):
+        return FastJSONResponse(playlist(fresh[i])).body
+
+    def fast_cached(_):
+        return FastJSONResponse(playlist(cached)).body
+
+    def fast_from_text(_):
+        return FastJSONResponse({**playlist(cached), "parsed_input": PARSED_INPUT}).body
+
+    assert await old_generate(0) == fast_cached(0) == fast_fresh(0)
+    assert old_from_text(0) == dumps({**playlist(cached), "parsed_input": PARSED_INPUT})
+
+    cases = [
+        ("generate, response model (before)", old_generate),
+        ("generate-from-text, .dict() + encoder (before)", old_from_text),
+        ("generate, fast_json, new tracks", fast_fresh),
+        ("generate, fast_json, cached tracks", fast_cached),
+        ("generate-from-text, fast_json, cached tracks", fast_from_text)
+    ]
+    baseline = None
+    print(f"{songs} songs per playlist, {len(fast_cached(0))} byte body")
+    for label, fn in cases:
+        elapsed = await measure(fn, repeat)
+        baseline = baseline or elapsed
+        print(f"{label:48} {elapsed:8.1f} us/request   {baseline / elapsed:5.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--songs", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(run(args.songs, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Benchmark - mood scoring engine
+Compares the engine with the baseline it replaced: an instrumentalness
+> 0.5 filter that only ran when lyrics were "no" (every other mood was a
+plain slice of the search results, with no audio-features call), and
+with the same weighted score computed per song in Python. --latency also
+times the audio-features stage the engine adds to every generate request,
+in app.py against the fake Spotify server.
+
+    python benchmarks/bench_scoring.py --pool 30 200 10000
+    python benchmarks/bench_scoring.py --latency 0.05
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from mood_scoring import feature_matrix, mood_profile, rank_songs, score_matrix, top_k  # noqa: E402
+
+MOOD = ("racing", "no", "alone", "low")
+K = 50
+
+
+def make_pool(size: int, seed: int = 3):
+    rng = np.random.default_rng(seed)
+    songs = [{"id": f"t{i}", "name": f"Song {i}"} for i in range(size)]
+    features = [
+        None if rng.random() < 0.02 else {
+            "energy": float(rng.random()), "valence": float(rng.random()),
+            "tempo": float(rng.normal(120, 25)), "instrumentalness": float(rng.random()),
+            "speechiness": float(rng.beta(1.2, 12))
+        }
+        for _ in range(size)
+    ]
+    return songs, features
+
+
+def baseline_filter(songs, features, lyrics: str, count: int):
+    """The baseline (app.py before the engine): threshold filter for lyrics "no", then slice"""
+    if lyrics == "no" and features:
+        filtered = [s for s, f in zip(songs, features) if f and f.get("instrumentalness", 0) > 0.5]
+        if filtered:
+            songs = filtered
+    return songs[:count]
+
+
+def python_scored(songs, features):
+    """Same weighted score as the engine, computed per song, then sorted"""
+    target, weights = (a.tolist() for a in mood_profile(*MOOD))
+    total = sum(weights)
+    scored = []
+    for i, f in enumerate(features):
+        if not f:
+            scored.append((-1.0, i))
+            continue
+        tempo = min(max((f["tempo"] - 50.0) / 150.0, 0.0), 1.0)
+        row = (f["energy"], f["valence"], tempo, f["instrumentalness"], f["speechiness"])
+        distance = sum(w * (x - t) ** 2 for x, t, w in zip(row, target, weights))
+        scored.append((1.0 - distance / total, i))
+    scored.sort(key=lambda item: (-item[0], item[1]))
+    return [songs[i] for _, i in scored[:K]]
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+# ---------- END TO END ----------
+def feature_stage(latency: float, runs: int) -> dict:
+    """Median audio_features stage (ms) of app.py's /api/generate, with an empty and a filled feature store"""
+    import httpx
+    os.environ.setdefault("SPOTIFY_CLIENT_ID", "bench")
+    os.environ.setdefault("SPOTIFY_CLIENT_SECRET", "bench")
+    os.environ["FEATURE_STORE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="bench-"), "features.db")
+    os.environ["WARM_ENABLED"] = "0"
+
+    import spotify_http
+    from app import app
+    from fake_spotify import FaultConfig, create_app as create_fake
+    from query_table import ERAS, GENRES
+    spotify_http.set_async_transport(httpx.ASGITransport(app=create_fake(FaultConfig(latency=latency))))
+
+    def stage(res) -> float:
+        timings = dict(item.split(";dur=") for item in res.headers["server-timing"].split(", "))
+        return float(timings["audio_features"])
+
+    async def run():
+        stages = {"empty store": [], "filled store": []}
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            for i in range(runs):
+                # A mood the baseline never fetched features for; new query each run, so new tracks
+                mood = {"mind_speed": "slow", "lyrics": "yes", "context": "alone", "distraction": "medium",
+                        "genre": list(GENRES)[i % len(GENRES)], "era": list(ERAS)[i // len(GENRES) % len(ERAS)],
+                        "song_count": 20}
+                stages["empty store"].append(stage(await client.post("/api/generate", json=mood)))
+                stages["filled store"].append(stage(await client.post("/api/generate", json=mood)))
+        return {name: sorted(values)[len(values) // 2] for name, values in stages.items()}
+
+    return asyncio.run(run())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pool", type=int, nargs="+", default=[30, 200, 10_000, 200_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--latency", type=float, help="also time the audio-features stage at this fake latency (s)")
+    parser.add_argument("--runs", type=int, default=11, help="generate requests per store state with --latency")
+    args = parser.parse_args()
+
+    target, weights = mood_profile(*MOOD)
+    print(f"{'pool':>8}  {'baseline':>10}  {'py scored':>10}  {'load':>8}  {'score+topk':>10}  {'engine':>8}"
+          f"   (ms, k={K}; baseline for lyrics=no, other moods only sliced)")
+    for size in args.pool:
+        songs, features = make_pool(size)
+        matrix = feature_matrix(features)
+        k = min(K, size)
+
+        assert [s["id"] for s in python_scored(songs, features)][:k] == \
+               [s["id"] for s in rank_songs(songs, features, *MOOD, k=k)]
+
+        results = [
+            timed(lambda: baseline_filter(songs, features, MOOD[1], k), args.repeat),
+            timed(lambda: python_scored(songs, features), args.repeat),
+            timed(lambda: feature_matrix(features), args.repeat),
+            timed(lambda: top_k(score_matrix(matrix, target, weights), k), args.repeat),
+            timed(lambda: rank_songs(songs, features, *MOOD, k=k), args.repeat)
+        ]
+        print(f"{size:>8}  " + "  ".join(f"{r:>10.3f}" if i in (0, 1, 3) else f"{r:>8.3f}" for i, r in enumerate(results)))
+
+    if args.latency is not None:
+        stages = feature_stage(args.latency, args.runs)
+        print(f"\naudio_features stage added to a lyrics=\"yes\" generate (song_count 20), "
+              f"fake latency {args.latency * 1000:.0f} ms, median of {args.runs}:")
+        for name, ms in stages.items():
+            print(f"  {name:14} {ms:7.1f} ms   (baseline: no call)")
+
+
+if __name__ == "__main__":
+    main()
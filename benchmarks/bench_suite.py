@@ -0,0 +1,210 @@
+"""
+Benchmark Suite - end-to-end latency and throughput without Spotify
+Drives /api/generate, /api/generate-from-text and /api/save-playlist at a
+fixed concurrency against the offline fake (benchmarks/fake_spotify.py),
+reports p50/p95/p99 and throughput per scenario, and can fail on a
+regression against a saved baseline.
+
+    python benchmarks/bench_suite.py --app index --latency 0.02 --json baseline.json
+    python benchmarks/bench_suite.py --app index --latency 0.02 --baseline baseline.json --tolerance 0.2
+    python benchmarks/bench_suite.py --target http://localhost:8000    # a running server
+
+In-process runs are deterministic: fixed request mix, seeded fault injection.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(ROOT))
+sys.path.insert(0, ROOT)
+
+from fake_spotify import FaultConfig, create_app as create_fake  # noqa: E402
+
+# Request mix, cycled in order
+MOODS = [
+    {"mind_speed": "racing", "lyrics": "no", "context": "alone", "distraction": "high"},
+    {"mind_speed": "slow", "lyrics": "yes", "context": "with people", "distraction": "low"},
+    {"mind_speed": "normal", "lyrics": "sometimes", "context": "alone", "distraction": "medium",
+     "language": "hindi", "genre": "bollywood"},
+    {"mind_speed": "racing", "lyrics": "sometimes", "context": "alone", "distraction": "low", "era": "2010s"},
+    {"mind_speed": "slow", "lyrics": "no", "context": "alone", "distraction": "high", "genre": "lofi"},
+]
+TEXTS = [
+    "I need to focus on coding, no lyrics please",
+    "chill evening with friends",
+    "gym workout, high energy",
+    "can't sleep, mind racing",
+    "sunday morning coffee",
+]
+
+SCENARIOS = ("generate", "generate-from-text", "save-playlist")
+
+
+def request_for(scenario: str, i: int, song_count: int, save_tracks: int):
+    """(method, path, json body) for the i-th request of a scenario"""
+    if scenario == "generate":
+        return "/api/generate", {**MOODS[i % len(MOODS)], "song_count": song_count}
+    if scenario == "generate-from-text":
+        return "/api/generate-from-text", {"text": TEXTS[i % len(TEXTS)], "song_count": song_count}
+    track_ids = [f"{i:06d}{n:016d}" for n in range(save_tracks)]
+    return "/api/save-playlist", {"playlist_name": f"Bench {i}", "track_ids": track_ids}
+
+
+def percentile(sorted_values, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: str, total: int, concurrency: int,
+                       song_count: int, save_tracks: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    statuses = {}
+
+    async def one(i: int):
+        path, body = request_for(scenario, i, song_count, save_tracks)
+        async with semaphore:
+            start = time.perf_counter()
+            res = await client.post(path, json=body)
+            latencies.append(time.perf_counter() - start)
+        statuses[res.status_code] = statuses.get(res.status_code, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    ok = sum(count for status, count in statuses.items() if status < 400)
+    return {
+        "requests": total,
+        "ok": ok,
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "throughput": round(total / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2)
+    }
+
+
+def load_app(name: str, cold: bool):
+    """Import the app under test with the environment set for an offline run"""
+    os.environ.setdefault("SPOTIFY_CLIENT_ID", "bench")
+    os.environ.setdefault("SPOTIFY_CLIENT_SECRET", "bench")
+    os.environ.setdefault("FEATURE_STORE_PATH", os.path.join(tempfile.mkdtemp(prefix="bench-"), "features.db"))
+    os.environ["WARM_ENABLED"] = "0"
+    # Every run starts without a token; never reuse (or leave behind) a fake one
+    os.environ["SPOTIFY_TOKEN_SNAPSHOT"] = ""
+    if cold:
+        os.environ["SEARCH_CACHE_TTL"] = "0"
+        os.environ["SEARCH_CACHE_STALE_TTL"] = "0"
+    os.chdir(os.path.dirname(ROOT))
+
+    if name == "index":
+        sys.path.insert(0, os.path.join(os.path.dirname(ROOT), "api"))
+        from index import app
+    else:
+        from app import app
+    return app
+
+
+async def run(args) -> dict:
+    scenarios = [s for s in args.scenarios.split(",") if s]
+    cookies = {"spotify_token": "bench", "spotify_user": "bench-user"}
+
+    if args.target:
+        client = httpx.AsyncClient(base_url=args.target.rstrip("/"), cookies=cookies, timeout=60)
+    else:
+        import spotify_http
+
+        app = load_app(args.app, args.cold)
+        fake = create_fake(FaultConfig(args.latency, args.jitter, args.error_rate,
+                                       args.rate_limit, args.retry_after, args.seed))
+        spotify_http.set_async_transport(httpx.ASGITransport(app=fake))
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench",
+                                   cookies=cookies, timeout=60)
+        if args.app == "app":
+            scenarios = [s for s in scenarios if s != "save-playlist"]   # only the Vercel entry point saves
+
+    results = {}
+    async with client:
+        # Warm-up (token, imports, lazy tables) is not measured
+        for scenario in scenarios:
+            path, body = request_for(scenario, 0, args.song_count, args.save_tracks)
+            await client.post(path, json=body)
+        for scenario in scenarios:
+            results[scenario] = await run_scenario(client, scenario, args.requests, args.concurrency,
+                                                   args.song_count, args.save_tracks)
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Regressions beyond tolerance: slower p95/p99 or lower throughput"""
+    regressions = []
+    for scenario, current in results.items():
+        before = baseline.get("results", baseline).get(scenario)
+        if not before:
+            continue
+        for metric in ("p95_ms", "p99_ms"):
+            if before[metric] and current[metric] > before[metric] * (1 + tolerance):
+                regressions.append(f"{scenario} {metric}: {before[metric]} -> {current[metric]}")
+        if before["throughput"] and current["throughput"] < before["throughput"] * (1 - tolerance):
+            regressions.append(f"{scenario} throughput: {before['throughput']} -> {current['throughput']}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--app", choices=("app", "index"), default="index", help="entry point run in-process")
+    parser.add_argument("--target", help="benchmark a running server instead (point it at fake_spotify.py)")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--song-count", type=int, default=10)
+    parser.add_argument("--save-tracks", type=int, default=50, help="tracks per saved playlist")
+    parser.add_argument("--cold", action="store_true", help="disable the search cache")
+    parser.add_argument("--latency", type=float, default=0.02, help="fake Spotify latency per call (s)")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="share of calls answered with 429")
+    parser.add_argument("--retry-after", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="compare against results written by --json")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run(args))
+
+    print(f"{args.requests} requests/scenario, concurrency {args.concurrency}, "
+          f"fake latency {args.latency * 1000:.0f} ms{' (cold cache)' if args.cold else ''}")
+    for scenario, r in results.items():
+        print(f"{scenario:20} {r['throughput']:8.1f} req/s   p50 {r['p50_ms']:7.1f} ms   "
+              f"p95 {r['p95_ms']:7.1f} ms   p99 {r['p99_ms']:7.1f} ms   ok {r['ok']}/{r['requests']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"config": {k: v for k, v in vars(args).items() if k not in ("json", "baseline")},
+                       "results": results}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
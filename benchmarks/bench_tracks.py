@@ -0,0 +1,117 @@
+"""
+Benchmark - track representation
+Compares the old dict-per-track shape with the slotted Track record:
+memory held per cached track, building tracks from Spotify JSON, and
+serializing a PlaylistResponse to JSON.
+
+    python benchmarks/bench_tracks.py --tracks 100000 --songs 200
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from typing import List
+
+from pydantic import BaseModel
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from track import Track  # noqa: E402
+from ttl_cache import approx_size  # noqa: E402
+
+
+def spotify_item(i: int) -> dict:
+    return {
+        "id": f"{i:022d}",
+        "name": f"Song {i}",
+        "artists": [{"name": f"Artist {i % 5000}"}],
+        "album": {"name": f"Album {i % 20000}", "images": [{"url": f"https://i.scdn.co/image/{i:040d}"}]},
+        "preview_url": None,
+        "external_urls": {"spotify": f"https://open.spotify.com/track/{i:022d}"},
+        "duration_ms": 180000 + i % 60000
+    }
+
+
+def format_dict(item: dict) -> dict:
+    """The previous format_track"""
+    return {
+        "id": item["id"],
+        "name": item["name"],
+        "artist": item["artists"][0]["name"],
+        "album": item["album"]["name"],
+        "image": item["album"]["images"][0]["url"] if item["album"]["images"] else None,
+        "preview_url": item.get("preview_url"),
+        "spotify_url": item["external_urls"]["spotify"],
+        "duration_ms": item["duration_ms"]
+    }
+
+
+class DictResponse(BaseModel):
+    success: bool
+    query: str
+    songs: List[dict]
+    generated_at: str
+
+
+class TrackResponse(BaseModel):
+    success: bool
+    query: str
+    songs: List[Track]
+    generated_at: str
+
+
+def retained(build) -> int:
+    """Bytes still allocated by what build() returns"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    value = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del value
+    return after - before
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tracks", type=int, default=100_000, help="tracks held for the memory test")
+    parser.add_argument("--songs", type=int, default=200, help="songs per serialized response")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    items = [spotify_item(i) for i in range(args.tracks)]
+    dicts = [format_dict(item) for item in items]
+    tracks = [Track.from_spotify(item) for item in items]
+    assert [t.as_dict() for t in tracks[:100]] == dicts[:100]
+
+    # Strings are shared by both shapes, so this is the per-track container cost
+    dict_bytes = retained(lambda: [format_dict(item) for item in items])
+    track_bytes = retained(lambda: [Track.from_spotify(item) for item in items])
+    print(f"memory, {args.tracks} tracks     dict {dict_bytes / args.tracks:6.0f} B/track   "
+          f"Track {track_bytes / args.tracks:6.0f} B/track   ({dict_bytes / track_bytes:.1f}x)")
+    print(f"cache size estimate         dict {approx_size(dicts[0]):6d} B/track   Track {approx_size(tracks[0]):6d} B/track")
+
+    build_dict = timed(lambda: [format_dict(item) for item in items[:10000]], 5) / 10000 * 1e9
+    build_track = timed(lambda: [Track.from_spotify(item) for item in items[:10000]], 5) / 10000 * 1e9
+    print(f"build from Spotify JSON     dict {build_dict:6.0f} ns/track  Track {build_track:6.0f} ns/track")
+
+    fields = {"success": True, "query": "calm instrumental focus", "generated_at": "2024-01-01T00:00:00"}
+    dict_songs, track_songs = dicts[:args.songs], tracks[:args.songs]
+    assert DictResponse(songs=dict_songs, **fields).model_dump_json() == \
+           TrackResponse(songs=track_songs, **fields).model_dump_json()
+    dump_dict = timed(lambda: DictResponse(songs=dict_songs, **fields).model_dump_json(), args.repeat)
+    dump_track = timed(lambda: TrackResponse(songs=track_songs, **fields).model_dump_json(), args.repeat)
+    print(f"response JSON, {args.songs} songs   dict {dump_dict * 1e6:6.0f} us        Track {dump_track * 1e6:6.0f} us   "
+          f"({args.songs / dump_track:,.0f} vs {args.songs / dump_dict:,.0f} songs/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Fake Spotify - offline stand-in for the Spotify endpoints the app uses
+Deterministic tracks and audio features, with configurable latency,
+error rate and 429 injection. Run it as a server and point the app at it:
+
+    python benchmarks/fake_spotify.py --port 9000 --latency 0.05 --rate-limit 0.02
+    SPOTIFY_API_URL=http://127.0.0.1:9000 SPOTIFY_ACCOUNTS_URL=http://127.0.0.1:9000 \\
+        SPOTIFY_CLIENT_ID=x SPOTIFY_CLIENT_SECRET=x python app.py
+
+or mount it in-process with `httpx.ASGITransport(app=create_app(...))`.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import random
+from dataclasses import dataclass
+from urllib.parse import parse_qs
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, RedirectResponse
+
+# Tracks a search can page through
+SEARCH_TOTAL = 1000
+
+
+@dataclass
+class FaultConfig:
+    latency: float = 0.0        # seconds added to every call
+    jitter: float = 0.0         # extra uniform 0..jitter seconds
+    error_rate: float = 0.0     # share of calls answered with 503
+    rate_limit: float = 0.0     # share of calls answered with 429
+    retry_after: float = 1.0    # Retry-After sent with a 429
+    seed: int = 0
+
+
+def track_id(query: str, position: int) -> str:
+    return hashlib.sha1(f"{query}:{position}".encode()).hexdigest()[:22]
+
+
+def fake_track(tid: str) -> dict:
+    rng = random.Random(tid)
+    year = rng.randint(1985, 2024)
+    return {
+        "id": tid,
+        "name": f"Song {tid[:6]}",
+        "artists": [{"name": f"Artist {tid[6:10]}"}],
+        "album": {
+            "name": f"Album {tid[10:14]}",
+            "images": [{"url": f"https://img.example/{tid}.jpg"}],
+            "release_date": f"{year}-01-01"
+        },
+        "preview_url": None,
+        "external_urls": {"spotify": f"https://open.spotify.com/track/{tid}"},
+        "duration_ms": rng.randint(120000, 300000),
+        "is_playable": rng.random() > 0.05
+    }
+
+
+def fake_features(tid: str) -> dict:
+    rng = random.Random("features:" + tid)
+    instrumental = rng.random() < 0.3
+    return {
+        "id": tid,
+        "energy": round(rng.random(), 3),
+        "valence": round(rng.random(), 3),
+        "tempo": round(rng.uniform(60, 180), 1),
+        "instrumentalness": round(rng.uniform(0.6, 1.0) if instrumental else rng.uniform(0.0, 0.2), 3),
+        "speechiness": round(rng.uniform(0.02, 0.3), 3)
+    }
+
+
+def create_app(config: FaultConfig = None) -> FastAPI:
+    config = config or FaultConfig()
+    rng = random.Random(config.seed)
+    fake = FastAPI(title="Fake Spotify")
+    fake.state.config = config
+    fake.state.calls = {}
+    fake.state.playlists = {}
+    fake.state.owners = {}
+
+    @fake.middleware("http")
+    async def faults(request: Request, call_next):
+        endpoint = f"{request.method} {request.url.path}"
+        fake.state.calls[endpoint] = fake.state.calls.get(endpoint, 0) + 1
+
+        delay = config.latency + (rng.uniform(0, config.jitter) if config.jitter else 0.0)
+        if delay:
+            await asyncio.sleep(delay)
+
+        roll = rng.random()
+        if roll < config.rate_limit:
+            return JSONResponse({"error": {"status": 429, "message": "API rate limit exceeded"}},
+                                status_code=429, headers={"Retry-After": f"{config.retry_after:g}"})
+        if roll < config.rate_limit + config.error_rate:
+            return JSONResponse({"error": {"status": 503, "message": "Service unavailable"}}, status_code=503)
+        return await call_next(request)
+
+    # ---------- ACCOUNTS ----------
+    @fake.get("/authorize")
+    async def authorize(redirect_uri: str, state: str = ""):
+        return RedirectResponse(f"{redirect_uri}?code=fake-code")
+
+    @fake.post("/api/token")
+    async def token(request: Request):
+        form = parse_qs((await request.body()).decode())
+        if form.get("grant_type", [None])[0] not in ("client_credentials", "authorization_code"):
+            return JSONResponse({"error": "unsupported_grant_type"}, status_code=400)
+        return {"access_token": "fake-token", "token_type": "Bearer", "expires_in": 3600}
+
+    # ---------- WEB API ----------
+    @fake.get("/v1/search")
+    async def search(q: str, limit: int = 20, offset: int = 0, market: str = None):
+        end = min(offset + min(limit, 50), SEARCH_TOTAL)
+        items = [fake_track(track_id(q.lower(), i)) for i in range(offset, end)]
+        if market is None:
+            for item in items:
+                item.pop("is_playable")
+        return {"tracks": {"items": items, "offset": offset, "limit": limit, "total": SEARCH_TOTAL}}
+
+    @fake.get("/v1/audio-features")
+    async def audio_features(ids: str):
+        track_ids = [tid for tid in ids.split(",") if tid][:100]
+        # Like Spotify, some tracks have no features
+        return {"audio_features": [fake_features(tid) if int(tid[-2:], 16) % 20 else None for tid in track_ids]}
+
+    @fake.get("/v1/me")
+    async def me():
+        return {"id": "fake-user", "display_name": "Fake User"}
+
+    @fake.post("/v1/users/{user_id}/playlists")
+    async def create_playlist(user_id: str, request: Request):
+        body = await request.json()
+        playlist_id = hashlib.sha1(f"{user_id}:{len(fake.state.playlists)}".encode()).hexdigest()[:22]
+        fake.state.playlists[playlist_id] = []
+        fake.state.owners[playlist_id] = user_id
+        return JSONResponse({
+            "id": playlist_id,
+            "name": body.get("name"),
+            "external_urls": {"spotify": f"https://open.spotify.com/playlist/{playlist_id}"}
+        }, status_code=201)
+
+    @fake.post("/v1/playlists/{playlist_id}/tracks")
+    async def add_tracks(playlist_id: str, request: Request):
+        body = await request.json()
+        uris = body.get("uris") or []
+        if len(uris) > 100:
+            return JSONResponse({"error": {"status": 400, "message": "Too many ids requested"}}, status_code=400)
+        tracks = fake.state.playlists.setdefault(playlist_id, [])
+        position = body.get("position", len(tracks))
+        if not 0 <= position <= len(tracks):
+            return JSONResponse({"error": {"status": 400, "message": "Index out of bounds"}}, status_code=400)
+        tracks[position:position] = uris
+        return JSONResponse({"snapshot_id": f"snap{len(tracks)}"}, status_code=201)
+
+    @fake.get("/v1/playlists/{playlist_id}")
+    async def playlist(playlist_id: str):
+        if playlist_id not in fake.state.playlists:
+            return JSONResponse({"error": {"status": 404, "message": "Not found"}}, status_code=404)
+        return {
+            "id": playlist_id,
+            "owner": {"id": fake.state.owners.get(playlist_id)},
+            "external_urls": {"spotify": f"https://open.spotify.com/playlist/{playlist_id}"},
+            "tracks": {"total": len(fake.state.playlists[playlist_id])}
+        }
+
+    @fake.get("/v1/playlists/{playlist_id}/tracks")
+    async def playlist_tracks(playlist_id: str, limit: int = 100, offset: int = 0):
+        tracks = fake.state.playlists.get(playlist_id)
+        if tracks is None:
+            return JSONResponse({"error": {"status": 404, "message": "Not found"}}, status_code=404)
+        items = [{"track": {"uri": uri}} for uri in tracks[offset:offset + limit]]
+        return {"items": items, "total": len(tracks), "offset": offset, "limit": limit}
+
+    @fake.get("/stats")
+    async def stats():
+        return {"calls": fake.state.calls, "playlists": len(fake.state.playlists)}
+
+    return fake
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline stand-in for the Spotify API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    import uvicorn
+    config = FaultConfig(args.latency, args.jitter, args.error_rate, args.rate_limit, args.retry_after, args.seed)
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Load Test - concurrent /api/generate throughput
+Drives two apps in-process, over real HTTP to the fake Spotify server
+(benchmarks/fake_spotify.py, run in its own process with a fixed latency):
+the baseline route with its blocking `requests` calls (baseline_app.py)
+and the current app.py with the async client. Requests cycle through
+every mood combination. app.py runs as deployed, with its search cache,
+feature store and coalescing, and it also does more upstream work per
+request (sub-query fan-out, audio features for every mood).
+
+    python benchmarks/load_test.py --requests 200 --concurrency 50 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from itertools import product
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+os.chdir(ROOT)
+
+from bench_coldstart import start_fake  # noqa: E402
+
+MOODS = [
+    {"mind_speed": m, "lyrics": l, "context": c, "distraction": d, "song_count": 5}
+    for m, l, c, d in product(("racing", "normal", "slow"), ("yes", "sometimes", "no"),
+                              ("alone", "with people"), ("low", "medium", "high"))
+]
+
+
+async def run(app, total: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        async def one(i):
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                res = await client.post("/api/generate", json=MOODS[i % len(MOODS)])
+                latencies.append(time.perf_counter() - start)
+                errors += res.status_code != 200
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "throughput": total / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "errors": errors
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05, help="upstream latency per Spotify call (s)")
+    args = parser.parse_args()
+
+    fake, fake_url = start_fake(args.latency)
+    os.environ.update({
+        "SPOTIFY_API_URL": fake_url,
+        "SPOTIFY_ACCOUNTS_URL": fake_url,
+        "SPOTIFY_CLIENT_ID": "bench",
+        "SPOTIFY_CLIENT_SECRET": "bench",
+        "FEATURE_STORE_PATH": os.path.join(tempfile.mkdtemp(prefix="bench-"), "features.db"),
+        "WARM_ENABLED": "0",
+        # The fake is local: keep the upstream rate limiter from being the bottleneck
+        "SPOTIFY_RATE_LIMIT": "10000"
+    })
+    try:
+        from baseline_app import app as baseline
+        from app import app as current
+
+        print(f"{args.requests} requests, concurrency {args.concurrency}, "
+              f"upstream latency {args.latency * 1000:.0f} ms, {len(MOODS)} moods")
+        for label, app in (("baseline, requests", baseline), ("app.py, async", current)):
+            result = asyncio.run(run(app, args.requests, args.concurrency))
+            print(f"{label:20} {result['throughput']:8.1f} req/s   p50 {result['p50_ms']:7.1f} ms   "
+                  f"p95 {result['p95_ms']:7.1f} ms   errors {result['errors']}")
+    finally:
+        fake.kill()
+        fake.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""
+Cache Warmer
+Keeps search results and audio features for the most requested moods
+warm, refreshing search cache entries shortly before they expire so
+popular requests never wait on a cold Spotify call. Runs inside the app
+lifespan when WARM_ENABLED=1 (off by default: it sends Spotify traffic
+from every process), or standalone against a running server:
+
+    python cache_warmer.py --url http://localhost:8000
+    python cache_warmer.py --once    # one in-process pass (fills the feature store)
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import sys
+import time
+from collections import Counter
+from typing import List, NamedTuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from feature_store import feature_store, chunked, BATCH_SIZE
+from llm_parser import ACTIVITY_PRESETS
+from query_planner import candidate_pool_size, page_requests
+from query_table import canonical_key, lookup as lookup_query
+from spotify_api import search_cache, search_cache_key, fetch_search, get_spotify_token, fetch_audio_features
+from upstream_limiter import lane as upstream_lane
+
+# Set to "1" to run the warmer in the app lifespan
+WARM_ENABLED = os.getenv("WARM_ENABLED", "0") == "1"
+# Mood/filter combinations kept warm
+WARM_TOP_N = int(os.getenv("WARM_TOP_N", "20"))
+# Seconds between warm passes
+WARM_INTERVAL = float(os.getenv("WARM_INTERVAL", "60"))
+# Refresh search entries with less than this many seconds of freshness left
+WARM_LEAD = float(os.getenv("WARM_LEAD", str(WARM_INTERVAL * 2)))
+# Upstream Spotify requests one pass may make
+WARM_BUDGET = int(os.getenv("WARM_BUDGET", "60"))
+# Filters (language/genre/era) combined with every preset
+WARM_FILTERS = os.getenv("WARM_FILTERS", "any/any/any")
+# Playlist sizes warmed for each combination
+WARM_SONG_COUNTS = os.getenv("WARM_SONG_COUNTS", "5")
+
+# Most distinct combinations we keep request counts for
+MAX_TRACKED = 10000
+# Marks the standalone warmer's requests, which are neither demand nor history
+WARM_HEADER = "X-Cache-Warm"
+
+
+class WarmTarget(NamedTuple):
+    mind_speed: str
+    lyrics: str
+    context: str
+    distraction: str
+    language: str
+    genre: str
+    era: str
+    song_count: int
+
+    def as_mood(self) -> dict:
+        return self._asdict()
+
+
+def parse_filters(spec: str) -> List[tuple]:
+    """"any/any/any,hindi/bollywood/any" -> [(language, genre, era), ...]"""
+    filters = []
+    for item in spec.split(","):
+        if item.strip():
+            parts = [p.strip() or "any" for p in item.split("/")]
+            filters.append(tuple((parts + ["any"] * 3)[:3]))
+    return filters
+
+
+def target_for(mood: dict) -> WarmTarget:
+    """Canonical warm target for a mood dict (MoodInput fields)"""
+    key = canonical_key(
+        mood.get("mind_speed", "normal"), mood.get("lyrics", "sometimes"),
+        mood.get("context", "alone"), mood.get("distraction", "medium"),
+        mood.get("language", "any"), mood.get("genre", "any"), mood.get("era", "any")
+    )
+    return WarmTarget(*key, int(mood.get("song_count", 5)))
+
+
+def preset_targets(filters: List[tuple], song_counts: List[int]) -> List[WarmTarget]:
+    """Every distinct activity preset x filter x size, in preset order"""
+    targets = dict.fromkeys(
+        target_for({**preset, "language": language, "genre": genre, "era": era, "song_count": count})
+        for preset in ACTIVITY_PRESETS.values()
+        for language, genre, era in filters
+        for count in song_counts
+    )
+    return list(targets)
+
+
+class CacheWarmer:
+    """
+    Periodically refreshes the top-N targets: the activity presets, re-ranked
+    by how often each combination is actually requested.
+    """
+
+    def __init__(self, top_n: int = WARM_TOP_N, interval: float = WARM_INTERVAL,
+                 lead: float = WARM_LEAD, budget: int = WARM_BUDGET,
+                 filters: str = WARM_FILTERS, song_counts: str = WARM_SONG_COUNTS):
+        self.top_n = top_n
+        self.interval = interval
+        self.lead = lead
+        self.budget = budget
+        self.seeds = preset_targets(parse_filters(filters), [int(c) for c in song_counts.split(",") if c.strip()])
+
+        self.demand = Counter()
+        self._task = None
+
+        self.passes = 0
+        self.search_refreshes = 0
+        self.feature_batches = 0
+        self.skipped_fresh = 0
+        self.deferred = 0
+        self.errors = 0
+        self.last_error = None
+        self.last_pass_ms = 0.0
+
+    # ---------- DEMAND ----------
+    def record(self, mood: dict):
+        """Count a served request so popular combinations are warmed first"""
+        target = target_for(mood)
+        if target in self.demand or len(self.demand) < MAX_TRACKED:
+            self.demand[target] += 1
+
+    def targets(self) -> List[WarmTarget]:
+        """Top-N combinations by demand; presets fill the rest in their own order"""
+        candidates = list(dict.fromkeys(self.seeds + [t for t, _ in self.demand.most_common(self.top_n)]))
+        order = {t: i for i, t in enumerate(candidates)}
+        candidates.sort(key=lambda t: (-self.demand.get(t, 0), order[t]))
+        return candidates[:self.top_n]
+
+    # ---------- WARM PASS ----------
+    async def run_once(self) -> dict:
+        """One pass over the targets within the upstream budget; returns per-pass counts"""
+        start = time.perf_counter()
+        budget = self.budget
+        counts = {"search": 0, "features": 0, "fresh": 0, "deferred": 0}
+
+        token = await get_spotify_token()
+        for target in self.targets():
+            entry = lookup_query(*target[:7])
+            pages = page_requests(list(entry.plan), candidate_pool_size(target.song_count))
+
+            # Refresh pages that are missing or about to expire, in plan order
+            due = []
+            for index, offset, limit in pages:
+                text = entry.plan[index].text
+                remaining = search_cache.expires_in(search_cache_key(text, entry.market, limit, offset))
+                if remaining is not None and remaining > self.lead:
+                    counts["fresh"] += 1
+                elif budget > 0:
+                    budget -= 1
+                    due.append((text, limit, offset))
+                else:
+                    counts["deferred"] += 1
+
+            await asyncio.gather(*(
+                search_cache.refresh(search_cache_key(text, entry.market, limit, offset),
+                                     lambda text=text, limit=limit, offset=offset, market=entry.market:
+                                     fetch_search(text, token, limit, market, offset))
+                for text, limit, offset in due
+            ))
+            counts["search"] += len(due)
+
+            # Features never expire; fetch only tracks the store has not seen
+            track_ids = []
+            for index, offset, limit in pages:
+                value, _ = search_cache.lookup(search_cache_key(entry.plan[index].text, entry.market, limit, offset))
+                track_ids.extend(song.id for song in value or ())
+            known = await feature_store.aget_many(track_ids)
+            missing = [tid for tid in dict.fromkeys(track_ids) if tid not in known]
+            batches = math.ceil(len(missing) / BATCH_SIZE)
+            if batches and batches <= budget:
+                budget -= batches
+                # Fetch the misses directly: the store was just checked
+                await asyncio.gather(*(fetch_audio_features(batch, token) for batch in chunked(missing)))
+                counts["features"] += batches
+            elif batches:
+                counts["deferred"] += batches
+
+        self.passes += 1
+        self.search_refreshes += counts["search"]
+        self.feature_batches += counts["features"]
+        self.skipped_fresh += counts["fresh"]
+        self.deferred += counts["deferred"]
+        self.last_pass_ms = (time.perf_counter() - start) * 1000
+        return counts
+
+    async def run(self):
+        """Warm forever, one pass every interval; errors are counted, never raised"""
+        while True:
+            try:
+                with upstream_lane("background"):
+                    await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                self.last_error = str(e) or type(e).__name__
+            await asyncio.sleep(self.interval)
+
+    # ---------- LIFESPAN ----------
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "targets": len(self.targets()),
+            "budget_per_pass": self.budget,
+            "passes": self.passes,
+            "search_refreshes": self.search_refreshes,
+            "feature_batches": self.feature_batches,
+            "skipped_fresh": self.skipped_fresh,
+            "deferred": self.deferred,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "last_pass_ms": round(self.last_pass_ms, 2)
+        }
+
+
+# Shared instance used by the app
+cache_warmer = CacheWarmer()
+
+
+# ---------- STANDALONE WORKER ----------
+async def warm_remote(url: str, warmer: CacheWarmer, once: bool):
+    """
+    Drive a running server: its caches live in that process, so each target
+    is requested through /api/generate (one request counts against the budget).
+    Requests carry WARM_HEADER so the server does not count them as demand.
+    """
+    import httpx
+
+    async with httpx.AsyncClient(base_url=url, timeout=30, headers={WARM_HEADER: "1"}) as client:
+        while True:
+            for target in warmer.targets()[:warmer.budget]:
+                try:
+                    res = await client.post("/api/generate", json=target.as_mood())
+                    res.raise_for_status()
+                    warmer.search_refreshes += 1
+                except httpx.HTTPError as e:
+                    warmer.errors += 1
+                    warmer.last_error = str(e) or type(e).__name__
+            warmer.passes += 1
+            print(f"pass {warmer.passes}: {warmer.stats()}")
+            if once:
+                return
+            await asyncio.sleep(warmer.interval)
+
+
+async def warm_local(warmer: CacheWarmer, once: bool):
+    while True:
+        try:
+            with upstream_lane("background"):
+                counts = await warmer.run_once()
+            print(f"pass {warmer.passes}: {counts}")
+        except Exception as e:
+            print(f"pass {warmer.passes + 1} failed: {getattr(e, 'detail', None) or e}")
+        if once:
+            return
+        await asyncio.sleep(warmer.interval)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Keep popular playlist caches warm")
+    parser.add_argument("--url", help="warm a running server through its API")
+    parser.add_argument("--once", action="store_true", help="run a single pass and exit")
+    parser.add_argument("--top-n", type=int, default=WARM_TOP_N)
+    parser.add_argument("--budget", type=int, default=WARM_BUDGET)
+    parser.add_argument("--interval", type=float, default=WARM_INTERVAL)
+    args = parser.parse_args(argv)
+
+    warmer = CacheWarmer(top_n=args.top_n, interval=args.interval, budget=args.budget)
+    try:
+        if args.url:
+            asyncio.run(warm_remote(args.url.rstrip("/"), warmer, args.once))
+        else:
+            asyncio.run(warm_local(warmer, args.once))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
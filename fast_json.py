@@ -0,0 +1,94 @@
+"""
+Fast JSON Responses
+Encodes playlist responses straight to bytes in one pass, skipping
+FastAPI's response model validation and jsonable_encoder pass (the data is
+already trusted); Tracks are written through Track.as_dict. Static payloads
+(filter options, presets) are encoded once at startup and served with a
+strong ETag. Uses orjson when installed, the standard json module otherwise.
+"""
+
+import hashlib
+import json
+import os
+from typing import Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from track import Track
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson
+    orjson = None
+
+# ---------- CONFIGURATION ----------
+# How long browsers may reuse a static payload before revalidating it (ETag makes that a 304)
+STATIC_MAX_AGE = int(os.getenv("STATIC_JSON_MAX_AGE", "300"))
+
+
+def dumps(value) -> bytes:
+    """Compact UTF-8 JSON (same output as Starlette's JSONResponse); Tracks become their as_dict()"""
+    if orjson is not None:
+        # as_dict is faster than orjson's own walk over a slotted dataclass
+        return orjson.dumps(value, default=Track.as_dict, option=orjson.OPT_PASSTHROUGH_DATACLASS)
+    return json.dumps(value, default=Track.as_dict, ensure_ascii=False, allow_nan=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def stats() -> dict:
+    return {"encoder": "orjson" if orjson is not None else "json"}
+
+
+class FastJSONResponse(Response):
+    """JSON response rendered with dumps(); bytes are sent as they are (pre-encoded bodies)"""
+
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
+
+
+def json_response(content, response: Optional[Response] = None, status_code: int = 200) -> FastJSONResponse:
+    """
+    FastJSONResponse carrying the headers and cookies a route set on its
+    injected `response` (FastAPI drops those when a Response is returned).
+    """
+    fast = FastJSONResponse(content, status_code=status_code)
+    if response is not None:
+        fast.raw_headers.extend(
+            (name, value) for name, value in response.raw_headers
+            if name not in (b"content-length", b"content-type")
+        )
+    return fast
+
+
+# ---------- STATIC PAYLOADS ----------
+class StaticJSON:
+    """
+    A payload that never changes while the process runs, encoded once.
+    respond() answers conditional GETs: 304 (no body) when If-None-Match
+    carries the current ETag, the cached bytes otherwise.
+    """
+
+    def __init__(self, content, max_age: int = STATIC_MAX_AGE):
+        self.body = dumps(content)
+        self.etag = '"' + hashlib.sha256(self.body).hexdigest()[:32] + '"'
+        self.headers = {
+            "ETag": self.etag,
+            "Cache-Control": f"public, max-age={max_age}, must-revalidate"
+        }
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        if not if_none_match:
+            return False
+        # Weak comparison, as RFC 9110 prescribes for If-None-Match
+        tags = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+        return any(tag in (self.etag, "*") for tag in tags)
+
+    def respond(self, request: Request) -> Response:
+        if self.matches(request.headers.get("if-none-match")):
+            return Response(status_code=304, headers=self.headers)
+        return FastJSONResponse(self.body, headers=self.headers)
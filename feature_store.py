@@ -0,0 +1,123 @@
+"""
+Audio Feature Store
+Persistent SQLite cache of Spotify audio features keyed by track ID.
+Features never change for a track, so entries are kept forever.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+from typing import Dict, Iterable
+
+DEFAULT_PATH = os.getenv(
+    "FEATURE_STORE_PATH",
+    os.path.join(tempfile.gettempdir(), "moodtunes_audio_features.db")
+)
+
+# Spotify accepts at most this many IDs per /v1/audio-features call
+BATCH_SIZE = 100
+
+# Marker for tracks Spotify has no features for, so we do not ask again
+_MISSING = "null"
+
+
+class FeatureStore:
+    """Track ID -> audio features dict (or None when Spotify has none)"""
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS audio_features ("
+                "track_id TEXT PRIMARY KEY, features TEXT NOT NULL)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, track_ids: Iterable[str]) -> Dict[str, dict]:
+        """Return stored features for the IDs we know; unknown IDs are left out"""
+        ids = list(dict.fromkeys(track_ids))
+        found = {}
+        with self._lock:
+            conn = self._connect()
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT track_id, features FROM audio_features WHERE track_id IN ({placeholders})",
+                    chunk
+                )
+                for track_id, features in rows:
+                    found[track_id] = json.loads(features)
+
+        self.hits += len(found)
+        self.misses += len(ids) - len(found)
+        return found
+
+    def put_many(self, features: Dict[str, dict]):
+        """Store features; a value of None records that Spotify has none"""
+        if not features:
+            return
+        rows = [
+            (track_id, json.dumps(feat) if feat else _MISSING)
+            for track_id, feat in features.items()
+        ]
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO audio_features (track_id, features) VALUES (?, ?)",
+                    rows
+                )
+        self.writes += len(rows)
+
+    # ---------- ASYNC ----------
+    # SQLite reads and commits block; async callers run them on a worker
+    # thread so the event loop keeps serving other requests meanwhile
+    async def aget_many(self, track_ids: Iterable[str]) -> Dict[str, dict]:
+        return await asyncio.to_thread(self.get_many, list(track_ids))
+
+    async def aput_many(self, features: Dict[str, dict]):
+        if features:
+            await asyncio.to_thread(self.put_many, features)
+
+    def count(self) -> int:
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM audio_features").fetchone()[0]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+def chunked(items: list, size: int = BATCH_SIZE):
+    """Split a list into consecutive chunks of at most `size` items"""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+# Shared instance used by all entry points
+feature_store = FeatureStore()
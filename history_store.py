@@ -0,0 +1,213 @@
+"""
+Playlist History Store
+Bounded per-user history: a fixed-size in-memory ring buffer per scope,
+optionally backed by an append-only SQLite table that survives restarts
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from collections import OrderedDict, deque
+from typing import Optional
+
+from fastapi import Request, Response
+
+# Entries kept in memory per scope (browser)
+HISTORY_SIZE = int(os.getenv("HISTORY_SIZE", "50"))
+# Scopes kept in memory; least recently used ones are dropped
+HISTORY_MAX_SCOPES = int(os.getenv("HISTORY_MAX_SCOPES", "10000"))
+# Set to a file path to persist history on disk
+HISTORY_DB_PATH = os.getenv("HISTORY_DB_PATH")
+# Entries kept on disk per scope; older rows are pruned on append
+HISTORY_RETENTION = int(os.getenv("HISTORY_RETENTION", "500"))
+
+HISTORY_COOKIE = "history_id"
+
+
+class HistoryStore:
+    """Append-only, per-scope playlist history with cursor pagination"""
+
+    def __init__(self, size: int = HISTORY_SIZE, max_scopes: int = HISTORY_MAX_SCOPES,
+                 path: str = HISTORY_DB_PATH, retention: int = HISTORY_RETENTION):
+        self.size = size
+        self.max_scopes = max_scopes
+        self.path = path
+        self.retention = retention
+
+        self._rings = OrderedDict()   # scope -> deque of entries (oldest first)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._conn = None
+
+        self.appends = 0
+        self.disk_reads = 0
+
+    # ---------- PUBLIC ----------
+    def append(self, scope: str, entry: dict) -> dict:
+        """Record an entry for scope; returns it with its assigned id"""
+        with self._lock:
+            ring = self._ring(scope)
+            if self.path:
+                entry = {"id": self._db_insert(scope, entry), **entry}
+            else:
+                entry = {"id": next(self._ids), **entry}
+            ring.append(entry)
+            self.appends += 1
+        return entry
+
+    def page(self, scope: Optional[str], limit: int = 10, before: int = None) -> dict:
+        """
+        Newest `limit` entries older than the `before` cursor, oldest first.
+        `next_before` is the cursor for the following (older) page.
+        Reading never creates a scope; only append does.
+        """
+        with self._lock:
+            ring = self._rings.get(scope) if scope else None
+            if ring is None:
+                # Not in memory: only a persisted scope can have entries
+                items = self._db_page(scope, limit, before) if scope and self.path else []
+            else:
+                self._rings.move_to_end(scope)
+                items = [e for e in ring if before is None or e["id"] < before][-limit:]
+
+                # Older entries than the ring holds may still be on disk
+                if len(items) < limit and self.path and len(ring) == self.size:
+                    oldest = items[0]["id"] if items else before
+                    items = self._db_page(scope, limit - len(items), oldest) + items
+
+        return {
+            "items": items,
+            "next_before": items[0]["id"] if len(items) == limit else None
+        }
+
+    def clear(self, scope: Optional[str]):
+        if not scope:
+            return
+        with self._lock:
+            self._rings.pop(scope, None)
+            if self.path:
+                conn = self._connect()
+                with conn:
+                    conn.execute("DELETE FROM history WHERE scope = ?", (scope,))
+
+    # SQLite calls block, so the async variants run them on a worker thread
+    # when history is persisted; memory-only history is answered inline
+    async def aappend(self, scope: str, entry: dict) -> dict:
+        if self.path:
+            return await asyncio.to_thread(self.append, scope, entry)
+        return self.append(scope, entry)
+
+    async def apage(self, scope: Optional[str], limit: int = 10, before: int = None) -> dict:
+        if self.path and scope:
+            return await asyncio.to_thread(self.page, scope, limit, before)
+        return self.page(scope, limit, before)
+
+    async def aclear(self, scope: Optional[str]):
+        if self.path and scope:
+            await asyncio.to_thread(self.clear, scope)
+        else:
+            self.clear(scope)
+
+    def stats(self) -> dict:
+        return {
+            "scopes": len(self._rings),
+            "entries": sum(len(ring) for ring in self._rings.values()),
+            "appends": self.appends,
+            "disk_reads": self.disk_reads,
+            "persistent": bool(self.path)
+        }
+
+    # ---------- MEMORY ----------
+    def _ring(self, scope: str) -> deque:
+        ring = self._rings.get(scope)
+        if ring is None:
+            ring = deque(maxlen=self.size)
+            if self.path:
+                ring.extend(self._db_page(scope, self.size, None))
+            self._rings[scope] = ring
+            while len(self._rings) > self.max_scopes:
+                self._rings.popitem(last=False)
+        else:
+            self._rings.move_to_end(scope)
+        return ring
+
+    # ---------- DISK ----------
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS history ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, scope TEXT NOT NULL, entry TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS history_scope_id ON history (scope, id)")
+            self._conn = conn
+        return self._conn
+
+    def _db_insert(self, scope: str, entry: dict) -> int:
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO history (scope, entry) VALUES (?, ?)",
+                (scope, json.dumps(entry))
+            )
+            # Rotate: keep only the newest `retention` rows for this scope
+            conn.execute(
+                "DELETE FROM history WHERE scope = ? AND id <= ("
+                "SELECT id FROM history WHERE scope = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                (scope, scope, self.retention)
+            )
+        return cursor.lastrowid
+
+    def _db_page(self, scope: str, limit: int, before: int = None) -> list:
+        self.disk_reads += 1
+        conn = self._connect()
+        rows = conn.execute(
+            "SELECT id, entry FROM history WHERE scope = ? AND id < ? ORDER BY id DESC LIMIT ?",
+            (scope, before if before is not None else 2 ** 63 - 1, limit)
+        ).fetchall()
+        return [{"id": row_id, **json.loads(entry)} for row_id, entry in reversed(rows)]
+
+
+def history_scope(request: Request, response: Response = None) -> Optional[str]:
+    """
+    History belongs to the browser: a random id the server issues in an
+    HTTP-only cookie (client-set values such as the readable spotify_user
+    cookie are never trusted as a scope). A new id is issued only on a
+    `response` that can set it; without one, a browser with no id has no
+    scope (None). The scope is remembered for the rest of the request.
+    """
+    scope = getattr(request.state, "history_scope", None)
+    if scope is None:
+        browser_id = request.cookies.get(HISTORY_COOKIE, "")
+        if len(browser_id) != 32 or not all(c in "0123456789abcdef" for c in browser_id):
+            if response is None:
+                return None
+            browser_id = uuid.uuid4().hex
+            request.state.new_history_id = browser_id
+        scope = f"browser:{browser_id}"
+        request.state.history_scope = scope
+
+    new_id = getattr(request.state, "new_history_id", None)
+    if new_id and response is not None:
+        response.set_cookie(
+            key=HISTORY_COOKIE,
+            value=new_id,
+            httponly=True,
+            secure=True,
+            samesite="lax",
+            max_age=365 * 24 * 3600
+        )
+    return scope
+
+
+# Shared instance used by all entry points
+history_store = HistoryStore()
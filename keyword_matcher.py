@@ -0,0 +1,123 @@
+"""
+Keyword Matcher
+Aho-Corasick automaton that finds every keyword occurring in a text in a
+single pass, regardless of vocabulary size
+"""
+
+from collections import deque
+from typing import Dict, Iterable, List
+
+
+class KeywordMatcher:
+    """
+    Compiled set of keywords.
+    Matching is plain substring matching (the same as `kw in text`),
+    including overlapping keywords such as "lyrics" inside "no lyrics".
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = list(dict.fromkeys(keywords))
+
+        # Trie: goto[node] maps a character to the next node
+        goto = [{}]
+        fail = [0]
+        out = [()]
+
+        for idx, keyword in enumerate(self.keywords):
+            node = 0
+            for ch in keyword:
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[node][ch] = nxt
+                    goto.append({})
+                    fail.append(0)
+                    out.append(())
+                node = nxt
+            out[node] = out[node] + (idx,)
+
+        # Breadth-first pass to build failure links; every node's output also
+        # includes the keywords that end at its failure node
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in goto[node].items():
+                queue.append(child)
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[child] = goto[f].get(ch, 0)
+                out[child] = out[child] + out[fail[child]]
+
+        self._goto = goto
+        self._fail = fail
+        self._out = out
+
+    def find(self, text: str) -> set:
+        """Indices (into self.keywords) of every keyword present in text"""
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+
+        found = set()
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                found.update(out[node])
+        return found
+
+    def find_keywords(self, text: str) -> List[str]:
+        """Keywords present in text, in vocabulary order"""
+        return [self.keywords[idx] for idx in sorted(self.find(text))]
+
+
+class CategoryMatcher:
+    """
+    Matches several keyword maps ({category: [keywords]}) at once.
+    One pass over the text yields, for every map, how many distinct
+    keywords of each category occur.
+    """
+
+    def __init__(self, groups: Dict[str, Dict[str, list]]):
+        self.groups = groups
+
+        labels = {}
+        for group, keyword_map in groups.items():
+            for category, keywords in keyword_map.items():
+                for keyword in keywords:
+                    labels.setdefault(keyword, []).append((group, category))
+
+        self.matcher = KeywordMatcher(labels)
+        self._labels = [tuple(labels[kw]) for kw in self.matcher.keywords]
+
+    def count(self, text: str) -> Dict[str, Dict[str, int]]:
+        """Per-group, per-category count of distinct keywords found in text"""
+        counts = {group: {} for group in self.groups}
+        for idx in self.matcher.find(text):
+            for group, category in self._labels[idx]:
+                group_counts = counts[group]
+                group_counts[category] = group_counts.get(category, 0) + 1
+        return counts
+
+    def best(self, text: str) -> Dict[str, str]:
+        """Best category per group (None when nothing matched)"""
+        counts = self.count(text)
+        return {
+            group: best_category(counts[group], keyword_map)
+            for group, keyword_map in self.groups.items()
+        }
+
+
+def best_category(counts: Dict[str, int], keyword_map: dict):
+    """Category with the most hits; ties go to the one listed first in keyword_map"""
+    best_match = None
+    best_count = 0
+    for category in keyword_map:
+        count = counts.get(category, 0)
+        if count > best_count:
+            best_count = count
+            best_match = category
+    return best_match
@@ -3,6 +3,9 @@ Enhanced LLM Parser for Natural Language Mood Detection
 Uses keyword matching and sentiment analysis to interpret user's natural language input
 """
 
+from keyword_matcher import CategoryMatcher, KeywordMatcher, best_category
+from tracing import traced
+
 # Mood keywords mapping
 MOOD_KEYWORDS = {
     "racing": ["stressed", "anxious", "overwhelmed", "busy", "chaotic", "racing", "fast", "hyper", "energetic", "wired", "restless"],
@@ -52,22 +55,46 @@ ACTIVITY_PRESETS = {
 }
 
 
+# Compiled once at import: every keyword map is matched in one pass over the text
+KEYWORD_GROUPS = {
+    "mind_speed": MOOD_KEYWORDS,
+    "lyrics": LYRICS_KEYWORDS,
+    "context": CONTEXT_KEYWORDS,
+    "distraction": DISTRACTION_KEYWORDS
+}
+KEYWORD_MATCHER = CategoryMatcher(KEYWORD_GROUPS)
+ACTIVITY_MATCHER = KeywordMatcher(ACTIVITY_PRESETS)
+
+DEFAULTS = {
+    "mind_speed": "normal",
+    "lyrics": "sometimes",
+    "context": "alone",
+    "distraction": "medium"
+}
+
+
 def find_keyword_match(text: str, keyword_map: dict) -> str:
     """Find the best matching category based on keywords"""
-    text_lower = text.lower()
-    
-    best_match = None
-    best_count = 0
-    
-    for category, keywords in keyword_map.items():
-        count = sum(1 for kw in keywords if kw in text_lower)
-        if count > best_count:
-            best_count = count
-            best_match = category
-    
-    return best_match
+    for group, known_map in KEYWORD_GROUPS.items():
+        if known_map is keyword_map:
+            return best_category(KEYWORD_MATCHER.count(text.lower())[group], keyword_map)
+
+    # Ad-hoc map: compile it for this call
+    return CategoryMatcher({"map": keyword_map}).best(text.lower())["map"]
+
+
+def match_keywords(text: str) -> dict:
+    """Per-category keyword hit counts for every keyword map"""
+    return KEYWORD_MATCHER.count(text.lower())
 
 
+def find_activity(text: str):
+    """First activity preset (in ACTIVITY_PRESETS order) mentioned in text"""
+    matches = ACTIVITY_MATCHER.find(text.lower())
+    return ACTIVITY_MATCHER.keywords[min(matches)] if matches else None
+
+
+@traced()
 def parse_natural_language(text: str) -> dict:
     """
     Parse natural language input and extract mood parameters
@@ -76,22 +103,18 @@ def parse_natural_language(text: str) -> dict:
     text_lower = text.lower().strip()
     
     # Check for activity presets first
-    for activity, preset in ACTIVITY_PRESETS.items():
-        if activity in text_lower:
-            return {
-                "success": True,
-                "parsed": preset,
-                "matched_activity": activity,
-                "message": f"Found activity: {activity}"
-            }
+    activity = find_activity(text_lower)
+    if activity:
+        return {
+            "success": True,
+            "parsed": ACTIVITY_PRESETS[activity],
+            "matched_activity": activity,
+            "message": f"Found activity: {activity}"
+        }
     
-    # Try to parse individual components
-    parsed = {
-        "mind_speed": find_keyword_match(text, MOOD_KEYWORDS) or "normal",
-        "lyrics": find_keyword_match(text, LYRICS_KEYWORDS) or "sometimes",
-        "context": find_keyword_match(text, CONTEXT_KEYWORDS) or "alone",
-        "distraction": find_keyword_match(text, DISTRACTION_KEYWORDS) or "medium"
-    }
+    # Try to parse individual components (single pass over the text)
+    best = KEYWORD_MATCHER.best(text_lower)
+    parsed = {group: best[group] or DEFAULTS[group] for group in KEYWORD_GROUPS}
     
     return {
         "success": True,
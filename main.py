@@ -1,11 +1,14 @@
-import requests
 import base64
 import os
 from dotenv import load_dotenv
-from playlist_brain import build_search_query
 
 load_dotenv()
 
+from query_table import lookup as lookup_query
+from feature_store import feature_store, chunked
+from mood_scoring import rank_songs
+import spotify_http
+
 # ---------- SPOTIFY AUTH ----------
 def get_spotify_token():
     client_id = os.getenv("SPOTIFY_CLIENT_ID")
@@ -14,31 +17,34 @@ def get_spotify_token():
     auth_str = f"{client_id}:{client_secret}"
     b64_auth = base64.b64encode(auth_str.encode()).decode()
 
-    url = "https://accounts.spotify.com/api/token"
+    url = f"{spotify_http.ACCOUNTS_URL}/api/token"
     headers = {
         "Authorization": f"Basic {b64_auth}",
         "Content-Type": "application/x-www-form-urlencoded"
     }
     data = {"grant_type": "client_credentials"}
 
-    res = requests.post(url, headers=headers, data=data)
+    res = spotify_http.post(url, headers=headers, data=data)
     res.raise_for_status()
     return res.json()["access_token"]
 
 
 # ---------- SPOTIFY SEARCH ----------
-def search_spotify(query, token, limit=5):
+def search_spotify(query, token, limit=5, market=None):
     headers = {"Authorization": f"Bearer {token}"}
     params = {
         "q": query,
         "type": "track",
         "limit": limit
     }
+    if market:
+        params["market"] = market
 
-    url = "https://api.spotify.com/v1/search"
-    res = requests.get(url, headers=headers, params=params)
+    url = f"{spotify_http.API_URL}/v1/search"
+    res = spotify_http.get(url, headers=headers, params=params)
     res.raise_for_status()
-    return res.json()["tracks"]["items"]
+    # With a market, skip tracks that cannot be played there
+    return [t for t in res.json()["tracks"]["items"] if t.get("is_playable") is not False]
 
 
 # ---------- AUDIO FEATURES (SAFE) ----------
@@ -46,16 +52,24 @@ def get_audio_features(track_ids, token):
     if not track_ids:
         return []
 
-    url = "https://api.spotify.com/v1/audio-features"
+    # Only ask Spotify for tracks the local store has not seen yet
+    known = feature_store.get_many(track_ids)
+    missing = [tid for tid in dict.fromkeys(track_ids) if tid not in known]
+
+    url = f"{spotify_http.API_URL}/v1/audio-features"
     headers = {"Authorization": f"Bearer {token}"}
-    params = {"ids": ",".join(track_ids[:3])}  # safety limit
 
-    try:
-        res = requests.get(url, headers=headers, params=params)
-        res.raise_for_status()
-        return res.json()["audio_features"]
-    except:
-        return []
+    for batch in chunked(missing):
+        try:
+            res = spotify_http.get(url, headers=headers, params={"ids": ",".join(batch)})
+            res.raise_for_status()
+            fetched = dict(zip(batch, res.json()["audio_features"]))
+        except Exception:
+            continue
+        feature_store.put_many(fetched)
+        known.update(fetched)
+
+    return [known.get(tid) for tid in track_ids]
 
 
 # ---------- PROGRAM START ----------
@@ -66,32 +80,26 @@ lyrics = input("Do you want lyrics? (yes / sometimes / no): ").lower()
 context = input("Are you alone or with people? (alone / with people): ").lower()
 distraction = input("Distraction level? (low / medium / high): ").lower()
 
-search_query = build_search_query(
+entry = lookup_query(
     mind_speed,
     lyrics,
     context,
     distraction
 )
+search_query = entry.query
 
 print(f"\nSearching Spotify for: {search_query}\n")
 
 token = get_spotify_token()
-songs = search_spotify(search_query, token)
-
-track_ids = [s["id"] for s in songs if s.get("id")]
-features = get_audio_features(track_ids, token)
+songs = search_spotify(search_query, token, limit=20, market=entry.market)
 
-# ---------- FILTER ----------
-final_songs = []
+songs = [s for s in songs if s.get("id")]
+features = get_audio_features([s["id"] for s in songs], token)
 
-if lyrics == "no" and features:
-    for song, feat in zip(songs, features):
-        if feat and feat["instrumentalness"] > 0.7 and feat["speechiness"] < 0.3:
-            final_songs.append(song)
-else:
-    final_songs = songs
+# ---------- SCORE ----------
+final_songs = rank_songs(songs, features, mind_speed, lyrics, context, distraction, k=5)
 
 # ---------- OUTPUT ----------
 print("🎶 Songs List:\n")
-for i, song in enumerate(final_songs[:5], start=1):
+for i, song in enumerate(final_songs, start=1):
     print(f"{i}. {song['name']} — {song['artists'][0]['name']}")
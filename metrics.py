@@ -0,0 +1,243 @@
+"""
+Metrics
+Prometheus-style counters and latency histograms with a text /metrics
+exposition. No client library: every labelled series is a small object
+with preallocated bucket slots, updated in place without locks (all
+updates happen on the event loop thread).
+"""
+
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Tuple
+
+from starlette.responses import PlainTextResponse
+
+# Upper bounds in seconds: ~1 ms up to 10 s
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{str(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+# ---------- METRIC TYPES ----------
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class Counter:
+    """Monotonic counter, one series per label combination"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._children: Dict[tuple, _CounterChild] = {}
+
+    def labels(self, *values) -> _CounterChild:
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = _CounterChild()
+        return child
+
+    def inc(self, *values, amount: float = 1.0):
+        self.labels(*values).inc(amount)
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.label_names, values)} {_format_value(child.value)}"
+            for values, child in self._children.items()
+        ]
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: tuple):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)   # last slot is +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class Histogram:
+    """Latency histogram with fixed buckets, one series per label combination"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (),
+                 buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._children: Dict[tuple, _HistogramChild] = {}
+
+    def labels(self, *values) -> _HistogramChild:
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = _HistogramChild(self.buckets)
+        return child
+
+    def observe(self, value: float, *values):
+        self.labels(*values).observe(value)
+
+    def samples(self) -> List[str]:
+        lines = []
+        for values, child in self._children.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                le_label = f'le="{le}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, values, le_label)} {cumulative}")
+            labels = _format_labels(self.label_names, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Metrics plus collectors (callables read at scrape time, for counters kept elsewhere)"""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors: Dict[str, Callable[[], List[tuple]]] = {}
+
+    def counter(self, name: str, help_text: str, labels: Tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, help_text, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, labels: Tuple[str, ...] = (),
+                  buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, help_text, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, key: str, fn: Callable[[], List[tuple]]):
+        """
+        Register fn() -> [(name, kind, help, {label: value}, value), ...] under key;
+        registering the same key again replaces it.
+        """
+        self._collectors[key] = fn
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            samples = metric.samples()
+            if samples:
+                lines.append(f"# HELP {metric.name} {metric.help}")
+                lines.append(f"# TYPE {metric.name} {metric.kind}")
+                lines.extend(samples)
+
+        # Collectors may contribute to the same family; keep each family contiguous
+        families = {}
+        for collect in self._collectors.values():
+            for name, kind, help_text, labels, value in collect():
+                family = families.setdefault(name, [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"])
+                names = tuple(labels)
+                family.append(f"{name}{_format_labels(names, tuple(labels[n] for n in names))} {_format_value(value)}")
+        for family in families.values():
+            lines.extend(family)
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# ---------- STANDARD METRICS ----------
+HTTP_REQUESTS = registry.counter(
+    "http_requests_total", "HTTP requests by route, method and status", ("route", "method", "status"))
+HTTP_LATENCY = registry.histogram(
+    "http_request_duration_seconds", "Time to fully answer a request, by route", ("route",))
+STAGE_LATENCY = registry.histogram(
+    "pipeline_stage_duration_seconds", "Time spent in each playlist pipeline stage", ("stage",))
+UPSTREAM_REQUESTS = registry.counter(
+    "spotify_requests_total", "Spotify API calls by endpoint and status (every attempt)", ("endpoint", "status"))
+UPSTREAM_LATENCY = registry.histogram(
+    "spotify_request_duration_seconds", "Spotify API call latency by endpoint", ("endpoint",))
+UNPLAYABLE_DROPPED = registry.counter(
+    "spotify_unplayable_tracks_total", "Search results dropped as unplayable in the requested market", ("market",))
+
+
+def upstream_endpoint(url) -> str:
+    """Bounded label for a Spotify URL: the first two path segments (v1/search, api/token, v1/users)"""
+    path = str(url).split("://", 1)[-1].split("?", 1)[0]
+    segments = path.split("/")[1:3]
+    return "/".join(segments) or "/"
+
+
+def observe_upstream(url, status, seconds: float):
+    endpoint = upstream_endpoint(url)
+    UPSTREAM_REQUESTS.inc(endpoint, str(status))
+    UPSTREAM_LATENCY.observe(seconds, endpoint)
+
+
+def cache_collector(name: str, stats: Callable[[], dict], fields: Dict[str, str]):
+    """
+    Expose an existing stats() dict as counters, e.g.
+    cache_collector("search", search_cache.stats, {"hits": "hit", "misses": "miss"})
+    """
+    def collect():
+        current = stats()
+        return [
+            ("cache_requests_total", "counter", "Cache lookups by cache and result",
+             {"cache": name, "result": result}, current[field])
+            for field, result in fields.items()
+        ]
+    registry.collector(f"cache:{name}", collect)
+
+
+# ---------- ASGI ----------
+class MetricsMiddleware:
+    """Counts requests and records latency per route template (until the response body is sent)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Route template, or the mount prefix (e.g. /static); unmatched paths
+            # share one label so scanners cannot blow up cardinality
+            label = getattr(scope.get("route"), "path", None) or scope.get("root_path") or "unmatched"
+            HTTP_REQUESTS.inc(label, scope["method"], str(status))
+            HTTP_LATENCY.observe(time.perf_counter() - start, label)
+
+
+def metrics_response() -> PlainTextResponse:
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
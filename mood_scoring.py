@@ -0,0 +1,132 @@
+"""
+Mood Scoring
+Scores a whole pool of candidate tracks against a mood in one vectorized
+pass over their audio features. Targets and weights come from
+discover_mood and distraction_profile, the same rules that build the
+search query
+"""
+
+from functools import lru_cache
+from typing import List, Optional
+
+import numpy as np
+
+from distraction_control import distraction_profile
+from mood_discovery import discover_mood
+
+# Feature columns, all scaled to 0..1
+FEATURES = ("energy", "valence", "tempo", "instrumentalness", "speechiness")
+TEMPO = FEATURES.index("tempo")
+
+# Target energy / tempo / valence per discovered mood
+MOOD_TARGETS = {
+    "focus": {"energy": 0.8, "tempo": 0.75, "valence": 0.45},
+    "calm": {"energy": 0.25, "tempo": 0.3, "valence": 0.4},
+    "balanced": {"energy": 0.5, "tempo": 0.5, "valence": 0.5}
+}
+
+# Energy shift and energy weight per distraction profile
+ENERGY_PROFILES = {
+    "soft": (-0.15, 1.2),
+    "medium": (0.0, 1.0),
+    "high": (0.15, 1.2)
+}
+
+# (instrumentalness, speechiness, weight) per lyrics choice
+LYRICS_TARGETS = {
+    "no": (0.85, 0.04, 1.5),
+    "yes": (0.02, 0.1, 1.0),
+    "sometimes": (0.3, 0.06, 0.2)
+}
+# "sometimes" under a low-distraction profile leans instrumental
+LYRICS_SOFT_NONE = (0.6, 0.05, 0.6)
+
+# Score given to tracks Spotify has no audio features for (below any real score)
+MISSING_SCORE = -1.0
+
+
+# ---------- MOOD -> TARGET ----------
+@lru_cache(maxsize=256)
+def mood_profile(mind_speed: str, lyrics: str, context: str, distraction: str):
+    """Target feature vector and per-feature weights for a mood (memoized, read-only)"""
+    targets = MOOD_TARGETS[discover_mood(mind_speed, lyrics, context)]
+    profile = distraction_profile(distraction)
+    energy_shift, energy_weight = ENERGY_PROFILES[profile["energy"]]
+
+    # Lyrics stay user-controlled; the profile only tips "sometimes"
+    if lyrics == "sometimes" and profile["lyrics"] == "none":
+        instrumental, speech, lyrics_weight = LYRICS_SOFT_NONE
+    else:
+        instrumental, speech, lyrics_weight = LYRICS_TARGETS.get(lyrics, LYRICS_TARGETS["sometimes"])
+
+    if context == "with people":
+        valence, valence_weight = 0.7, 0.8
+    else:
+        valence, valence_weight = targets["valence"], 0.3
+
+    energy = min(max(targets["energy"] + energy_shift, 0.0), 1.0)
+    target = np.array([energy, valence, targets["tempo"], instrumental, speech], dtype=np.float32)
+    weights = np.array([energy_weight, valence_weight, 0.6, lyrics_weight, 0.5], dtype=np.float32)
+    target.flags.writeable = False
+    weights.flags.writeable = False
+    return target, weights
+
+
+# ---------- FEATURES -> ARRAYS ----------
+def normalize_tempo(bpm):
+    """BPM -> 0..1 (50 BPM and below is 0, 200 and above is 1)"""
+    return np.clip((bpm - 50.0) / 150.0, 0.0, 1.0)
+
+
+def feature_vector(features: dict) -> List[float]:
+    """Spotify audio features -> normalized vector in FEATURES order"""
+    row = [float(features.get(name) or 0.0) for name in FEATURES]
+    row[TEMPO] = float(normalize_tempo(row[TEMPO]))
+    return row
+
+
+def feature_matrix(features: List[Optional[dict]]) -> np.ndarray:
+    """(N, 5) float32 matrix in FEATURES order; rows without features are NaN"""
+    rows = [f or {} for f in features]
+    matrix = np.empty((len(rows), len(FEATURES)), dtype=np.float32)
+    # One column at a time: a flat list of floats converts far faster than nested rows
+    for column, name in enumerate(FEATURES):
+        matrix[:, column] = np.array([f.get(name) for f in rows], dtype=np.float32)
+    matrix[:, TEMPO] = normalize_tempo(matrix[:, TEMPO])
+    return matrix
+
+
+# ---------- SCORING ----------
+def score_matrix(matrix: np.ndarray, target: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """
+    Mood fit per row: 1 - weighted mean squared distance to the target,
+    so 1.0 is a perfect fit and 0.0 the worst possible one.
+    """
+    scores = 1.0 - (np.square(matrix - target) @ weights) / weights.sum()
+    return np.where(np.isnan(scores), MISSING_SCORE, scores)
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k best scores, best first; equal scores keep pool order"""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+
+    top = np.argpartition(-scores, k - 1)[:k]
+    # argpartition picks arbitrarily among scores equal to the cut-off;
+    # take those in pool (search rank) order instead
+    cutoff = scores[top].min()
+    above = top[scores[top] > cutoff]
+    ties = np.flatnonzero(scores == cutoff)[:k - len(above)]
+    top = np.concatenate((above, ties))
+    return top[np.lexsort((top, -scores[top]))]
+
+
+def rank_songs(songs: list, features: List[Optional[dict]], mind_speed: str, lyrics: str,
+               context: str, distraction: str, k: int) -> list:
+    """The k songs that best fit the mood; features are aligned with songs"""
+    if not songs:
+        return []
+    target, weights = mood_profile(mind_speed, lyrics, context, distraction)
+    scores = score_matrix(feature_matrix(features), target, weights)
+    return [songs[i] for i in top_k(scores, k)]
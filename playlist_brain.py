@@ -1,7 +1,9 @@
 from mood_discovery import discover_mood
 from distraction_control import distraction_profile
+from tracing import traced
 
 
+@traced()
 def build_search_query(mind_speed, lyrics, context, distraction):
     mood = discover_mood(mind_speed, lyrics, context)
     profile = distraction_profile(distraction)
@@ -0,0 +1,117 @@
+"""
+Search Query Planner
+Splits a mood + filters into several short Spotify queries, runs them
+concurrently with offset paging, and merges the results into one ranked,
+de-duplicated candidate pool
+"""
+
+import asyncio
+import math
+import os
+from typing import List, NamedTuple
+
+from spotify_api import search_spotify
+from track import Track
+
+# Spotify returns at most 50 tracks per search page
+SEARCH_PAGE_SIZE = 50
+# Largest candidate pool we collect for one playlist
+MAX_POOL_SIZE = int(os.getenv("MAX_POOL_SIZE", "200"))
+# Candidates fetched per requested song (room for scoring; unplayable
+# tracks are already dropped by a market-aware search)
+OVERFETCH = float(os.getenv("SEARCH_OVERFETCH", "1.5"))
+# Each sub-query asks for at least this many tracks (results overlap)
+MIN_PER_QUERY = 10
+# Concurrent search calls per playlist
+FANOUT_CONCURRENCY = int(os.getenv("FANOUT_CONCURRENCY", "8"))
+
+
+class SubQuery(NamedTuple):
+    text: str
+    weight: float
+
+
+def plan_queries(mood_query: str, language: str = "", genre: str = "", era: str = "") -> List[SubQuery]:
+    """
+    Break one long keyword string into shorter queries Spotify handles well.
+    The full query stays first (highest weight); each filter is then paired
+    with the mood on its own, and the filters are combined without the mood.
+    """
+    filters = [f for f in (language, genre, era) if f]
+    full = " ".join([mood_query] + filters)
+
+    plan = [SubQuery(full, 1.0)]
+    if filters:
+        for keywords in filters:
+            plan.append(SubQuery(f"{keywords} {mood_query}", 0.8))
+        if len(filters) > 1:
+            plan.append(SubQuery(" ".join(filters), 0.6))
+
+    # Drop duplicates (e.g. a single filter gives the same query twice)
+    seen = set()
+    unique = []
+    for sub in plan:
+        key = " ".join(sub.text.split())
+        if key and key not in seen:
+            seen.add(key)
+            unique.append(SubQuery(key, sub.weight))
+    return unique
+
+
+def candidate_pool_size(song_count: int) -> int:
+    """Candidate pool collected for a playlist of song_count songs"""
+    return min(math.ceil(song_count * OVERFETCH), MAX_POOL_SIZE)
+
+
+def page_requests(plan: List[SubQuery], pool_size: int) -> List[tuple]:
+    """(sub-query index, offset, limit) for every search page we need"""
+    pool_size = min(pool_size, MAX_POOL_SIZE)
+    per_query = min(max(math.ceil(pool_size / len(plan)), MIN_PER_QUERY), pool_size)
+    pages = []
+    for index in range(len(plan)):
+        for offset in range(0, per_query, SEARCH_PAGE_SIZE):
+            pages.append((index, offset, min(SEARCH_PAGE_SIZE, per_query - offset)))
+    return pages
+
+
+def rank_candidates(plan: List[SubQuery], results: List[List[Track]]) -> List[Track]:
+    """
+    Merge per-query result lists, de-duplicated by track ID.
+    Score is weighted reciprocal rank, summed over every query that found
+    the track, so tracks several queries agree on rise to the top.
+    """
+    scores = {}
+    tracks = {}
+    for sub, songs in zip(plan, results):
+        for rank, song in enumerate(songs):
+            track_id = song.id
+            scores[track_id] = scores.get(track_id, 0.0) + sub.weight / (rank + 1)
+            tracks.setdefault(track_id, song)
+
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    return [tracks[track_id] for track_id in ranked]
+
+
+async def fan_out_search(plan: List[SubQuery], token: str, pool_size: int, market: str = None) -> List[Track]:
+    """Run every page of every sub-query concurrently and return the ranked pool"""
+    pages = page_requests(plan, pool_size)
+    semaphore = asyncio.Semaphore(FANOUT_CONCURRENCY)
+
+    async def fetch(index, offset, limit):
+        async with semaphore:
+            return index, offset, await search_spotify(plan[index].text, token, limit=limit,
+                                                       market=market, offset=offset)
+
+    fetched = await asyncio.gather(*(fetch(*page) for page in pages), return_exceptions=True)
+
+    # Reassemble each sub-query's pages in offset order
+    results = [[] for _ in plan]
+    for outcome in sorted((f for f in fetched if not isinstance(f, Exception)), key=lambda f: f[:2]):
+        index, _, songs = outcome
+        results[index].extend(songs)
+    errors = [f for f in fetched if isinstance(f, Exception)]
+
+    # Only fail when nothing came back at all
+    if errors and not any(results):
+        raise errors[0]
+    return rank_candidates(plan, results)
@@ -0,0 +1,145 @@
+"""
+Query Table
+Every Spotify search the app can make, keyed by mood + filters.
+The input space is finite, so the mood keywords are computed once at
+import and each full combination is memoized on first use (or all at
+once with warm()); building a query is then a single dict lookup.
+"""
+
+import os
+import sys
+from itertools import product
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from playlist_brain import build_search_query
+from query_planner import SubQuery, plan_queries
+from tracing import traced
+
+# ---------- INPUT SPACE ----------
+MIND_SPEEDS = ("racing", "normal", "slow")
+LYRICS = ("yes", "sometimes", "no")
+CONTEXTS = ("alone", "with people")
+DISTRACTIONS = ("low", "medium", "high")
+
+LANGUAGES = {
+    "any": "",
+    "english": "",  # Default, no keyword needed
+    "hindi": "bollywood hindi",
+    "punjabi": "punjabi bhangra",
+    "tamil": "tamil kollywood",
+    "telugu": "telugu tollywood",
+    "korean": "kpop",
+    "spanish": "reggaeton spanish",
+    "japanese": "jpop japanese"
+}
+
+# Market codes for Spotify API - helps filter by region
+MARKETS = {
+    "any": None,
+    "english": "US",
+    "hindi": "IN",
+    "punjabi": "IN",
+    "tamil": "IN",
+    "telugu": "IN",
+    "korean": "KR",
+    "spanish": "MX",
+    "japanese": "JP"
+}
+
+# Market for languages without one ("any"); unset sends no market
+DEFAULT_MARKET = os.getenv("SPOTIFY_MARKET") or None
+
+GENRES = {
+    "any": "",
+    "pop": "pop",
+    "rock": "rock",
+    "hiphop": "hip hop rap",
+    "electronic": "electronic edm",
+    "classical": "classical",
+    "jazz": "jazz",
+    "rnb": "r&b soul",
+    "bollywood": "bollywood filmi",
+    "lofi": "lofi chill beats",
+    "metal": "metal"
+}
+
+ERAS = {
+    "any": "",
+    "90s": "90s 1990s",
+    "2000s": "2000s",
+    "2010s": "2010s",
+    "latest": "2023 2024 new"
+}
+
+
+class QueryEntry(NamedTuple):
+    query: str                      # full query, shown to the user
+    plan: Tuple[SubQuery, ...]      # short sub-queries actually sent
+    market: Optional[str]           # Spotify market the searches run in
+
+
+# Mood keywords for every mood combination, built once
+MOOD_KEYWORDS = {
+    mood: sys.intern(build_search_query(*mood))
+    for mood in product(MIND_SPEEDS, LYRICS, CONTEXTS, DISTRACTIONS)
+}
+
+_entries: Dict[tuple, QueryEntry] = {}
+
+
+# ---------- LOOKUP ----------
+def canonical_key(mind_speed: str, lyrics: str, context: str, distraction: str,
+                  language: str, genre: str, era: str) -> tuple:
+    """
+    Map values outside the known ones onto a known value that builds the
+    same query (the query logic treats anything unknown as the default).
+    """
+    return (
+        mind_speed if mind_speed in MIND_SPEEDS else "normal",
+        lyrics if lyrics in LYRICS else "sometimes",
+        context if context in CONTEXTS else "alone",
+        distraction if distraction in DISTRACTIONS else "medium",
+        language if language in LANGUAGES else "any",
+        genre if genre in GENRES else "any",
+        era if era in ERAS else "any"
+    )
+
+
+def build_entry(mind_speed: str, lyrics: str, context: str, distraction: str,
+                language: str, genre: str, era: str) -> QueryEntry:
+    mood_query = MOOD_KEYWORDS[(mind_speed, lyrics, context, distraction)]
+    filters = [LANGUAGES[language], GENRES[genre], ERAS[era]]
+    query = " ".join([mood_query] + [f for f in filters if f])
+    plan = plan_queries(mood_query, *filters)
+    return QueryEntry(
+        sys.intern(query),
+        tuple(SubQuery(sys.intern(s.text), s.weight) for s in plan),
+        MARKETS[language] or DEFAULT_MARKET
+    )
+
+
+@traced("query_lookup")
+def lookup(mind_speed: str, lyrics: str, context: str, distraction: str,
+           language: str = "any", genre: str = "any", era: str = "any") -> QueryEntry:
+    """Query and sub-query plan for a mood + filters"""
+    key = (mind_speed, lyrics, context, distraction, language, genre, era)
+    entry = _entries.get(key)
+    if entry is None:
+        # Only canonical keys are stored, so free-form input cannot grow the table
+        canonical = canonical_key(*key)
+        entry = _entries.get(canonical)
+        if entry is None:
+            entry = _entries[canonical] = build_entry(*canonical)
+    return entry
+
+
+def warm() -> int:
+    """Build every combination up front; returns the table size"""
+    for key in product(MIND_SPEEDS, LYRICS, CONTEXTS, DISTRACTIONS, LANGUAGES, GENRES, ERAS):
+        lookup(*key)
+    return len(_entries)
+
+
+def stats() -> dict:
+    return {"entries": len(_entries), "moods": len(MOOD_KEYWORDS)}
+
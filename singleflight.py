@@ -0,0 +1,56 @@
+"""
+Single-Flight Request Coalescing
+Identical concurrent calls share one execution; every caller gets its
+own copy of the result
+"""
+
+import asyncio
+import copy
+
+
+class SingleFlight:
+    """
+    Deduplicates in-flight async work by key.
+    The first caller for a key runs the work; callers arriving while it is
+    still running wait for that result instead of starting their own.
+    """
+
+    def __init__(self, clone=copy.deepcopy):
+        self.clone = clone
+        self._calls = {}   # key -> asyncio.Task
+
+        self.executions = 0
+        self.coalesced = 0
+        self.in_flight_peak = 0
+
+    async def do(self, key, fn):
+        """Run `await fn()` once per key among concurrent callers"""
+        loop = asyncio.get_running_loop()
+        task = self._calls.get(key)
+
+        if task is not None and not task.done() and task.get_loop() is loop:
+            self.coalesced += 1
+            # Followers get a private copy so nobody can mutate a shared result
+            return self.clone(await asyncio.shield(task))
+
+        task = loop.create_task(fn())
+        self._calls[key] = task
+        self.executions += 1
+        self.in_flight_peak = max(self.in_flight_peak, len(self._calls))
+        task.add_done_callback(lambda t: self._forget(key, t))
+        # The leader gets a copy too, so followers still waiting clone an untouched result
+        return self.clone(await asyncio.shield(task))
+
+    def _forget(self, key, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+    def stats(self) -> dict:
+        requests = self.executions + self.coalesced
+        return {
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._calls),
+            "in_flight_peak": self.in_flight_peak,
+            "coalesce_ratio": round(self.coalesced / requests, 4) if requests else 0.0
+        }
@@ -0,0 +1,319 @@
+"""
+Spotify Account Routes (Vercel entry point)
+Cookie-based login/callback/logout, /api/me and saving playlists to the
+user's account. api/index.py includes `router`.
+"""
+
+import asyncio
+import base64
+import os
+import random
+import urllib.parse
+from typing import List, Optional
+
+import httpx
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import JSONResponse, RedirectResponse
+from pydantic import BaseModel
+
+import spotify_http
+from upstream_limiter import UpstreamOverloaded
+
+router = APIRouter()
+
+
+# ---------- SPOTIFY OAUTH (Cookie-based for Vercel) ----------
+REDIRECT_URI = os.getenv("SPOTIFY_REDIRECT_URI", "https://moodtunes-sigma.vercel.app/callback")
+SCOPES = "playlist-modify-public playlist-modify-private user-read-private"
+
+
+@router.get("/login")
+async def spotify_login():
+    """Redirect to Spotify authorization"""
+    client_id = os.getenv("SPOTIFY_CLIENT_ID")
+    
+    auth_url = (
+        f"{spotify_http.ACCOUNTS_URL}/authorize?"
+        f"client_id={client_id}&"
+        f"response_type=code&"
+        f"redirect_uri={urllib.parse.quote(REDIRECT_URI)}&"
+        f"scope={urllib.parse.quote(SCOPES)}"
+    )
+    
+    return RedirectResponse(url=auth_url)
+
+
+@router.get("/callback")
+async def spotify_callback(code: str = None, error: str = None):
+    """Handle Spotify OAuth callback - store token in cookie"""
+    
+    if error:
+        return RedirectResponse(url="/?error=auth_failed")
+    
+    if not code:
+        return RedirectResponse(url="/?error=no_code")
+    
+    # Exchange code for tokens
+    client_id = os.getenv("SPOTIFY_CLIENT_ID")
+    client_secret = os.getenv("SPOTIFY_CLIENT_SECRET")
+    
+    auth_str = f"{client_id}:{client_secret}"
+    b64_auth = base64.b64encode(auth_str.encode()).decode()
+    
+    token_url = f"{spotify_http.ACCOUNTS_URL}/api/token"
+    headers = {
+        "Authorization": f"Basic {b64_auth}",
+        "Content-Type": "application/x-www-form-urlencoded"
+    }
+    data = {
+        "grant_type": "authorization_code",
+        "code": code,
+        "redirect_uri": REDIRECT_URI
+    }
+    
+    try:
+        res = await spotify_http.apost(token_url, headers=headers, data=data)
+        res.raise_for_status()
+        tokens = res.json()
+        
+        # Get user profile
+        user_headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+        user_res = await spotify_http.aget(f"{spotify_http.API_URL}/v1/me", headers=user_headers)
+        user_data = user_res.json()
+        
+        user_id = user_data.get("id", "default")
+        display_name = user_data.get("display_name", "User")
+        access_token = tokens["access_token"]
+        
+        # Create response with cookies
+        response = RedirectResponse(url=f"/?logged_in={user_id}&name={urllib.parse.quote(display_name)}")
+        
+        # Set HTTP-only cookies (secure in production)
+        response.set_cookie(
+            key="spotify_token",
+            value=access_token,
+            httponly=True,
+            secure=True,
+            samesite="lax",
+            max_age=3600  # 1 hour
+        )
+        response.set_cookie(
+            key="spotify_user",
+            value=user_id,
+            httponly=False,  # JS can read this
+            secure=True,
+            samesite="lax",
+            max_age=3600
+        )
+        response.set_cookie(
+            key="spotify_name",
+            value=display_name,
+            httponly=False,
+            secure=True,
+            samesite="lax",
+            max_age=3600
+        )
+        
+        return response
+        
+    except Exception as e:
+        return RedirectResponse(url=f"/?error={str(e)}")
+
+
+@router.get("/api/me")
+async def get_current_user(request: Request):
+    """Get logged in user info from cookie"""
+    user_id = request.cookies.get("spotify_user")
+    display_name = request.cookies.get("spotify_name")
+    token = request.cookies.get("spotify_token")
+    
+    if user_id and token:
+        return {
+            "logged_in": True,
+            "user_id": user_id,
+            "display_name": display_name or "User"
+        }
+    return {"logged_in": False}
+
+
+# ---------- SAVE PLAYLIST ----------
+# Spotify accepts at most this many URIs per add-tracks call
+ADD_TRACKS_CHUNK = 100
+# Spotify's playlist size limit
+MAX_PLAYLIST_TRACKS = 10000
+# Attempts per chunk on a 5xx (429s are retried by the HTTP layer)
+SAVE_CHUNK_ATTEMPTS = int(os.getenv("SAVE_CHUNK_ATTEMPTS", "3"))
+# Base delay (s) before resending a chunk; doubles per attempt, fully jittered
+SAVE_CHUNK_BACKOFF = float(os.getenv("SAVE_CHUNK_BACKOFF", "0.5"))
+
+
+class SavePlaylistRequest(BaseModel):
+    playlist_name: str
+    track_ids: List[str]
+    # Resume a partial save: the playlist returned earlier and how many tracks it already has
+    playlist_id: Optional[str] = None
+    start: int = 0
+
+
+class ChunkFailed(Exception):
+    def __init__(self, added: int, message: str, headers: Optional[dict] = None):
+        super().__init__(message)
+        self.added = added
+        self.headers = headers
+
+
+async def playlist_length(playlist_id: str, headers: dict) -> Optional[int]:
+    """Current track count of a playlist, or None if it cannot be read"""
+    url = f"{spotify_http.API_URL}/v1/playlists/{playlist_id}/tracks"
+    try:
+        res = await spotify_http.aget(url, headers=headers, params={"fields": "total", "limit": 1})
+        res.raise_for_status()
+        return res.json()["total"]
+    except (httpx.HTTPError, UpstreamOverloaded, KeyError, ValueError):
+        return None
+
+
+async def resume_playlist(playlist_id: str, user_id: str, headers: dict) -> dict:
+    """The playlist a resumed save appends to, checked with one GET: it must exist and be the user's"""
+    url = f"{spotify_http.API_URL}/v1/playlists/{urllib.parse.quote(playlist_id, safe='')}"
+    res = await spotify_http.aget(url, headers=headers, params={"fields": "id,owner(id),external_urls"})
+    if res.status_code == 401:
+        raise HTTPException(status_code=401, detail="Session expired. Please login again.")
+    if res.status_code in (400, 404):
+        raise HTTPException(status_code=404, detail="Playlist not found")
+    res.raise_for_status()
+    playlist = res.json()
+    if (playlist.get("owner") or {}).get("id") != user_id:
+        raise HTTPException(status_code=403, detail="Playlist belongs to another account")
+    return playlist
+
+
+def chunk_backoff(attempt: int) -> float:
+    """Seconds to wait before resending a chunk after `attempt` failed tries"""
+    return random.uniform(0, SAVE_CHUNK_BACKOFF * (2 ** attempt))
+
+
+async def add_tracks_in_order(playlist_id: str, track_uris: List[str], headers: dict, start: int = 0) -> int:
+    """
+    Append track_uris[start:] in 100-URI chunks, one after another at explicit
+    positions so the playlist keeps the requested order. Returns the number
+    of tracks in place; raises ChunkFailed with the progress so far when a
+    resend could succeed (5xx, transport errors, 429, shedding) and
+    HTTPException when Spotify refuses the request itself (other 4xx).
+    """
+    add_url = f"{spotify_http.API_URL}/v1/playlists/{playlist_id}/tracks"
+    added = start
+    for offset in range(start, len(track_uris), ADD_TRACKS_CHUNK):
+        chunk = track_uris[offset:offset + ADD_TRACKS_CHUNK]
+        error = None
+        for attempt in range(SAVE_CHUNK_ATTEMPTS):
+            try:
+                res = await spotify_http.apost(add_url, headers=headers, json={"uris": chunk, "position": offset})
+            except httpx.HTTPError as e:
+                res, error = None, str(e)
+            except UpstreamOverloaded as e:
+                # Shed by our own limiter before anything was sent: stop here with resumable progress
+                raise ChunkFailed(added, e.detail, e.headers)
+            if res is not None and res.status_code < 400:
+                error = None
+                break
+            if res is not None:
+                if res.status_code == 401:
+                    raise HTTPException(status_code=401, detail="Session expired. Please login again.")
+                error = f"Spotify answered {res.status_code}"
+                if res.status_code == 429:
+                    break   # already retried by the HTTP layer; the client may resume later
+                if res.status_code < 500:
+                    # Resending would be refused the same way: terminal, not resumable progress
+                    raise HTTPException(status_code=res.status_code,
+                                        detail=f"Spotify refused the tracks ({res.status_code}); the playlist was not completed")
+            # Spotify is already failing: back off before calling it again
+            if attempt + 1 < SAVE_CHUNK_ATTEMPTS:
+                await asyncio.sleep(chunk_backoff(attempt))
+            # The failed call may still have been applied; check before resending so nothing is added twice
+            if (await playlist_length(playlist_id, headers) or 0) >= offset + len(chunk):
+                error = None
+                break
+        if error:
+            raise ChunkFailed(added, error)
+        added = offset + len(chunk)
+    return added
+
+
+@router.post("/api/save-playlist")
+async def save_playlist(req: SavePlaylistRequest, request: Request):
+    """Save playlist to user's Spotify account using cookie token"""
+    
+    access_token = request.cookies.get("spotify_token")
+    spotify_user_id = request.cookies.get("spotify_user")
+    
+    if not access_token or not spotify_user_id:
+        raise HTTPException(status_code=401, detail="Not logged in. Please login with Spotify first.")
+    
+    if len(req.track_ids) > MAX_PLAYLIST_TRACKS:
+        raise HTTPException(status_code=400, detail=f"A playlist can hold at most {MAX_PLAYLIST_TRACKS} tracks")
+    if not 0 <= req.start <= len(req.track_ids) or (req.start and not req.playlist_id):
+        raise HTTPException(status_code=400, detail="start must point into track_ids of an existing playlist_id")
+    
+    headers = {"Authorization": f"Bearer {access_token}", "Content-Type": "application/json"}
+    
+    try:
+        if req.playlist_id:
+            # Resuming: only append to an existing playlist of this user
+            playlist = await resume_playlist(req.playlist_id, spotify_user_id, headers)
+            playlist_id = playlist["id"]
+            playlist_url = playlist["external_urls"]["spotify"]
+        else:
+            # Create playlist
+            create_url = f"{spotify_http.API_URL}/v1/users/{spotify_user_id}/playlists"
+            create_data = {
+                "name": req.playlist_name,
+                "description": "Created by MoodTunes AI 🎵",
+                "public": True
+            }
+            
+            create_res = await spotify_http.apost(create_url, headers=headers, json=create_data)
+            
+            if create_res.status_code == 401:
+                raise HTTPException(status_code=401, detail="Session expired. Please login again.")
+            
+            create_res.raise_for_status()
+            playlist = create_res.json()
+            playlist_id = playlist["id"]
+            playlist_url = playlist["external_urls"]["spotify"]
+        
+        # Add tracks
+        track_uris = [f"spotify:track:{tid}" for tid in req.track_ids]
+        added = await add_tracks_in_order(playlist_id, track_uris, headers, req.start)
+        
+        return {
+            "success": True,
+            "playlist_id": playlist_id,
+            "playlist_url": playlist_url,
+            "tracks_added": added,
+            "tracks_total": len(track_uris),
+            "message": f"Playlist '{req.playlist_name}' saved to Spotify!"
+        }
+    
+    except ChunkFailed as e:
+        # Partial save: report progress so the client can resume with playlist_id + start
+        return JSONResponse(status_code=502, content={
+            "success": False,
+            "detail": f"Saved {e.added} of {len(req.track_ids)} tracks before Spotify failed: {e}",
+            "playlist_id": playlist_id,
+            "playlist_url": playlist_url,
+            "tracks_added": e.added,
+            "tracks_total": len(req.track_ids)
+        }, headers=e.headers)
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=500, detail=f"Failed to save playlist: {str(e)}")
+
+
+@router.get("/logout")
+async def logout():
+    """Logout user by clearing cookies"""
+    response = RedirectResponse(url="/")
+    response.delete_cookie("spotify_token")
+    response.delete_cookie("spotify_user")
+    response.delete_cookie("spotify_name")
+    return response
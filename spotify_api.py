@@ -0,0 +1,160 @@
+"""
+Spotify Web API Calls
+Async token, search and audio-feature helpers shared by all entry points
+"""
+
+import asyncio
+import os
+from typing import List
+
+import httpx
+from fastapi import HTTPException
+
+import spotify_http
+from spotify_auth import token_manager, SpotifyCredentialsError
+from ttl_cache import TTLCache
+from feature_store import feature_store, chunked
+from tracing import traced
+from metrics import UNPLAYABLE_DROPPED
+from track import Track
+
+SEARCH_URL = f"{spotify_http.API_URL}/v1/search"
+AUDIO_FEATURES_URL = f"{spotify_http.API_URL}/v1/audio-features"
+
+# ---------- SEARCH CACHE ----------
+# Queries come from a small, finite set of mood/filter combinations, so
+# popular presets are served without a round trip to /v1/search.
+search_cache = TTLCache(
+    maxsize=int(os.getenv("SEARCH_CACHE_SIZE", "2048")),
+    ttl=float(os.getenv("SEARCH_CACHE_TTL", "900")),
+    stale_ttl=float(os.getenv("SEARCH_CACHE_STALE_TTL", "300")),
+    max_bytes=int(os.getenv("SEARCH_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+)
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase and collapse whitespace so equivalent queries share a cache entry"""
+    return " ".join(query.lower().split())
+
+
+def search_cache_key(query: str, market: str = None, limit: int = 5, offset: int = 0) -> tuple:
+    return (normalize_query(query), market, limit, offset)
+
+
+@traced()
+async def get_spotify_token() -> str:
+    """Get Spotify access token using client credentials (cached per process)"""
+    try:
+        return await token_manager.get_token()
+    except SpotifyCredentialsError:
+        raise HTTPException(status_code=500, detail="Spotify credentials not configured")
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=500, detail=f"Spotify auth failed: {str(e)}")
+
+
+async def authorized_get(url: str, token: str, params: dict) -> httpx.Response:
+    """
+    GET with the app token. A 401 means Spotify no longer accepts it
+    (revoked, or the secret was rotated): drop it and retry once with a new one.
+    """
+    res = await spotify_http.aget(url, headers={"Authorization": f"Bearer {token}"}, params=params)
+    if res.status_code == 401:
+        token_manager.invalidate(token)
+        token = await get_spotify_token()
+        res = await spotify_http.aget(url, headers={"Authorization": f"Bearer {token}"}, params=params)
+    return res
+
+
+def format_track(track: dict) -> Track:
+    """Reduce a Spotify track object to the fields the frontend uses"""
+    return Track.from_spotify(track)
+
+
+@traced()
+async def search_spotify(query: str, token: str, limit: int = 5, market: str = None,
+                         offset: int = 0) -> List[Track]:
+    """Search Spotify for tracks matching the query (served from cache when possible)"""
+    key = search_cache_key(query, market, limit, offset)
+    songs = await search_cache.get_or_load(key, lambda: fetch_search(query, token, limit, market, offset))
+    return list(songs)
+
+
+async def fetch_search(query: str, token: str, limit: int = 5, market: str = None,
+                       offset: int = 0) -> tuple:
+    """Uncached Spotify search"""
+    params = {
+        "q": query,
+        "type": "track",
+        "limit": limit
+    }
+    if offset:
+        params["offset"] = offset
+    if market:
+        params["market"] = market
+
+    try:
+        res = await authorized_get(SEARCH_URL, token, params)
+        res.raise_for_status()
+        tracks = res.json()["tracks"]["items"]
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=500, detail=f"Spotify search failed: {str(e)}")
+
+    # With a market, Spotify flags tracks that cannot be played there; drop
+    # them here so they never take a cached candidate slot
+    playable = tuple(format_track(track) for track in tracks if track.get("is_playable") is not False)
+    if len(playable) < len(tracks):
+        UNPLAYABLE_DROPPED.inc(market or "none", amount=len(tracks) - len(playable))
+    return playable
+
+
+@traced()
+async def get_audio_features(track_ids: List[str], token: str) -> List[dict]:
+    """
+    Get audio features for filtering, aligned with track_ids (None where unknown).
+    Known tracks come from the local feature store; only the rest are fetched,
+    in batches of up to 100 IDs.
+    """
+    if not track_ids:
+        return []
+
+    known = {tid: feat async for tid, feat in iter_audio_features(track_ids, token)}
+    return [known.get(tid) for tid in track_ids]
+
+
+async def iter_audio_features(track_ids: List[str], token: str):
+    """
+    Yield (track_id, features) for every distinct ID as soon as it is known:
+    stored features first, then each fetched batch as it arrives.
+    Features are None when Spotify has none or the fetch failed.
+    """
+    known = await feature_store.aget_many(track_ids)
+    for track_id, feat in known.items():
+        yield track_id, feat
+
+    missing = [tid for tid in dict.fromkeys(track_ids) if tid not in known]
+    if not missing:
+        return
+
+    async def fetch(batch):
+        return batch, await fetch_audio_features(batch, token)
+
+    for next_batch in asyncio.as_completed([fetch(batch) for batch in chunked(missing)]):
+        batch, fetched = await next_batch
+        for track_id in batch:
+            yield track_id, fetched.get(track_id)
+
+
+async def fetch_audio_features(track_ids: List[str], token: str) -> dict:
+    """Uncached /v1/audio-features call for up to 100 IDs; results are written to the store"""
+    params = {"ids": ",".join(track_ids)}
+
+    try:
+        res = await authorized_get(AUDIO_FEATURES_URL, token, params)
+        res.raise_for_status()
+        features = res.json()["audio_features"]
+    except Exception:
+        return {}
+
+    fetched = dict(zip(track_ids, features))
+    await feature_store.aput_many(fetched)
+    return fetched
@@ -0,0 +1,197 @@
+"""
+Spotify Token Manager
+Caches the client-credentials access token for the whole process and
+refreshes it shortly before it expires. Optionally (SPOTIFY_TOKEN_SNAPSHOT)
+the token is also kept in a snapshot file, so a restarted process on the
+same host reuses it instead of fetching one on its first request.
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import time
+from typing import Optional
+
+import spotify_http
+
+TOKEN_URL = f"{spotify_http.ACCOUNTS_URL}/api/token"
+
+# Refresh in the background once the token has less than this many seconds left
+REFRESH_MARGIN = 60
+# Never hand out a token with less than this many seconds left
+EXPIRY_SAFETY = 10
+# Token snapshot file shared by processes on this host; unset (default) keeps
+# the bearer token in memory only
+TOKEN_SNAPSHOT = os.getenv("SPOTIFY_TOKEN_SNAPSHOT") or None
+
+
+class SpotifyCredentialsError(Exception):
+    """Raised when SPOTIFY_CLIENT_ID / SPOTIFY_CLIENT_SECRET are missing"""
+
+
+class SpotifyTokenManager:
+    """
+    Process-wide cache for the client-credentials token.
+    Concurrent callers share a single in-flight fetch, and a token that is
+    close to expiry is renewed in the background while the old one is
+    still being served.
+    """
+
+    def __init__(self, refresh_margin: int = REFRESH_MARGIN, snapshot_path: Optional[str] = None):
+        self.refresh_margin = refresh_margin
+        self.snapshot_path = snapshot_path or None
+
+        self._token = None
+        self._expires_at = 0.0
+        self._inflight = None
+
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.background_refreshes = 0
+        self.failures = 0
+        self.invalidations = 0
+        self.restored = False
+
+    # ---------- PUBLIC ----------
+    async def get_token(self) -> str:
+        """Return a valid access token, fetching one only if needed"""
+        now = time.time()
+        if self._token and now < self._expires_at - EXPIRY_SAFETY:
+            self.hits += 1
+            if now >= self._expires_at - self.refresh_margin:
+                self._start_refresh(background=True)
+            return self._token
+
+        self.misses += 1
+        return await asyncio.shield(self._start_refresh())
+
+    def invalidate(self, token: Optional[str] = None):
+        """
+        Drop the cached token (e.g. after Spotify answers 401) and its snapshot.
+        With `token`, only if it is still the current one, so a token that
+        another caller already replaced is kept.
+        """
+        if token is not None and token != self._token:
+            return
+        self.invalidations += 1
+        self._token = None
+        self._expires_at = 0.0
+        if self.snapshot_path:
+            try:
+                os.remove(self.snapshot_path)
+            except OSError:
+                pass
+
+    def load_snapshot(self) -> bool:
+        """
+        Adopt the token from the snapshot file if it was issued for the same
+        credentials and still has more than refresh_margin left.
+        """
+        if not self.snapshot_path or self._token:
+            return False
+        try:
+            with open(self.snapshot_path) as f:
+                saved = json.load(f)
+            token, expires_at = saved["access_token"], float(saved["expires_at"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+        if saved.get("owner") != self._owner() or expires_at - time.time() <= self.refresh_margin:
+            return False
+        self._token = token
+        self._expires_at = expires_at
+        self.restored = True
+        return True
+
+    def stats(self) -> dict:
+        """Counters for monitoring"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "background_refreshes": self.background_refreshes,
+            "failures": self.failures,
+            "invalidations": self.invalidations,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "restored": self.restored,
+            "expires_in": max(0, int(self._expires_at - time.time())) if self._token else 0
+        }
+
+    # ---------- INTERNALS ----------
+    def _start_refresh(self, background: bool = False) -> asyncio.Task:
+        """Return the in-flight refresh task, starting one if none is running"""
+        loop = asyncio.get_running_loop()
+        task = self._inflight
+        if task is None or task.done() or task.get_loop() is not loop:
+            task = loop.create_task(self._refresh(background))
+            self._inflight = task
+        return task
+
+    async def _refresh(self, background: bool) -> str:
+        try:
+            access_token, expires_in = await self._fetch()
+        except Exception:
+            self.failures += 1
+            if background:
+                # Keep serving the current token; callers refresh on demand once it expires
+                return self._token
+            raise
+
+        self._token = access_token
+        self._expires_at = time.time() + expires_in
+        self.refreshes += 1
+        if background:
+            self.background_refreshes += 1
+        self._save_snapshot()
+        return access_token
+
+    @staticmethod
+    def _owner() -> str:
+        """Which credentials and token endpoint a snapshot belongs to (rotating the secret orphans it)"""
+        owner = f"{TOKEN_URL}|{os.getenv('SPOTIFY_CLIENT_ID')}|{os.getenv('SPOTIFY_CLIENT_SECRET')}"
+        return hashlib.sha256(owner.encode()).hexdigest()[:16]
+
+    def _save_snapshot(self):
+        """Best effort: a read-only or missing directory just means no snapshot"""
+        if not self.snapshot_path:
+            return
+        tmp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        try:
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w") as f:
+                json.dump({"owner": self._owner(), "access_token": self._token, "expires_at": self._expires_at}, f)
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    async def _fetch(self):
+        client_id = os.getenv("SPOTIFY_CLIENT_ID")
+        client_secret = os.getenv("SPOTIFY_CLIENT_SECRET")
+
+        if not client_id or not client_secret:
+            raise SpotifyCredentialsError("Spotify credentials not configured")
+
+        auth_str = f"{client_id}:{client_secret}"
+        b64_auth = base64.b64encode(auth_str.encode()).decode()
+
+        headers = {
+            "Authorization": f"Basic {b64_auth}",
+            "Content-Type": "application/x-www-form-urlencoded"
+        }
+        data = {"grant_type": "client_credentials"}
+
+        res = await spotify_http.apost(TOKEN_URL, headers=headers, data=data)
+        res.raise_for_status()
+        payload = res.json()
+        return payload["access_token"], int(payload.get("expires_in", 3600))
+
+
+# Shared instance used by all entry points
+token_manager = SpotifyTokenManager(snapshot_path=TOKEN_SNAPSHOT)
+token_manager.load_snapshot()
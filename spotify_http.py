@@ -0,0 +1,240 @@
+"""
+Shared HTTP Layer for Spotify
+Pooled, keep-alive clients (blocking and async) with per-call timeouts
+and retry/backoff; async calls share the upstream rate/concurrency limiter.
+The blocking client (requests/urllib3) is only imported when first used,
+so the servers, which only use the async client, do not load it.
+"""
+
+import asyncio
+import functools
+import os
+import threading
+import time
+
+import httpx
+
+from metrics import observe_upstream
+from upstream_limiter import upstream_limiter
+
+# ---------- CONFIGURATION ----------
+POOL_SIZE = int(os.getenv("SPOTIFY_POOL_SIZE", "20"))
+CONNECT_TIMEOUT = float(os.getenv("SPOTIFY_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT = float(os.getenv("SPOTIFY_READ_TIMEOUT", "10"))
+MAX_RETRIES = int(os.getenv("SPOTIFY_MAX_RETRIES", "3"))
+BACKOFF_FACTOR = float(os.getenv("SPOTIFY_BACKOFF_FACTOR", "0.3"))
+# Longest Retry-After we are willing to sleep through inside a request
+MAX_RETRY_AFTER = float(os.getenv("SPOTIFY_MAX_RETRY_AFTER", "10"))
+# Base URLs; point these at a local stand-in (benchmarks/fake_spotify.py) to run offline
+API_URL = os.getenv("SPOTIFY_API_URL", "https://api.spotify.com").rstrip("/")
+ACCOUNTS_URL = os.getenv("SPOTIFY_ACCOUNTS_URL", "https://accounts.spotify.com").rstrip("/")
+
+DEFAULT_TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+
+@functools.lru_cache(maxsize=None)
+def retry_class():
+    """SpotifyRetry, built on first use (it subclasses urllib3's Retry)"""
+    from urllib3.util.retry import Retry
+
+    class SpotifyRetry(Retry):
+        """
+        Retry policy for Spotify calls.
+        429 is always safe to retry (the request was rejected, not processed);
+        5xx is only retried for idempotent methods so we never create a playlist twice.
+        """
+
+        def is_retry(self, method, status_code, has_retry_after=False):
+            if status_code == 429:
+                return self.total is None or self.total > 0
+            if method.upper() not in IDEMPOTENT_METHODS:
+                return False
+            return super().is_retry(method, status_code, has_retry_after)
+
+        def parse_retry_after(self, retry_after):
+            return min(super().parse_retry_after(retry_after), MAX_RETRY_AFTER)
+
+    return SpotifyRetry
+
+
+def create_session(pool_size: int = POOL_SIZE, max_retries: int = MAX_RETRIES):
+    """Build a requests session with a connection pool and retry policy"""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    retry = retry_class()(
+        total=max_retries,
+        connect=max_retries,
+        read=0,
+        status=max_retries,
+        backoff_factor=BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=None,
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+# ---------- SHARED SESSION ----------
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Return the process-wide session, creating it on first use"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_session()
+    return _session
+
+
+def request(method: str, url: str, timeout=None, **kwargs):
+    """Send a request through the shared session (always with a timeout)"""
+    start = time.perf_counter()
+    status = "error"
+    try:
+        res = get_session().request(method, url, timeout=timeout or DEFAULT_TIMEOUT, **kwargs)
+        status = res.status_code
+        return res
+    finally:
+        observe_upstream(url, status, time.perf_counter() - start)
+
+
+def get(url: str, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+# ---------- ASYNC CLIENT ----------
+# The async client is bound to the event loop it was created on, so it is
+# rebuilt if a different loop (e.g. a new test client) starts using it.
+_async_client = None
+_async_loop = None
+_async_transport = None
+
+
+def create_async_client(pool_size: int = POOL_SIZE, transport=None) -> httpx.AsyncClient:
+    """Build an async client with a keep-alive connection pool"""
+    limits = httpx.Limits(
+        max_connections=pool_size,
+        max_keepalive_connections=pool_size,
+        keepalive_expiry=30
+    )
+    timeout = httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT)
+    return httpx.AsyncClient(limits=limits, timeout=timeout, transport=transport)
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Return the async client for the running event loop"""
+    global _async_client, _async_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_loop is not loop or _async_client.is_closed:
+        _async_client = create_async_client(transport=_async_transport)
+        _async_loop = loop
+    return _async_client
+
+
+def set_async_transport(transport):
+    """Swap the transport used by the async client (fakes, benchmarks)"""
+    global _async_client, _async_transport
+    _async_transport = transport
+    _async_client = None
+
+
+async def aclose():
+    """Close the async client (called on app shutdown)"""
+    global _async_client
+    if _async_client is not None and _async_loop is asyncio.get_running_loop():
+        await _async_client.aclose()
+    _async_client = None
+
+
+def _retry_after(response) -> float:
+    """Retry-After in seconds (capped), or None when absent or unparseable"""
+    retry_after = response.headers.get("Retry-After")
+    if retry_after:
+        try:
+            return min(max(float(retry_after), 0.0), MAX_RETRY_AFTER)
+        except ValueError:
+            pass
+    return None
+
+
+def _retry_delay(attempt: int, response=None) -> float:
+    """Seconds to wait before the next attempt, honouring Retry-After"""
+    if response is not None:
+        retry_after = _retry_after(response)
+        if retry_after is not None:
+            return retry_after
+    return BACKOFF_FACTOR * (2 ** attempt)
+
+
+async def arequest(method: str, url: str, timeout=None, **kwargs) -> httpx.Response:
+    """
+    Send a request through the shared async client.
+    Every attempt takes a slot from the upstream limiter (which may answer
+    503 right away when Spotify capacity is exhausted). Same retry policy as
+    SpotifyRetry: 429 and connection failures are retried for any method,
+    5xx only for idempotent ones; a 429 pauses the limiter for everyone.
+    """
+    client = get_async_client()
+    if timeout is not None:
+        kwargs["timeout"] = timeout
+    idempotent = method.upper() in IDEMPOTENT_METHODS
+
+    attempt = 0
+    while True:
+        await upstream_limiter.acquire()
+        start = time.perf_counter()
+        try:
+            res = await client.request(method, url, **kwargs)
+        except (httpx.ConnectError, httpx.ConnectTimeout):
+            observe_upstream(url, "error", time.perf_counter() - start)
+            upstream_limiter.release()
+            if attempt >= MAX_RETRIES:
+                raise
+            await asyncio.sleep(_retry_delay(attempt))
+            attempt += 1
+            continue
+        except httpx.HTTPError:
+            observe_upstream(url, "error", time.perf_counter() - start)
+            upstream_limiter.release()
+            raise
+        except BaseException:
+            # Cancelled mid-call: the slot must still be handed back
+            upstream_limiter.release()
+            raise
+        observe_upstream(url, res.status_code, time.perf_counter() - start)
+        upstream_limiter.record(res.status_code, _retry_after(res) if res.status_code == 429 else None)
+        upstream_limiter.release()
+
+        if res.status_code == 429 and attempt < MAX_RETRIES:
+            # The limiter holds every caller until Retry-After has passed
+            attempt += 1
+            continue
+        if idempotent and res.status_code in RETRY_STATUSES and attempt < MAX_RETRIES:
+            await asyncio.sleep(_retry_delay(attempt, res))
+            attempt += 1
+            continue
+        return res
+
+
+async def aget(url: str, **kwargs) -> httpx.Response:
+    return await arequest("GET", url, **kwargs)
+
+
+async def apost(url: str, **kwargs) -> httpx.Response:
+    return await arequest("POST", url, **kwargs)
@@ -205,6 +205,55 @@ async function generateFromMood(moodData) {
     return response.json();
 }
 
+// Streams the playlist as Server-Sent Events, calling handlers.query / song / ranked / done.
+// Returns false when streaming is unavailable so the caller can fall back to JSON.
+async function streamFromMood(moodData, handlers) {
+    const response = await fetch('/api/generate/stream', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(moodData)
+    });
+
+    if (!response.ok || !response.body) {
+        return false;
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const event = parseSseEvent(buffer.slice(0, boundary));
+            buffer = buffer.slice(boundary + 2);
+
+            if (event.type === 'error') {
+                throw new Error(event.data.error || 'Failed to generate playlist');
+            }
+            if (handlers[event.type]) {
+                handlers[event.type](event.data);
+            }
+        }
+    }
+
+    return true;
+}
+
+function parseSseEvent(raw) {
+    let type = 'message';
+    const dataLines = [];
+    raw.split('\n').forEach(line => {
+        if (line.startsWith('event:')) type = line.slice(6).trim();
+        else if (line.startsWith('data:')) dataLines.push(line.slice(5).trim());
+    });
+    return { type, data: dataLines.length ? JSON.parse(dataLines.join('\n')) : null };
+}
+
 async function fetchHistory() {
     try {
         const response = await fetch('/api/history');
@@ -263,8 +312,17 @@ async function handleFormSubmit(e) {
     showLoading();
 
     try {
-        const result = await generateFromMood(moodData);
-        displayResults(result);
+        // Show songs as they arrive; fall back to the plain JSON endpoint
+        const streamed = await streamFromMood(moodData, {
+            query: (data) => startResults(data.query),
+            song: (data) => appendSong(data.song, data.index),
+            ranked: (data) => replaceSongs(data.songs),
+            done: () => finishResults()
+        });
+        if (!streamed) {
+            const result = await generateFromMood(moodData);
+            displayResults(result);
+        }
     } catch (error) {
         showError(error.message);
     }
@@ -309,19 +367,61 @@ function hideLoading() {
 }
 
 function displayResults(data) {
+    startResults(data.query);
+    data.songs.forEach((song, index) => appendSong(song, index));
+    finishResults();
+}
+
+function startResults(query) {
     hideLoading();
 
     // Stop any currently playing audio
     stopAudioPreview();
 
     // Store songs for copy feature
-    currentSongs = data.songs;
+    currentSongs = [];
 
     // Update search query display
-    searchQueryEl.textContent = `Search: "${data.query}"`;
+    searchQueryEl.textContent = `Search: "${query}"`;
+    songsGrid.innerHTML = '';
+
+    resultsSection.classList.remove('hidden');
+    resultsSection.scrollIntoView({ behavior: 'smooth' });
+}
+
+function appendSong(song, index) {
+    currentSongs.push(song);
+
+    // Render song with preview button
+    songsGrid.insertAdjacentHTML('beforeend', renderSongCard(song, index));
 
-    // Render songs with preview buttons
-    songsGrid.innerHTML = data.songs.map((song, index) => `
+    // Add preview button event listener
+    const btn = songsGrid.lastElementChild.querySelector('.preview-btn');
+    if (btn) {
+        btn.addEventListener('click', handlePreviewClick);
+    }
+}
+
+// Swap the provisional (search order) songs for the final, mood-ranked list
+function replaceSongs(songs) {
+    stopAudioPreview();
+    currentSongs = [];
+    songsGrid.innerHTML = '';
+    songs.forEach((song, index) => appendSong(song, index));
+}
+
+function finishResults() {
+    // Show save button if logged in
+    if (currentUserId && saveToSpotifyBtn) {
+        saveToSpotifyBtn.classList.remove('hidden');
+    }
+
+    // Refresh history
+    loadHistory();
+}
+
+function renderSongCard(song, index) {
+    return `
         <div class="song-card" data-song-id="${song.id}">
             <span class="song-number">${index + 1}</span>
             ${song.preview_url ? `
@@ -347,23 +447,7 @@ function displayResults(data) {
                 <span class="spotify-icon">🎧</span>
             </a>
         </div>
-    `).join('');
-
-    // Add preview button event listeners
-    document.querySelectorAll('.preview-btn').forEach(btn => {
-        btn.addEventListener('click', handlePreviewClick);
-    });
-
-    resultsSection.classList.remove('hidden');
-    resultsSection.scrollIntoView({ behavior: 'smooth' });
-
-    // Show save button if logged in
-    if (currentUserId && saveToSpotifyBtn) {
-        saveToSpotifyBtn.classList.remove('hidden');
-    }
-
-    // Refresh history
-    loadHistory();
+    `;
 }
 
 // ========== Audio Preview ==========
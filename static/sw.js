@@ -1,7 +1,11 @@
 // MoodTunes Service Worker for PWA
-const CACHE_NAME = 'moodtunes-v1';
+const CACHE_NAME = 'moodtunes-v2';
 const OFFLINE_URL = '/';
 
+// Static API payloads (served with an ETag): answered from cache, revalidated in background
+const CONFIG_CACHE = 'moodtunes-config-v1';
+const CONFIG_PATHS = ['/api/config', '/api/activities'];
+
 // Assets to cache on install
 const ASSETS_TO_CACHE = [
     '/',
@@ -29,7 +33,7 @@ self.addEventListener('activate', (event) => {
         caches.keys().then((cacheNames) => {
             return Promise.all(
                 cacheNames.map((cacheName) => {
-                    if (cacheName !== CACHE_NAME) {
+                    if (cacheName !== CACHE_NAME && cacheName !== CONFIG_CACHE) {
                         console.log('MoodTunes: Deleting old cache', cacheName);
                         return caches.delete(cacheName);
                     }
@@ -44,7 +48,13 @@ self.addEventListener('fetch', (event) => {
     // Skip non-GET requests
     if (event.request.method !== 'GET') return;
 
-    // Skip API requests (always fetch fresh)
+    // Config payloads: cache first, refreshed when their ETag changes
+    if (CONFIG_PATHS.includes(new URL(event.request.url).pathname)) {
+        event.respondWith(configFirst(event));
+        return;
+    }
+
+    // Skip other API requests (always fetch fresh)
     if (event.request.url.includes('/api/')) return;
 
     event.respondWith(
@@ -88,3 +98,27 @@ self.addEventListener('fetch', (event) => {
             })
     );
 });
+
+
+// Serve a config payload from cache; revalidate it (If-None-Match via the
+// HTTP cache, so usually a 304) and store it only when the ETag changed
+function configFirst(event) {
+    return caches.open(CONFIG_CACHE).then((cache) =>
+        cache.match(event.request).then((cachedResponse) => {
+            const update = fetch(event.request, { cache: 'no-cache' })
+                .then((response) => {
+                    if (response && response.status === 200 &&
+                        (!cachedResponse || cachedResponse.headers.get('ETag') !== response.headers.get('ETag'))) {
+                        cache.put(event.request, response.clone());
+                    }
+                    return response;
+                });
+
+            if (cachedResponse) {
+                event.waitUntil(update.catch(() => { }));
+                return cachedResponse;
+            }
+            return update;
+        })
+    );
+}
@@ -0,0 +1,64 @@
+"""
+Smoke test for benchmarks/bench_suite.py: a tiny in-process run of every
+scenario, the --json output, and the regression exit code against a
+saved baseline.
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "api"))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+os.environ["WARM_ENABLED"] = "0"
+os.environ["SPOTIFY_TOKEN_SNAPSHOT"] = ""
+os.environ.setdefault("SPOTIFY_CLIENT_ID", "tests")
+os.environ.setdefault("SPOTIFY_CLIENT_SECRET", "tests")
+os.environ.setdefault("FEATURE_STORE_PATH", os.path.join(tempfile.mkdtemp(prefix="tests-"), "features.db"))
+
+import pytest  # noqa: E402
+
+import bench_suite  # noqa: E402
+import spotify_http  # noqa: E402
+
+SMALL = ["--requests", "6", "--concurrency", "3", "--song-count", "3", "--save-tracks", "5", "--latency", "0"]
+
+
+@pytest.fixture
+def suite(monkeypatch):
+    # main() changes directory and installs the fake transport; undo both
+    monkeypatch.chdir(ROOT)
+    yield
+    spotify_http.set_async_transport(None)
+
+
+def test_small_run_covers_every_scenario(suite, tmp_path, capsys):
+    out = tmp_path / "baseline.json"
+    assert bench_suite.main(SMALL + ["--json", str(out)]) == 0
+
+    results = json.loads(out.read_text())["results"]
+    assert set(results) == set(bench_suite.SCENARIOS)
+    for scenario, r in results.items():
+        assert r["ok"] == r["requests"] == 6, (scenario, r["statuses"])
+        assert r["throughput"] > 0 and r["p50_ms"] <= r["p95_ms"] <= r["p99_ms"]
+    assert "generate-from-text" in capsys.readouterr().out
+
+
+def test_regression_against_a_baseline_fails_the_run(suite, tmp_path, capsys):
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps({"results": {
+        "generate": {"p95_ms": 0.001, "p99_ms": 0.001, "throughput": 1e9}
+    }}))
+
+    assert bench_suite.main(SMALL + ["--scenarios", "generate", "--baseline", str(baseline)]) == 1
+    assert "REGRESSION generate throughput" in capsys.readouterr().out
+
+
+def test_compare_allows_the_tolerance():
+    before = {"results": {"generate": {"p95_ms": 100, "p99_ms": 200, "throughput": 50}}}
+    assert bench_suite.compare({"generate": {"p95_ms": 119, "p99_ms": 239, "throughput": 41}}, before, 0.2) == []
+    assert len(bench_suite.compare({"generate": {"p95_ms": 121, "p99_ms": 241, "throughput": 39}}, before, 0.2)) == 3
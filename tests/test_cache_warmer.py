@@ -0,0 +1,70 @@
+"""
+The cache warmer: its own requests are not demand or history, and a warm
+pass looks each track's audio features up in the store only once.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+os.environ["WARM_ENABLED"] = "0"
+os.environ["SPOTIFY_TOKEN_SNAPSHOT"] = ""
+os.environ.setdefault("SPOTIFY_CLIENT_ID", "tests")
+os.environ.setdefault("SPOTIFY_CLIENT_SECRET", "tests")
+os.environ.setdefault("FEATURE_STORE_PATH", os.path.join(tempfile.mkdtemp(prefix="tests-"), "features.db"))
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import cache_warmer as cache_warmer_module  # noqa: E402
+import spotify_api  # noqa: E402
+import spotify_http  # noqa: E402
+from app import app  # noqa: E402
+from cache_warmer import WARM_HEADER, CacheWarmer, cache_warmer  # noqa: E402
+from fake_spotify import create_app as create_fake  # noqa: E402
+from feature_store import FeatureStore  # noqa: E402
+from history_store import history_store  # noqa: E402
+
+MOOD = {"mind_speed": "slow", "lyrics": "no", "context": "alone", "distraction": "low", "song_count": 3}
+
+
+@pytest.fixture
+def fake():
+    fake = create_fake()
+    spotify_http.set_async_transport(httpx.ASGITransport(app=fake))
+    yield fake
+    spotify_http.set_async_transport(None)
+
+
+def test_warm_requests_are_not_demand_or_history(fake):
+    client = TestClient(app)
+    demand = sum(cache_warmer.demand.values())
+    appends = history_store.stats()["appends"]
+
+    res = client.post("/api/generate", json=MOOD, headers={WARM_HEADER: "1"})
+    assert res.status_code == 200
+    assert sum(cache_warmer.demand.values()) == demand
+    assert history_store.stats()["appends"] == appends
+
+    client.post("/api/generate", json=MOOD)
+    assert sum(cache_warmer.demand.values()) == demand + 1
+    assert history_store.stats()["appends"] == appends + 1
+
+
+def test_warm_pass_looks_features_up_once(fake, monkeypatch):
+    # An empty store, so the pass has misses to fetch
+    store = FeatureStore(os.path.join(tempfile.mkdtemp(prefix="tests-"), "features.db"))
+    monkeypatch.setattr(cache_warmer_module, "feature_store", store)
+    monkeypatch.setattr(spotify_api, "feature_store", store)
+
+    counts = asyncio.run(CacheWarmer(top_n=1, budget=20).run_once())
+
+    # Every miss is fetched and written once; a second lookup would count it twice
+    assert counts["features"] >= 1
+    assert store.stats()["misses"] == store.stats()["writes"] > 0
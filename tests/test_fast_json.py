@@ -0,0 +1,41 @@
+"""
+fast_json writes playlists in one pass; the bytes must match what the
+response model path (Starlette's JSONResponse over plain dicts) sent.
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import pytest  # noqa: E402
+from starlette.responses import JSONResponse  # noqa: E402
+
+import fast_json  # noqa: E402
+from bench_tracks import spotify_item  # noqa: E402
+from track import Track  # noqa: E402
+
+
+def playlist(songs) -> dict:
+    return {"success": True, "query": "calm – ünïcode", "songs": songs, "generated_at": "2024-01-01T00:00:00"}
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_playlist_bytes_match_the_response_model_path(monkeypatch, use_orjson):
+    if not use_orjson:
+        monkeypatch.setattr(fast_json, "orjson", None)
+    tracks = [Track.from_spotify(spotify_item(i)) for i in range(20)]
+    tracks[3].image = None
+
+    expected = JSONResponse(playlist([t.as_dict() for t in tracks])).body
+    assert fast_json.dumps(playlist(tracks)) == expected
+    assert fast_json.FastJSONResponse(playlist(tracks)).body == expected
+
+
+def test_static_json_matches_current_etag_only():
+    static = fast_json.StaticJSON({"moods": ["calm"]})
+
+    assert static.matches(static.etag) and static.matches(f"W/{static.etag}") and static.matches("*")
+    assert not static.matches('"other"') and not static.matches(None)
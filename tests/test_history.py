@@ -0,0 +1,74 @@
+"""
+Per-browser history: only a response that issues the history_id cookie
+creates a scope; anonymous reads and clears leave the store untouched.
+"""
+
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "api"))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+os.environ["WARM_ENABLED"] = "0"
+os.environ["SPOTIFY_TOKEN_SNAPSHOT"] = ""
+os.environ.setdefault("SPOTIFY_CLIENT_ID", "tests")
+os.environ.setdefault("SPOTIFY_CLIENT_SECRET", "tests")
+os.environ.setdefault("FEATURE_STORE_PATH", os.path.join(tempfile.mkdtemp(prefix="tests-"), "features.db"))
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import spotify_http  # noqa: E402
+from fake_spotify import create_app as create_fake  # noqa: E402
+from history_store import HISTORY_COOKIE, HistoryStore, history_store  # noqa: E402
+from index import app  # noqa: E402
+
+
+@pytest.fixture
+def fake():
+    spotify_http.set_async_transport(httpx.ASGITransport(app=create_fake()))
+    yield
+    spotify_http.set_async_transport(None)
+
+
+def test_anonymous_reads_and_clears_create_no_scope():
+    client = TestClient(app)
+    before = history_store.stats()["scopes"]
+
+    for _ in range(50):
+        assert client.get("/api/history").json()["history"] == []
+        assert client.delete("/api/history").status_code == 200
+
+    assert history_store.stats()["scopes"] == before
+    assert HISTORY_COOKIE not in client.cookies
+
+
+def test_generate_issues_a_secure_cookie_and_records(fake):
+    client = TestClient(app)
+    res = client.post("/api/generate", json={"song_count": 3})
+
+    assert res.status_code == 200
+    cookie = res.headers["set-cookie"]
+    assert cookie.startswith(f"{HISTORY_COOKIE}=") and "Secure" in cookie and "HttpOnly" in cookie
+
+    # The test client is plain http, so send the secure cookie back by hand
+    client.cookies.set(HISTORY_COOKIE, cookie.split(";")[0].split("=", 1)[1])
+    history = client.get("/api/history").json()["history"]
+    assert [entry["query"] for entry in history] == [res.json()["query"]]
+
+
+def test_persisted_history_is_read_without_a_ring():
+    path = os.path.join(tempfile.mkdtemp(prefix="tests-"), "history.db")
+    HistoryStore(path=path).append("browser:a", {"query": "calm"})
+
+    restarted = HistoryStore(path=path)
+    assert [e["query"] for e in restarted.page("browser:a")["items"]] == ["calm"]
+    assert restarted.page("browser:unknown")["items"] == []
+    restarted.clear("browser:a")
+
+    assert restarted.stats()["scopes"] == 0
+    assert restarted.page("browser:a")["items"] == []
@@ -0,0 +1,110 @@
+"""
+The Aho-Corasick keyword matcher against a frozen copy of the substring
+parser it replaced in llm_parser, on fixed cases and seeded random text.
+"""
+
+import os
+import random
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pytest  # noqa: E402
+
+import llm_parser  # noqa: E402
+from keyword_matcher import KeywordMatcher  # noqa: E402
+from llm_parser import (  # noqa: E402
+    ACTIVITY_PRESETS, CONTEXT_KEYWORDS, DISTRACTION_KEYWORDS, LYRICS_KEYWORDS, MOOD_KEYWORDS
+)
+
+
+# ---------- FROZEN PRE-MATCHER PARSER ----------
+def old_find_keyword_match(text, keyword_map):
+    text_lower = text.lower()
+    best_match = None
+    best_count = 0
+    for category, keywords in keyword_map.items():
+        count = sum(1 for kw in keywords if kw in text_lower)
+        if count > best_count:
+            best_count = count
+            best_match = category
+    return best_match
+
+
+def old_parse(text):
+    text_lower = text.lower().strip()
+    for activity, preset in ACTIVITY_PRESETS.items():
+        if activity in text_lower:
+            return {"parsed": preset, "matched_activity": activity}
+    return {
+        "parsed": {
+            "mind_speed": old_find_keyword_match(text, MOOD_KEYWORDS) or "normal",
+            "lyrics": old_find_keyword_match(text, LYRICS_KEYWORDS) or "sometimes",
+            "context": old_find_keyword_match(text, CONTEXT_KEYWORDS) or "alone",
+            "distraction": old_find_keyword_match(text, DISTRACTION_KEYWORDS) or "medium"
+        },
+        "matched_activity": None
+    }
+
+
+def new_parse(text):
+    result = llm_parser.parse_natural_language(text)
+    return {"parsed": result["parsed"], "matched_activity": result["matched_activity"]}
+
+
+VOCABULARY = sorted({
+    kw for keyword_map in (MOOD_KEYWORDS, LYRICS_KEYWORDS, CONTEXT_KEYWORDS, DISTRACTION_KEYWORDS)
+    for keywords in keyword_map.values() for kw in keywords
+} | set(ACTIVITY_PRESETS))
+FILLER = ["i", "am", "feeling", "some", "music", "for", "a", "the", "NO", "Lyrics", "really", "ish",
+          "", " ", "  ", ",", ".", "!", "-", "'", "\t", "\n", "é", "İ", "ß", "🎧"]
+
+
+def random_text(rng):
+    """Keywords, fragments of keywords and filler, glued with or without spaces"""
+    parts = []
+    for _ in range(rng.randint(0, 12)):
+        roll = rng.random()
+        if roll < 0.4:
+            word = rng.choice(VOCABULARY)
+        elif roll < 0.6:
+            word = rng.choice(VOCABULARY)
+            start = rng.randint(0, len(word))
+            word = word[start:rng.randint(start, len(word))]
+        else:
+            word = rng.choice(FILLER)
+        parts.append(word.upper() if rng.random() < 0.1 else word)
+    return rng.choice(["", " "]).join(parts)
+
+
+# ---------- TESTS ----------
+@pytest.mark.parametrize("text", [
+    "", "   ", "I'm stressed and need no lyrics", "party with friends", "partying alone",
+    "deep work, piano, no words", "tired but okay, doesn't matter", "NO LYRICS please",
+    "studying", "date nightcap", "sleepy sleepy gym", "chill beats for reading", "calm yoga flow"
+])
+def test_parser_matches_the_old_one_on_fixed_cases(text):
+    assert new_parse(text) == old_parse(text)
+
+
+def test_parser_matches_the_old_one_on_random_text():
+    rng = random.Random(7)
+    for _ in range(20000):
+        text = random_text(rng)
+        assert new_parse(text) == old_parse(text), text
+
+
+def test_ad_hoc_maps_match_the_old_one():
+    keyword_map = {"up": ["happy", "up", "app"], "down": ["sad", "down", "happ"]}
+    rng = random.Random(11)
+    for _ in range(2000):
+        text = random_text(rng) + rng.choice(["", " happy", " sad down", " app"])
+        assert llm_parser.find_keyword_match(text, keyword_map) == old_find_keyword_match(text, keyword_map), text
+
+
+def test_overlapping_keywords_are_all_found():
+    matcher = KeywordMatcher(["lyrics", "no lyrics", "no", "s"])
+    assert matcher.find_keywords("no lyrics") == ["lyrics", "no lyrics", "no", "s"]
+    assert matcher.find_keywords("nolyric") == ["no"]
+    assert matcher.find_keywords("") == []
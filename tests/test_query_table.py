@@ -0,0 +1,157 @@
+"""
+The precomputed query table against frozen copies of the query logic it
+replaced: app.py's build_search_query + filters + plan_queries, and the
+Vercel entry point's own build_search_query, which it no longer uses.
+"""
+
+import os
+import sys
+import tempfile
+from itertools import product
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "api"))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+os.environ["WARM_ENABLED"] = "0"
+os.environ["SPOTIFY_TOKEN_SNAPSHOT"] = ""
+os.environ.setdefault("SPOTIFY_CLIENT_ID", "tests")
+os.environ.setdefault("SPOTIFY_CLIENT_SECRET", "tests")
+os.environ.setdefault("FEATURE_STORE_PATH", os.path.join(tempfile.mkdtemp(prefix="tests-"), "features.db"))
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import query_table  # noqa: E402
+import spotify_http  # noqa: E402
+from fake_spotify import create_app as create_fake  # noqa: E402
+from index import app as vercel_app  # noqa: E402
+
+# ---------- FROZEN PRE-TABLE LOGIC ----------
+LANGUAGES = {
+    "any": "", "english": "", "hindi": "bollywood hindi", "punjabi": "punjabi bhangra",
+    "tamil": "tamil kollywood", "telugu": "telugu tollywood", "korean": "kpop",
+    "spanish": "reggaeton spanish", "japanese": "jpop japanese"
+}
+MARKETS = {
+    "any": None, "english": "US", "hindi": "IN", "punjabi": "IN", "tamil": "IN",
+    "telugu": "IN", "korean": "KR", "spanish": "MX", "japanese": "JP"
+}
+GENRES = {
+    "any": "", "pop": "pop", "rock": "rock", "hiphop": "hip hop rap", "electronic": "electronic edm",
+    "classical": "classical", "jazz": "jazz", "rnb": "r&b soul", "bollywood": "bollywood filmi",
+    "lofi": "lofi chill beats", "metal": "metal"
+}
+ERAS = {"any": "", "90s": "90s 1990s", "2000s": "2000s", "2010s": "2010s", "latest": "2023 2024 new"}
+
+
+def app_mood_query(mind_speed, lyrics, context, distraction):
+    """playlist_brain.build_search_query with discover_mood / distraction_profile inlined"""
+    keywords = []
+    if distraction == "high":
+        keywords.append("energetic")
+    elif distraction == "low":
+        keywords.append("calm")
+    keywords.append("focus" if mind_speed == "racing" else "calm" if mind_speed == "slow" else "balanced")
+    if lyrics == "no":
+        keywords.append("instrumental")
+    return " ".join(keywords)
+
+
+def vercel_mood_query(mind_speed, lyrics, context, distraction):
+    """api/index.py's own build_search_query, dropped when it moved to the table"""
+    keywords = []
+    if mind_speed == "racing":
+        keywords.extend(["energetic", "upbeat", "fast"])
+    elif mind_speed == "slow":
+        keywords.extend(["calm", "relaxing", "slow"])
+    else:
+        keywords.extend(["moderate", "balanced"])
+    if lyrics == "no":
+        keywords.append("instrumental")
+    elif lyrics == "yes":
+        keywords.append("vocal")
+    if context == "with people":
+        keywords.append("party")
+    if distraction == "low":
+        keywords.extend(["ambient", "focus"])
+    elif distraction == "high":
+        keywords.extend(["dance", "exciting"])
+    return " ".join(keywords)
+
+
+def full_query(mood_query, language, genre, era):
+    """Both entry points appended the known, non-empty filters in this order"""
+    for table, value in ((LANGUAGES, language), (GENRES, genre), (ERAS, era)):
+        if value in table and table[value]:
+            mood_query = f"{mood_query} {table[value]}"
+    return mood_query
+
+
+def old_plan(mood_query, language="", genre="", era=""):
+    """query_planner.plan_queries as it stood when the table was introduced"""
+    filters = [f for f in (language, genre, era) if f]
+    plan = [(" ".join([mood_query] + filters), 1.0)]
+    if filters:
+        plan += [(f"{keywords} {mood_query}", 0.8) for keywords in filters]
+        if len(filters) > 1:
+            plan.append((" ".join(filters), 0.6))
+    seen, unique = set(), []
+    for text, weight in plan:
+        key = " ".join(text.split())
+        if key and key not in seen:
+            seen.add(key)
+            unique.append((key, weight))
+    return unique
+
+
+AXES = [
+    ("racing", "normal", "slow", "unknown"), ("yes", "sometimes", "no", "unknown"),
+    ("alone", "with people", "unknown"), ("low", "medium", "high", "unknown"),
+    tuple(LANGUAGES) + ("klingon",), tuple(GENRES) + ("polka",), tuple(ERAS) + ("1800s",)
+]
+
+
+# ---------- TESTS ----------
+def test_table_matches_the_app_logic_it_replaced():
+    for key in product(*AXES):
+        entry = query_table.lookup(*key)
+        mood_query = app_mood_query(*key[:4])
+        filters = (LANGUAGES.get(key[4], ""), GENRES.get(key[5], ""), ERAS.get(key[6], ""))
+
+        assert entry.query == full_query(mood_query, *key[4:]), key
+        assert [tuple(s) for s in entry.plan] == old_plan(mood_query, *filters), key
+        assert entry.market == (MARKETS.get(key[4]) or query_table.DEFAULT_MARKET), key
+
+
+def test_table_stores_only_canonical_keys():
+    for key in product(*AXES):
+        query_table.lookup(*key)
+    assert query_table.stats()["entries"] <= 3 * 3 * 2 * 3 * 9 * 11 * 5
+
+
+@pytest.mark.parametrize("mood, before, after", [
+    (("racing", "no", "alone", "low"), "energetic upbeat fast instrumental ambient focus", "calm focus instrumental"),
+    (("slow", "yes", "with people", "high"), "calm relaxing slow vocal party dance exciting", "energetic calm"),
+    (("normal", "sometimes", "alone", "medium"), "moderate balanced", "balanced"),
+])
+def test_vercel_queries_now_follow_the_app(mood, before, after):
+    # Deployed (Vercel) queries changed with the shared table; pin old -> new
+    assert vercel_mood_query(*mood) == before
+    assert query_table.lookup(*mood).query == after == app_mood_query(*mood)
+
+
+def test_vercel_entry_point_sends_the_table_query():
+    spotify_http.set_async_transport(httpx.ASGITransport(app=create_fake()))
+    try:
+        mood = {"mind_speed": "racing", "lyrics": "no", "context": "alone", "distraction": "low",
+                "language": "hindi", "genre": "lofi", "era": "any", "song_count": 3}
+        res = TestClient(vercel_app).post("/api/generate", json=mood)
+    finally:
+        spotify_http.set_async_transport(None)
+
+    assert res.status_code == 200
+    assert res.json()["query"] == "calm focus instrumental bollywood hindi lofi chill beats"
+    assert res.json()["query"] != full_query(vercel_mood_query("racing", "no", "alone", "low"), "hindi", "lofi", "any")
@@ -0,0 +1,158 @@
+"""
+Saving to Spotify when the upstream limiter sheds a call mid-save:
+the client gets resumable progress (502 + playlist_id / tracks_added),
+not a bare 503 that would make it create a second playlist.
+"""
+
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "api"))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+os.environ["WARM_ENABLED"] = "0"
+os.environ["SPOTIFY_TOKEN_SNAPSHOT"] = ""
+os.environ.setdefault("FEATURE_STORE_PATH", os.path.join(tempfile.mkdtemp(prefix="tests-"), "features.db"))
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import spotify_account  # noqa: E402
+import spotify_http  # noqa: E402
+from fake_spotify import create_app as create_fake  # noqa: E402
+from index import app  # noqa: E402
+from upstream_limiter import UpstreamOverloaded, upstream_limiter  # noqa: E402
+
+TRACK_IDS = [f"t{i:05d}" for i in range(250)]
+
+
+@pytest.fixture
+def fake():
+    fake = create_fake()
+    spotify_http.set_async_transport(httpx.ASGITransport(app=fake))
+    yield fake
+    spotify_http.set_async_transport(None)
+
+
+@pytest.fixture
+def client():
+    client = TestClient(app)
+    client.cookies.set("spotify_token", "user-token")
+    client.cookies.set("spotify_user", "listener")
+    return client
+
+
+def shed_after(monkeypatch, allowed: int):
+    """Let `allowed` upstream calls through, then shed every later one"""
+    acquire = upstream_limiter.acquire
+    calls = {"n": 0}
+
+    async def limited():
+        calls["n"] += 1
+        if calls["n"] > allowed:
+            raise UpstreamOverloaded(2)
+        await acquire()
+
+    monkeypatch.setattr(upstream_limiter, "acquire", limited)
+
+
+def test_shed_mid_save_reports_resumable_progress(fake, client, monkeypatch):
+    # Create playlist + two 100-track chunks, then the third chunk is shed
+    shed_after(monkeypatch, 3)
+    res = client.post("/api/save-playlist", json={"playlist_name": "focus", "track_ids": TRACK_IDS})
+
+    assert res.status_code == 502
+    body = res.json()
+    assert body["tracks_added"] == 200
+    assert body["playlist_id"] in fake.state.playlists
+    assert res.headers["Retry-After"] == "2"
+
+    monkeypatch.undo()
+    resumed = client.post("/api/save-playlist", json={
+        "playlist_name": "focus", "track_ids": TRACK_IDS,
+        "playlist_id": body["playlist_id"], "start": body["tracks_added"]
+    })
+
+    assert resumed.status_code == 200
+    assert len(fake.state.playlists) == 1
+    assert fake.state.playlists[body["playlist_id"]] == [f"spotify:track:{t}" for t in TRACK_IDS]
+
+
+def test_shed_before_create_adds_nothing(fake, client, monkeypatch):
+    shed_after(monkeypatch, 0)
+    res = client.post("/api/save-playlist", json={"playlist_name": "focus", "track_ids": TRACK_IDS})
+
+    assert res.status_code == 503
+    assert fake.state.playlists == {}
+
+
+def failing_adds(monkeypatch, status: int, failures: int):
+    """Answer the first `failures` add-tracks calls with `status`"""
+    apost = spotify_http.apost
+    calls = {"n": 0}
+
+    async def post(url, **kwargs):
+        if url.endswith("/tracks"):
+            calls["n"] += 1
+            if calls["n"] <= failures:
+                return httpx.Response(status, request=httpx.Request("POST", url))
+        return await apost(url, **kwargs)
+
+    monkeypatch.setattr(spotify_http, "apost", post)
+    return calls
+
+
+def test_chunk_resends_back_off(fake, client, monkeypatch):
+    delays = []
+    monkeypatch.setattr(spotify_account, "chunk_backoff", lambda attempt: delays.append(attempt) or 0)
+    calls = failing_adds(monkeypatch, 503, 2)
+
+    res = client.post("/api/save-playlist", json={"playlist_name": "focus", "track_ids": TRACK_IDS[:50]})
+
+    assert res.status_code == 200
+    assert calls["n"] == 3 and delays == [0, 1]
+
+
+def test_chunk_backoff_is_jittered_exponential():
+    for attempt in range(4):
+        delays = {spotify_account.chunk_backoff(attempt) for _ in range(20)}
+        assert len(delays) > 1
+        assert all(0 <= d <= spotify_account.SAVE_CHUNK_BACKOFF * 2 ** attempt for d in delays)
+
+
+def test_refused_chunk_is_terminal(fake, client, monkeypatch):
+    monkeypatch.setattr(spotify_account, "chunk_backoff", lambda attempt: 0)
+    calls = failing_adds(monkeypatch, 403, 1)
+
+    res = client.post("/api/save-playlist", json={"playlist_name": "focus", "track_ids": TRACK_IDS[:50]})
+
+    assert res.status_code == 403
+    assert "tracks_added" not in res.json()
+    assert calls["n"] == 1
+
+
+def test_failing_chunk_reports_resumable_progress(fake, client, monkeypatch):
+    monkeypatch.setattr(spotify_account, "chunk_backoff", lambda attempt: 0)
+    failing_adds(monkeypatch, 503, 100)
+
+    res = client.post("/api/save-playlist", json={"playlist_name": "focus", "track_ids": TRACK_IDS})
+
+    assert res.status_code == 502
+    assert res.json()["tracks_added"] == 0
+
+
+def test_resume_checks_the_playlist(fake, client):
+    res = client.post("/api/save-playlist", json={"playlist_name": "focus", "track_ids": TRACK_IDS[:10]})
+    playlist_id = res.json()["playlist_id"]
+    resume = {"playlist_name": "focus", "track_ids": TRACK_IDS[:20], "start": 10}
+
+    assert client.post("/api/save-playlist", json={**resume, "playlist_id": "missing"}).status_code == 404
+    assert client.post("/api/save-playlist", json={**resume, "playlist_id": "../users/x"}).status_code == 404
+
+    client.cookies.set("spotify_user", "someone-else")
+    assert client.post("/api/save-playlist", json={**resume, "playlist_id": playlist_id}).status_code == 403
+    assert len(fake.state.playlists[playlist_id]) == 10
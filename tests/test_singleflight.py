@@ -0,0 +1,110 @@
+"""
+Single-flight coalescing: concurrent callers for a key share one run and
+each get a private copy; a caller that is cancelled leaves the shared run
+going for everyone else.
+"""
+
+import asyncio
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pytest  # noqa: E402
+
+from singleflight import SingleFlight  # noqa: E402
+
+
+def counted(result, delay=0.05):
+    """An async fn that returns `result` after `delay` and counts its runs"""
+    runs = {"n": 0}
+
+    async def fn():
+        runs["n"] += 1
+        await asyncio.sleep(delay)
+        return result
+
+    return fn, runs
+
+
+def test_concurrent_callers_share_one_run():
+    async def scenario():
+        flight = SingleFlight()
+        fn, runs = counted({"songs": ["a", "b"]})
+        results = await asyncio.gather(*(flight.do("calm", fn) for _ in range(10)))
+        return flight, runs, results
+
+    flight, runs, results = asyncio.run(scenario())
+
+    assert runs["n"] == 1
+    assert flight.stats()["executions"] == 1 and flight.stats()["coalesced"] == 9
+    assert flight.stats()["in_flight"] == 0
+    assert all(r == {"songs": ["a", "b"]} for r in results)
+    # Every caller owns its result
+    results[0]["songs"].append("c")
+    assert results[1]["songs"] == ["a", "b"]
+
+
+def test_different_keys_and_later_calls_run_again():
+    async def scenario():
+        flight = SingleFlight()
+        fn, runs = counted("x", delay=0.01)
+        await asyncio.gather(flight.do("calm", fn), flight.do("focus", fn))
+        await flight.do("calm", fn)
+        return runs
+
+    assert asyncio.run(scenario())["n"] == 3
+
+
+def test_cancelled_leader_leaves_the_run_to_followers():
+    async def scenario():
+        flight = SingleFlight()
+        fn, runs = counted("done", delay=0.1)
+        leader = asyncio.create_task(flight.do("calm", fn))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do("calm", fn))
+        await asyncio.sleep(0.01)
+
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return runs, await follower
+
+    runs, result = asyncio.run(scenario())
+    assert result == "done" and runs["n"] == 1
+
+
+def test_cancelled_follower_does_not_cancel_the_run():
+    async def scenario():
+        flight = SingleFlight()
+        fn, runs = counted("done", delay=0.1)
+        leader = asyncio.create_task(flight.do("calm", fn))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do("calm", fn))
+        await asyncio.sleep(0.01)
+
+        follower.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await follower
+        return runs, await leader
+
+    runs, result = asyncio.run(scenario())
+    assert result == "done" and runs["n"] == 1
+
+
+def test_failure_reaches_every_caller_and_is_not_kept():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def boom():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream down")
+
+        results = await asyncio.gather(*(flight.do("calm", boom) for _ in range(3)), return_exceptions=True)
+        fn, _ = counted("recovered", delay=0)
+        return results, await flight.do("calm", fn)
+
+    results, after = asyncio.run(scenario())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert after == "recovered"
@@ -0,0 +1,55 @@
+"""
+song_count is validated on both entry points: 1..MAX_POOL_SIZE, anything
+else is a 422 instead of an empty or silently capped playlist.
+"""
+
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "api"))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+os.environ["WARM_ENABLED"] = "0"
+os.environ["SPOTIFY_TOKEN_SNAPSHOT"] = ""
+os.environ.setdefault("SPOTIFY_CLIENT_ID", "tests")
+os.environ.setdefault("SPOTIFY_CLIENT_SECRET", "tests")
+os.environ.setdefault("FEATURE_STORE_PATH", os.path.join(tempfile.mkdtemp(prefix="tests-"), "features.db"))
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import app as app_entry  # noqa: E402
+import index as vercel_entry  # noqa: E402
+import spotify_http  # noqa: E402
+from fake_spotify import create_app as create_fake  # noqa: E402
+from query_planner import MAX_POOL_SIZE  # noqa: E402
+
+ENTRY_POINTS = [app_entry.app, vercel_entry.app]
+ROUTES = [("/api/generate", {}), ("/api/generate/stream", {}), ("/api/generate-from-text", {"text": "calm focus"})]
+
+
+@pytest.fixture
+def fake():
+    spotify_http.set_async_transport(httpx.ASGITransport(app=create_fake()))
+    yield
+    spotify_http.set_async_transport(None)
+
+
+@pytest.mark.parametrize("app", ENTRY_POINTS)
+@pytest.mark.parametrize("path, body", ROUTES)
+@pytest.mark.parametrize("song_count", [0, -3, MAX_POOL_SIZE + 1, 100000])
+def test_out_of_range_song_count_is_rejected(app, path, body, song_count):
+    res = TestClient(app).post(path, json={**body, "song_count": song_count})
+    assert res.status_code == 422
+
+
+@pytest.mark.parametrize("app", ENTRY_POINTS)
+@pytest.mark.parametrize("song_count", [1, MAX_POOL_SIZE])
+def test_song_count_bounds_are_served_in_full(fake, app, song_count):
+    res = TestClient(app).post("/api/generate", json={"song_count": song_count})
+    assert res.status_code == 200
+    assert len(res.json()["songs"]) == song_count
@@ -0,0 +1,48 @@
+"""
+Debug tracing is off unless DEBUG_TOKEN is set: no debug routes, and
+?debug= / X-Debug flags are ignored, so clients cannot fill the trace store.
+"""
+
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "api"))
+
+os.environ["WARM_ENABLED"] = "0"
+os.environ["SPOTIFY_TOKEN_SNAPSHOT"] = ""
+os.environ.pop("DEBUG_TOKEN", None)
+os.environ.setdefault("FEATURE_STORE_PATH", os.path.join(tempfile.mkdtemp(prefix="tests-"), "features.db"))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import tracing  # noqa: E402
+from index import app  # noqa: E402
+
+
+def scope(query: str = "", headers: dict = None) -> dict:
+    return {
+        "query_string": query.encode(),
+        "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+    }
+
+
+def test_debug_is_off_without_a_token():
+    client = TestClient(app)
+    kept = len(tracing.trace_store.recent(tracing.TRACE_KEEP))
+
+    assert client.get("/api/debug/traces").status_code == 404
+    res = client.get("/api/config?debug=profile", headers={"X-Debug": "trace"})
+
+    assert "x-trace-spans" not in res.headers and "x-profile" not in res.headers
+    assert len(tracing.trace_store.recent(tracing.TRACE_KEEP)) == kept
+
+
+def test_flags_need_the_matching_token(monkeypatch):
+    monkeypatch.setattr(tracing, "DEBUG_TOKEN", "secret")
+
+    assert tracing.debug_flags(scope("debug=trace")) == set()
+    assert tracing.debug_flags(scope("debug=trace", {"X-Debug-Token": "wrong"})) == set()
+    assert tracing.debug_flags(scope("debug=profile", {"X-Debug-Token": "secret"})) == {"trace", "profile"}
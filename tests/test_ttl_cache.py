@@ -0,0 +1,157 @@
+"""
+TTLCache: fresh / stale / expired ageing, stale-while-revalidate on
+get_or_load, and LRU eviction by entry count and by bytes.
+"""
+
+import asyncio
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pytest  # noqa: E402
+
+import ttl_cache  # noqa: E402
+from ttl_cache import TTLCache  # noqa: E402
+
+
+class Clock:
+    """Stands in for the time module so tests move time by hand"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ttl_cache, "time", clock)
+    return clock
+
+
+def loader_of(*values):
+    """An async loader returning `values` in turn and counting its calls"""
+    calls = {"n": 0}
+
+    async def load():
+        calls["n"] += 1
+        value = values[min(calls["n"], len(values)) - 1]
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    return load, calls
+
+
+# ---------- AGEING ----------
+def test_entries_go_fresh_then_stale_then_expire(clock):
+    cache = TTLCache(ttl=10, stale_ttl=5)
+    cache.set("calm", "v1")
+
+    assert cache.lookup("calm") == ("v1", "fresh")
+    clock.now += 12
+    assert cache.lookup("calm") == ("v1", "stale")
+    # get() only serves fresh values
+    assert cache.get("calm") is None
+    clock.now += 4
+    assert cache.lookup("calm") == (None, None)
+    assert len(cache) == 0
+
+
+# ---------- STALE-WHILE-REVALIDATE ----------
+def test_stale_hit_is_served_and_reloaded_in_the_background(clock):
+    async def scenario():
+        cache = TTLCache(ttl=10, stale_ttl=60)
+        load, calls = loader_of("v1", "v2")
+        first = await cache.get_or_load("calm", load)
+
+        clock.now += 20
+        stale = await cache.get_or_load("calm", load)
+        served_at_once = cache.lookup("calm")
+        await asyncio.sleep(0)
+        return cache, calls, first, stale, served_at_once
+
+    cache, calls, first, stale, served_at_once = asyncio.run(scenario())
+    assert (first, stale) == ("v1", "v1")
+    assert served_at_once == ("v1", "stale")
+    assert cache.lookup("calm") == ("v2", "fresh")
+    assert calls["n"] == 2 and cache.stats()["stale_hits"] == 1
+
+
+def test_failed_background_reload_keeps_the_stale_value(clock):
+    async def scenario():
+        cache = TTLCache(ttl=10, stale_ttl=60)
+        load, _ = loader_of("v1", RuntimeError("upstream down"))
+        await cache.get_or_load("calm", load)
+
+        clock.now += 20
+        stale = await cache.get_or_load("calm", load)
+        await asyncio.sleep(0)
+        return cache, stale
+
+    cache, stale = asyncio.run(scenario())
+    assert stale == "v1"
+    assert cache.lookup("calm") == ("v1", "stale")
+    assert cache.stats()["load_errors"] == 1
+
+
+def test_concurrent_misses_share_one_load(clock):
+    async def scenario():
+        cache = TTLCache(ttl=10)
+        calls = {"n": 0}
+
+        async def slow():
+            calls["n"] += 1
+            await asyncio.sleep(0.01)
+            return "v1"
+
+        results = await asyncio.gather(*(cache.get_or_load("calm", slow) for _ in range(5)))
+        return results, calls
+
+    results, calls = asyncio.run(scenario())
+    assert results == ["v1"] * 5 and calls["n"] == 1
+
+
+def test_failed_miss_load_raises_and_caches_nothing(clock):
+    async def scenario():
+        cache = TTLCache(ttl=10)
+        load, _ = loader_of(RuntimeError("upstream down"))
+        with pytest.raises(RuntimeError):
+            await cache.get_or_load("calm", load)
+        return cache
+
+    assert len(asyncio.run(scenario())) == 0
+
+
+# ---------- LRU EVICTION ----------
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = TTLCache(maxsize=3, ttl=10)
+    for key in ("a", "b", "c"):
+        cache.set(key, key)
+
+    cache.get("a")
+    cache.set("d", "d")
+
+    assert "b" not in cache
+    assert all(key in cache for key in ("a", "c", "d"))
+    assert cache.stats()["evictions"] == 1
+
+
+def test_byte_bound_evicts_oldest_and_skips_oversized_values(clock):
+    cache = TTLCache(maxsize=100, ttl=10, max_bytes=25, sizeof=len)
+    cache.set("a", "x" * 10)
+    cache.set("b", "x" * 10)
+    cache.set("c", "x" * 10)
+
+    assert "a" not in cache and "b" in cache and "c" in cache
+    assert cache.stats()["bytes"] == 20
+
+    cache.set("huge", "x" * 30)
+    assert "huge" not in cache and cache.stats()["bytes"] == 20
+
+    cache.set("b", "x" * 5)
+    assert cache.stats()["bytes"] == 15
@@ -0,0 +1,129 @@
+"""
+Upstream limiter: interactive callers go before batch and background
+ones and keep a reserve of slots, a 429 halves the rate once per pause,
+and callers that would queue too long are shed with a 503.
+"""
+
+import asyncio
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pytest  # noqa: E402
+
+from upstream_limiter import UpstreamLimiter, UpstreamOverloaded, current_lane, lane  # noqa: E402
+
+
+def limiter(**kwargs):
+    """A limiter whose token bucket never gets in the way unless asked to"""
+    options = {"rate": 1000, "burst": 1000, "max_concurrency": 4, "reserve": 1,
+               "max_queue": 10, "queue_timeout": 1}
+    options.update(kwargs)
+    return UpstreamLimiter(**options)
+
+
+# ---------- LANES ----------
+def test_interactive_waiters_are_served_before_earlier_batch_waiters():
+    async def scenario():
+        limits = limiter(max_concurrency=1, reserve=0)
+        await limits.acquire("interactive")
+        order = []
+
+        async def wait(name):
+            await limits.acquire(name)
+            order.append(name)
+            limits.release()
+
+        batch = asyncio.create_task(wait("batch"))
+        background = asyncio.create_task(wait("background"))
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(wait("interactive"))
+        await asyncio.sleep(0)
+
+        limits.release()
+        await asyncio.gather(batch, background, interactive)
+        return order
+
+    assert asyncio.run(scenario()) == ["interactive", "batch", "background"]
+
+
+def test_batch_lanes_never_take_the_interactive_reserve():
+    async def scenario():
+        limits = limiter(max_concurrency=4, reserve=1, queue_timeout=0.05)
+        for _ in range(3):
+            await limits.acquire("batch")
+        with pytest.raises(UpstreamOverloaded):
+            await limits.acquire("background")
+        await limits.acquire("interactive")
+        return limits.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["active"] == 4
+    assert stats["shed"] == {"interactive": 0, "batch": 0, "background": 1}
+
+
+def test_lane_context_sets_the_default_lane():
+    assert current_lane() == "interactive"
+    with lane("background"):
+        assert current_lane() == "background"
+    assert current_lane() == "interactive"
+    with pytest.raises(ValueError):
+        with lane("urgent"):
+            pass
+
+
+# ---------- 429 BACKOFF ----------
+def test_429_halves_the_rate_once_per_pause_and_recovers():
+    limits = limiter(rate=40, min_rate=5)
+
+    limits.record(429, retry_after=5)
+    assert limits.rate == 20 and limits.tokens == 0
+    # Calls that were already in flight answer 429 too: no second halving
+    limits.record(429, retry_after=5)
+    assert limits.rate == 20
+    assert limits.stats()["throttled"] == 2 and limits.stats()["paused_for"] > 4
+
+    limits.paused_until = 0
+    limits.record(429, retry_after=0)
+    limits.paused_until = 0
+    limits.record(429, retry_after=0)
+    limits.paused_until = 0
+    limits.record(429, retry_after=0)
+    assert limits.rate == 5
+
+    for _ in range(100):
+        limits.record(200)
+    assert limits.rate == 40
+
+
+def test_callers_are_shed_instead_of_waiting_out_a_long_pause():
+    async def scenario():
+        limits = limiter(queue_timeout=1)
+        limits.record(429, retry_after=30)
+        with pytest.raises(UpstreamOverloaded) as overloaded:
+            await limits.acquire("interactive")
+        return overloaded.value
+
+    error = asyncio.run(scenario())
+    assert error.status_code == 503 and int(error.headers["Retry-After"]) >= 29
+
+
+# ---------- SHEDDING ----------
+def test_full_queue_and_queue_timeout_shed_with_503():
+    async def scenario():
+        limits = limiter(max_concurrency=1, reserve=0, max_queue=1, queue_timeout=0.05)
+        await limits.acquire()
+        waiter = asyncio.create_task(limits.acquire())
+        await asyncio.sleep(0)
+
+        with pytest.raises(UpstreamOverloaded):
+            await limits.acquire()
+        with pytest.raises(UpstreamOverloaded):
+            await waiter
+        return limits.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["shed"]["interactive"] == 2
+    assert stats["queued"]["interactive"] == 0 and stats["active"] == 1
@@ -0,0 +1,44 @@
+"""
+Stage Timings
+Wall-clock time spent in each stage of one playlist request
+"""
+
+import time
+from contextlib import contextmanager
+
+from metrics import STAGE_LATENCY
+from tracing import span
+
+
+class StageTimings:
+    """Accumulates milliseconds per named stage, in the order stages first ran"""
+
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            with span(name):
+                yield
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.stages[name] = self.stages.get(name, 0.0) + elapsed
+            STAGE_LATENCY.observe(elapsed / 1000, name)
+
+    def __copy__(self) -> "StageTimings":
+        """Independent copy (own stage dict), so callers sharing a result time their own stages"""
+        clone = StageTimings()
+        clone.stages = dict(self.stages)
+        return clone
+
+    def total(self) -> float:
+        return sum(self.stages.values())
+
+    def as_dict(self) -> dict:
+        return {name: round(ms, 2) for name, ms in self.stages.items()}
+
+    def server_timing(self) -> str:
+        """Value for the Server-Timing response header (shown in browser dev tools)"""
+        return ", ".join(f"{name};dur={ms:.1f}" for name, ms in self.stages.items())
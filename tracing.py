@@ -0,0 +1,311 @@
+"""
+Request Tracing
+Lightweight spans attached to a per-request ID, a debug breakdown on
+demand, and an opt-in, rate-limited cProfile capture for single requests.
+
+    curl -H "X-Debug: trace" ...      # X-Trace-Spans header with per-span timings
+    curl "...?debug=profile"          # also profile this request (rate-limited)
+    GET /api/debug/traces/<request id>
+
+Debug flags and routes exist only when DEBUG_TOKEN is set, and every
+debug request must send it as X-Debug-Token.
+"""
+
+import cProfile
+import functools
+import inspect
+import io
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Request
+
+# Keep traces of requests slower than this (ms) for /api/debug/traces
+TRACE_SLOW_MS = float(os.getenv("TRACE_SLOW_MS", "1000"))
+# Traces kept in memory
+TRACE_KEEP = int(os.getenv("TRACE_KEEP", "200"))
+# Profiled requests allowed per minute (across the process)
+PROFILE_PER_MINUTE = float(os.getenv("PROFILE_PER_MINUTE", "2"))
+# Enables debug flags and /api/debug; requests must send it as X-Debug-Token
+DEBUG_TOKEN = os.getenv("DEBUG_TOKEN")
+
+REQUEST_ID_HEADER = "x-request-id"
+DEBUG_MODES = {"trace", "profile"}
+
+
+class Trace:
+    """Spans recorded for one request; times are ms from the request start"""
+
+    __slots__ = ("request_id", "route", "started", "duration_ms", "spans", "profile")
+
+    def __init__(self, request_id: str, route: str = ""):
+        self.request_id = request_id
+        self.route = route
+        self.started = time.perf_counter()
+        self.duration_ms = None
+        self.spans = []       # (name, start_ms, duration_ms, parent index or None)
+        self.profile = None
+
+    def summary(self) -> List[tuple]:
+        """(name, count, total ms) per span name, in first-seen order"""
+        totals = {}
+        for name, _, duration, _ in filter(None, self.spans):
+            count, total = totals.get(name, (0, 0.0))
+            totals[name] = (count + 1, total + duration)
+        return [(name, count, total) for name, (count, total) in totals.items()]
+
+    def as_dict(self) -> dict:
+        return {
+            "request_id": self.request_id,
+            "route": self.route,
+            "duration_ms": round(self.duration_ms, 2) if self.duration_ms is not None else None,
+            "spans": [
+                {"name": name, "start_ms": round(start, 3), "duration_ms": round(duration, 3), "parent": parent}
+                for name, start, duration, parent in filter(None, self.spans)
+            ],
+            "profile": self.profile
+        }
+
+
+_trace: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+_parent: ContextVar[Optional[int]] = ContextVar("trace_parent", default=None)
+
+
+# ---------- SPANS ----------
+def current_trace() -> Optional[Trace]:
+    return _trace.get()
+
+
+@contextmanager
+def span(name: str):
+    """Time a block as a span of the current request (no-op outside a request)"""
+    trace = _trace.get()
+    if trace is None:
+        yield
+        return
+
+    index = len(trace.spans)
+    trace.spans.append(None)   # reserve the slot so children get a stable parent index
+    token = _parent.set(index)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        _parent.reset(token)
+        trace.spans[index] = (name, (start - trace.started) * 1000, (end - start) * 1000, _parent.get())
+
+
+def traced(name: str = None):
+    """Decorator: record every call of a sync or async function as a span"""
+    def decorate(fn):
+        span_name = name or fn.__name__
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                if _trace.get() is None:
+                    return await fn(*args, **kwargs)
+                with span(span_name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _trace.get() is None:
+                return fn(*args, **kwargs)
+            with span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# ---------- PROFILING ----------
+class ProfileLimiter:
+    """Token bucket (per_minute, burst 1) plus one profile at a time"""
+
+    def __init__(self, per_minute: float = PROFILE_PER_MINUTE):
+        self.rate = per_minute / 60.0
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self.active = False
+        self._lock = threading.Lock()
+
+        self.granted = 0
+        self.rejected = 0
+
+    def acquire(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(1.0, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.active or self.tokens < 1.0:
+                self.rejected += 1
+                return False
+            self.tokens -= 1.0
+            self.active = True
+            self.granted += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.active = False
+
+
+profile_limiter = ProfileLimiter()
+
+
+def profile_report(profiler: cProfile.Profile, limit: int = 30) -> str:
+    import pstats  # only profiled requests need it; keeps it off the cold start
+
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(limit)
+    return out.getvalue()
+
+
+# ---------- STORAGE ----------
+class TraceStore:
+    """Most recent kept traces by request ID"""
+
+    def __init__(self, size: int = TRACE_KEEP):
+        self.size = size
+        self._traces = OrderedDict()
+
+    def add(self, trace: Trace):
+        self._traces[trace.request_id] = trace
+        self._traces.move_to_end(trace.request_id)
+        while len(self._traces) > self.size:
+            self._traces.popitem(last=False)
+
+    def get(self, request_id: str) -> Optional[Trace]:
+        return self._traces.get(request_id)
+
+    def recent(self, limit: int = 20) -> List[Trace]:
+        return list(reversed(self._traces.values()))[:limit]
+
+
+trace_store = TraceStore()
+
+
+# ---------- ASGI ----------
+def debug_flags(scope) -> set:
+    """Debug modes requested via X-Debug header or ?debug= (comma separated: trace, profile)"""
+    if not DEBUG_TOKEN:
+        return set()
+    headers = dict(scope.get("headers") or ())
+    values = [headers.get(b"x-debug", b"").decode("latin-1")]
+    for pair in scope.get("query_string", b"").decode("latin-1").split("&"):
+        if pair.startswith("debug="):
+            values.append(pair[len("debug="):])
+    flags = {flag.strip().lower() for value in values for flag in value.split(",")} & DEBUG_MODES
+    if "profile" in flags:
+        flags.add("trace")
+    if flags and headers.get(b"x-debug-token", b"").decode("latin-1") != DEBUG_TOKEN:
+        return set()
+    return flags
+
+
+class TracingMiddleware:
+    """
+    Gives every HTTP request a trace (ID from X-Request-ID or a new one,
+    echoed back). Slow or debug-flagged traces are kept for /api/debug/traces.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or ())
+        request_id = headers.get(REQUEST_ID_HEADER.encode(), b"").decode("latin-1")[:64] or uuid.uuid4().hex[:16]
+        trace = Trace(request_id, scope.get("path", ""))
+        flags = debug_flags(scope)
+
+        # A profile covers everything the event loop runs meanwhile,
+        # including other requests' work
+        profiler = None
+        profile_state = None
+        if "profile" in flags:
+            if profile_limiter.acquire():
+                profiler = cProfile.Profile()
+                profile_state = "captured"
+            else:
+                profile_state = "rate-limited"
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                extra = [(b"x-request-id", request_id.encode("latin-1"))]
+                if "trace" in flags:
+                    breakdown = ", ".join(
+                        f"{name};count={count};dur={total:.1f}" for name, count, total in trace.summary()
+                    )
+                    extra.append((b"x-trace-spans", breakdown.encode("latin-1")))
+                if profile_state:
+                    extra.append((b"x-profile", profile_state.encode()))
+                message = {**message, "headers": list(message.get("headers", [])) + extra}
+            await send(message)
+
+        trace_token = _trace.set(trace)
+        if profiler is not None:
+            profiler.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                trace.profile = profile_report(profiler)
+                profile_limiter.release()
+            _trace.reset(trace_token)
+            trace.duration_ms = (time.perf_counter() - trace.started) * 1000
+            if flags or trace.duration_ms >= TRACE_SLOW_MS:
+                trace_store.add(trace)
+
+
+# ---------- DEBUG ROUTES ----------
+def require_debug_token(request: Request):
+    if not DEBUG_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if request.headers.get("x-debug-token") != DEBUG_TOKEN:
+        raise HTTPException(status_code=403, detail="Debug token required")
+
+
+# Entry points include this only when DEBUG_TOKEN is set
+debug_router = APIRouter(prefix="/api/debug", include_in_schema=False)
+
+
+@debug_router.get("/traces")
+async def list_traces(request: Request, limit: int = 20):
+    """Most recent slow or debug-flagged requests"""
+    require_debug_token(request)
+    return {
+        "slow_ms": TRACE_SLOW_MS,
+        "profiles": {"granted": profile_limiter.granted, "rejected": profile_limiter.rejected},
+        "traces": [
+            {
+                "request_id": t.request_id,
+                "route": t.route,
+                "duration_ms": round(t.duration_ms or 0, 2),
+                "slowest": max(t.summary(), key=lambda s: s[2], default=(None,))[0],
+                "profiled": t.profile is not None
+            }
+            for t in trace_store.recent(max(1, min(limit, TRACE_KEEP)))
+        ]
+    }
+
+
+@debug_router.get("/traces/{request_id}")
+async def get_trace(request_id: str, request: Request):
+    """Every span (and the profile, if one was captured) for one request"""
+    require_debug_token(request)
+    trace = trace_store.get(request_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found (only slow or debug requests are kept)")
+    return trace.as_dict()
@@ -0,0 +1,63 @@
+"""
+Track
+Compact record for one song, in the shape /api/generate returns.
+Search results, caches, scoring, the catalog and responses all pass these
+around; fast_json writes each one as the JSON object the frontend already
+expects.
+"""
+
+import copy
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass(slots=True)
+class Track:
+    """
+    One song. Instances are shared by the caches, so treat them as read-only.
+    """
+
+    id: str
+    name: str
+    artist: str
+    album: str
+    image: Optional[str]
+    preview_url: Optional[str]
+    spotify_url: str
+    duration_ms: int
+
+    @classmethod
+    def from_spotify(cls, item: dict) -> "Track":
+        """Reduce a Spotify track object to the fields the frontend uses"""
+        album = item["album"]
+        return cls(
+            item["id"],
+            item["name"],
+            item["artists"][0]["name"],
+            album["name"],
+            album["images"][0]["url"] if album["images"] else None,
+            item.get("preview_url"),
+            item["external_urls"]["spotify"],
+            item["duration_ms"]
+        )
+
+    def as_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "artist": self.artist,
+            "album": self.album,
+            "image": self.image,
+            "preview_url": self.preview_url,
+            "spotify_url": self.spotify_url,
+            "duration_ms": self.duration_ms
+        }
+
+
+def share_playlist(result: tuple) -> tuple:
+    """
+    SingleFlight clone for (query, songs, ...) results: each caller gets its
+    own list, the read-only Track objects are shared instead of deep-copied,
+    and anything after the songs (e.g. StageTimings) is shallow-copied.
+    """
+    return (result[0], list(result[1])) + tuple(copy.copy(extra) for extra in result[2:])
@@ -0,0 +1,290 @@
+"""
+Local Track Catalog
+Compact NumPy-backed store of tracks and their audio features, plus a
+nearest-neighbour index from mood settings to tracks, so playlists can be
+answered without a live Spotify search
+
+    python track_catalog.py ingest tracks.jsonl --out catalog/
+    python track_catalog.py query catalog/ --mind-speed racing --lyrics no --count 10
+"""
+
+import argparse
+import json
+import os
+import sys
+from itertools import product
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from mood_scoring import FEATURES, feature_vector, mood_profile
+from query_table import MIND_SPEEDS, LYRICS, CONTEXTS, DISTRACTIONS
+from track import Track
+
+# Release years per era filter
+ERA_YEARS = {
+    "90s": (1990, 1999),
+    "2000s": (2000, 2009),
+    "2010s": (2010, 2019),
+    "latest": (2023, 9999)
+}
+
+# Nearest tracks kept per mood combination
+INDEX_DEPTH = int(os.getenv("CATALOG_INDEX_DEPTH", "2000"))
+# Weighted squared distance beyond which a track no longer counts as a match
+MAX_DISTANCE = float(os.getenv("CATALOG_MAX_DISTANCE", "0.15"))
+
+
+# ---------- MOOD AXES ----------
+def canonical_mood(mind_speed: str, lyrics: str, context: str, distraction: str) -> tuple:
+    """Map free-form axis values onto the ones the index knows"""
+    return (
+        mind_speed if mind_speed in MIND_SPEEDS else "normal",
+        lyrics if lyrics in LYRICS else "sometimes",
+        context if context in CONTEXTS else "alone",
+        distraction if distraction in DISTRACTIONS else "medium"
+    )
+
+
+# ---------- CATALOG ----------
+class TrackCatalog:
+    """
+    Struct-of-arrays track store:
+    ids (N,), features (N, 5) float32, years (N,) int16, and byte offsets
+    into tracks.jsonl so only the tracks we return are ever parsed.
+    """
+
+    def __init__(self, path: str, ids: np.ndarray, features: np.ndarray,
+                 years: np.ndarray, offsets: np.ndarray):
+        self.path = path
+        self.ids = ids
+        self.features = features
+        self.years = years
+        self.offsets = offsets
+        self._meta_file = None
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "TrackCatalog":
+        mode = "r" if mmap else None
+        return cls(
+            path,
+            np.load(os.path.join(path, "ids.npy"), mmap_mode=mode),
+            np.load(os.path.join(path, "features.npy"), mmap_mode=mode),
+            np.load(os.path.join(path, "years.npy"), mmap_mode=mode),
+            np.load(os.path.join(path, "offsets.npy"), mmap_mode=mode)
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def tracks(self, indices) -> List[Track]:
+        """Tracks for the given rows"""
+        if self._meta_file is None:
+            self._meta_file = open(os.path.join(self.path, "tracks.jsonl"), "rb")
+        songs = []
+        for index in indices:
+            self._meta_file.seek(int(self.offsets[index]))
+            songs.append(Track(**json.loads(self._meta_file.readline())))
+        return songs
+
+    def nearest(self, target: np.ndarray, weights: np.ndarray, k: int, mask: np.ndarray = None):
+        """Brute-force weighted nearest neighbours; returns (indices, distances) sorted by distance"""
+        distances = np.square(self.features - target) @ weights
+        if mask is not None:
+            distances = np.where(mask, distances, np.inf)
+
+        k = min(k, len(distances))
+        if k == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top])]
+        keep = np.isfinite(distances[top])
+        return top[keep], distances[top][keep]
+
+
+class MoodIndex:
+    """
+    Nearest tracks for every mood combination.
+    The mood space is finite (54 combinations), so each one is computed
+    once (lazily, or all at once with warm()) and lookups are a dict access.
+    """
+
+    def __init__(self, catalog: TrackCatalog, depth: int = INDEX_DEPTH, max_distance: float = MAX_DISTANCE):
+        self.catalog = catalog
+        self.depth = depth
+        self.max_distance = max_distance
+        self._entries: Dict[tuple, tuple] = {}
+
+        self.hits = 0
+        self.fallbacks = 0
+
+    def warm(self):
+        for mood in product(MIND_SPEEDS, LYRICS, CONTEXTS, DISTRACTIONS):
+            self._entry(mood)
+
+    def _entry(self, mood: tuple) -> tuple:
+        entry = self._entries.get(mood)
+        if entry is None:
+            target, weights = mood_profile(*mood)
+            indices, distances = self.catalog.nearest(target, weights, self.depth)
+            close = distances <= self.max_distance
+            entry = (indices[close], distances[close])
+            self._entries[mood] = entry
+        return entry
+
+    def match(self, mind_speed: str, lyrics: str, context: str, distraction: str,
+              count: int, era: str = "any") -> Optional[List[Track]]:
+        """
+        Closest `count` tracks for the mood, or None when the catalog does not
+        cover it well enough and the caller should search Spotify instead.
+        """
+        indices, _ = self._entry(canonical_mood(mind_speed, lyrics, context, distraction))
+
+        if era in ERA_YEARS:
+            start, end = ERA_YEARS[era]
+            years = self.catalog.years[indices]
+            indices = indices[(years >= start) & (years <= end)]
+
+        if len(indices) < count:
+            self.fallbacks += 1
+            return None
+
+        self.hits += 1
+        return self.catalog.tracks(indices[:count])
+
+    def stats(self) -> dict:
+        return {
+            "tracks": len(self.catalog),
+            "moods_indexed": len(self._entries),
+            "hits": self.hits,
+            "fallbacks": self.fallbacks
+        }
+
+
+# ---------- INGEST ----------
+class CatalogWriter:
+    """Streams tracks into a catalog directory"""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._meta = open(os.path.join(path, "tracks.jsonl"), "wb")
+        self._ids = []
+        self._features = []
+        self._years = []
+        self._offsets = []
+        self._seen = set()
+
+    def add(self, song: Track, features: dict, year: int = 0) -> bool:
+        """Add one track; duplicates are skipped"""
+        if song.id in self._seen:
+            return False
+        self._seen.add(song.id)
+
+        self._offsets.append(self._meta.tell())
+        self._meta.write(json.dumps(song.as_dict(), separators=(",", ":")).encode() + b"\n")
+        self._ids.append(song.id)
+        self._features.append(feature_vector(features))
+        self._years.append(year)
+        return True
+
+    def close(self) -> int:
+        self._meta.close()
+        np.save(os.path.join(self.path, "ids.npy"), np.array(self._ids, dtype="U22"))
+        np.save(os.path.join(self.path, "features.npy"), np.array(self._features, dtype=np.float32).reshape(-1, len(FEATURES)))
+        np.save(os.path.join(self.path, "years.npy"), np.array(self._years, dtype=np.int16))
+        np.save(os.path.join(self.path, "offsets.npy"), np.array(self._offsets, dtype=np.int64))
+        return len(self._ids)
+
+
+def release_year(track: dict) -> int:
+    date = (track.get("album") or {}).get("release_date") or ""
+    return int(date[:4]) if date[:4].isdigit() else 0
+
+
+def ingest(paths: List[str], out: str) -> dict:
+    """
+    Build a catalog from JSON-lines files of Spotify track objects.
+    Each line is a track, optionally with an "audio_features" object;
+    tracks without one are looked up in the local feature store.
+    """
+    from feature_store import feature_store
+    from spotify_api import format_track
+
+    writer = CatalogWriter(out)
+    counts = {"read": 0, "added": 0, "no_features": 0}
+
+    def flush(pending):
+        stored = feature_store.get_many(t["id"] for t in pending)
+        for track in pending:
+            features = stored.get(track["id"])
+            if not features:
+                counts["no_features"] += 1
+                continue
+            if writer.add(format_track(track), features, release_year(track)):
+                counts["added"] += 1
+
+    pending = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                track = json.loads(line)
+                counts["read"] += 1
+                features = track.pop("audio_features", None)
+                if features:
+                    if writer.add(format_track(track), features, release_year(track)):
+                        counts["added"] += 1
+                else:
+                    pending.append(track)
+                    if len(pending) >= 500:
+                        flush(pending)
+                        pending = []
+    flush(pending)
+
+    writer.close()
+    return counts
+
+
+def load_index(path: str) -> MoodIndex:
+    return MoodIndex(TrackCatalog.load(path))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local track catalog")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest_cmd = commands.add_parser("ingest", help="build a catalog from JSON-lines track dumps")
+    ingest_cmd.add_argument("inputs", nargs="+")
+    ingest_cmd.add_argument("--out", required=True)
+
+    query_cmd = commands.add_parser("query", help="look up tracks for a mood")
+    query_cmd.add_argument("catalog")
+    query_cmd.add_argument("--mind-speed", default="normal")
+    query_cmd.add_argument("--lyrics", default="sometimes")
+    query_cmd.add_argument("--context", default="alone")
+    query_cmd.add_argument("--distraction", default="medium")
+    query_cmd.add_argument("--era", default="any")
+    query_cmd.add_argument("--count", type=int, default=5)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "ingest":
+        counts = ingest(args.inputs, args.out)
+        print(f"Read {counts['read']} tracks, added {counts['added']}, "
+              f"skipped {counts['no_features']} without audio features -> {args.out}")
+        return 0
+
+    index = load_index(args.catalog)
+    songs = index.match(args.mind_speed, args.lyrics, args.context, args.distraction, args.count, args.era)
+    if songs is None:
+        print("Catalog coverage too thin for this mood (would fall back to Spotify search)")
+        return 1
+    for i, song in enumerate(songs, start=1):
+        print(f"{i}. {song.name} — {song.artist}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
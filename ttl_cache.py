@@ -0,0 +1,180 @@
+"""
+TTL + LRU Cache
+In-memory cache with expiry, an entry/byte bound, optional
+stale-while-revalidate and single-flight loading for async callers
+"""
+
+import asyncio
+import sys
+import time
+from collections import OrderedDict
+
+
+def approx_size(value) -> int:
+    """Rough deep size in bytes of JSON-like data (dicts, lists, strings, numbers)"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for k, v in value.items():
+            size += approx_size(k) + approx_size(v)
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            size += approx_size(v)
+    elif hasattr(value, "__slots__"):
+        for name in value.__slots__:
+            size += approx_size(getattr(value, name, None))
+    return size
+
+
+class TTLCache:
+    """
+    LRU cache whose entries expire after `ttl` seconds.
+    Expired entries younger than `ttl + stale_ttl` are still served while a
+    background reload replaces them (stale-while-revalidate).
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 600, stale_ttl: float = 0,
+                 max_bytes: int = None, sizeof=approx_size):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+
+        self._data = OrderedDict()   # key -> (value, stored_at, size)
+        self._inflight = {}          # key -> asyncio.Task
+        self._bytes = 0
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load_errors = 0
+
+    # ---------- BASIC OPERATIONS ----------
+    def lookup(self, key):
+        """Return (value, state) where state is "fresh", "stale" or None"""
+        entry = self._data.get(key)
+        if entry is None:
+            return None, None
+
+        value, stored_at, _ = entry
+        age = time.monotonic() - stored_at
+        if age < self.ttl:
+            self._data.move_to_end(key)
+            return value, "fresh"
+        if age < self.ttl + self.stale_ttl:
+            self._data.move_to_end(key)
+            return value, "stale"
+
+        self._remove(key)
+        return None, None
+
+    def get(self, key, default=None):
+        value, state = self.lookup(key)
+        if state == "fresh":
+            self.hits += 1
+            return value
+        self.misses += 1
+        return default
+
+    def set(self, key, value):
+        size = self.sizeof(value) if self.max_bytes else 0
+        if self.max_bytes and size > self.max_bytes:
+            return
+        if key in self._data:
+            self._remove(key)
+
+        self._data[key] = (value, time.monotonic(), size)
+        self._bytes += size
+        self._evict()
+
+    def expires_in(self, key):
+        """Seconds until key stops being fresh (negative once stale), None if absent"""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        return self.ttl - (time.monotonic() - entry[1])
+
+    def clear(self):
+        self._data.clear()
+        self._bytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.lookup(key)[1] is not None
+
+    # ---------- ASYNC LOADING ----------
+    async def get_or_load(self, key, loader):
+        """
+        Return the cached value for key, or await loader() to produce it.
+        Concurrent misses for the same key share one load; a stale hit is
+        returned immediately and reloaded in the background.
+        """
+        value, state = self.lookup(key)
+        if state == "fresh":
+            self.hits += 1
+            return value
+        if state == "stale":
+            self.stale_hits += 1
+            self._start_load(key, loader, background=True)
+            return value
+
+        self.misses += 1
+        return await asyncio.shield(self._start_load(key, loader))
+
+    async def refresh(self, key, loader):
+        """Reload key now (shared with any load in flight); on failure the current value is kept"""
+        return await asyncio.shield(self._start_load(key, loader, background=True))
+
+    def _start_load(self, key, loader, background: bool = False) -> asyncio.Task:
+        loop = asyncio.get_running_loop()
+        task = self._inflight.get(key)
+        if task is None or task.done() or task.get_loop() is not loop:
+            task = loop.create_task(self._load(key, loader, background))
+            self._inflight[key] = task
+        return task
+
+    async def _load(self, key, loader, background: bool):
+        try:
+            value = await loader()
+        except Exception:
+            self.load_errors += 1
+            if background:
+                # Keep serving the stale value until it ages out
+                return None
+            raise
+        finally:
+            if self._inflight.get(key) is asyncio.current_task():
+                del self._inflight[key]
+
+        self.set(key, value)
+        return value
+
+    # ---------- INTERNALS ----------
+    def _remove(self, key):
+        _, _, size = self._data.pop(key)
+        self._bytes -= size
+
+    def _evict(self):
+        while len(self._data) > self.maxsize or (self.max_bytes and self._bytes > self.max_bytes):
+            _, (_, _, size) = self._data.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        """Counters for sizing the cache"""
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._data),
+            "max_entries": self.maxsize,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "load_errors": self.load_errors,
+            "hit_ratio": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0
+        }
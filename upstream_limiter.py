@@ -0,0 +1,253 @@
+"""
+Upstream Limiter
+One token bucket and one concurrency limit shared by every async Spotify
+call in the process. Waiters are served by priority lane (interactive
+requests before batch and background work), the rate backs off on 429
+and recovers on success, and callers that would wait too long get a fast
+503 instead of an unbounded queue.
+"""
+
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from fastapi import HTTPException
+
+from metrics import registry
+
+# Sustained Spotify calls per second (the ceiling the adaptive rate recovers to)
+RATE_LIMIT = float(os.getenv("SPOTIFY_RATE_LIMIT", "50"))
+# Calls allowed back to back after an idle period
+BURST = int(os.getenv("SPOTIFY_BURST", str(max(1, int(RATE_LIMIT)))))
+# Lowest rate the limiter backs off to after repeated 429s
+MIN_RATE = float(os.getenv("SPOTIFY_MIN_RATE", "1"))
+# Spotify calls in flight at once
+MAX_CONCURRENCY = int(os.getenv("SPOTIFY_MAX_CONCURRENCY", os.getenv("SPOTIFY_POOL_SIZE", "20")))
+# Slots batch/background lanes may never take, kept free for interactive requests
+INTERACTIVE_RESERVE = int(os.getenv("SPOTIFY_INTERACTIVE_RESERVE", str(MAX_CONCURRENCY // 4)))
+# Callers waiting for a slot before new ones are shed
+MAX_QUEUE = int(os.getenv("SPOTIFY_MAX_QUEUE", "200"))
+# Longest a caller waits for a slot before getting a 503
+QUEUE_TIMEOUT = float(os.getenv("SPOTIFY_QUEUE_TIMEOUT", "3"))
+
+# Served in this order; a lane only gets a slot when every lane before it is empty
+LANES = ("interactive", "batch", "background")
+# Share of the ceiling added back to the rate per successful call
+RECOVERY = 0.02
+
+_lane: ContextVar[str] = ContextVar("upstream_lane", default="interactive")
+
+
+class UpstreamOverloaded(HTTPException):
+    """Raised instead of queueing when Spotify capacity is exhausted (503 + Retry-After)"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(
+            status_code=503,
+            detail="Spotify is busy right now, please try again shortly",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+        )
+
+
+@contextmanager
+def lane(name: str):
+    """Run the enclosed Spotify calls (and tasks started inside) in a priority lane"""
+    if name not in LANES:
+        raise ValueError(f"Unknown lane: {name}")
+    token = _lane.set(name)
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+
+def current_lane() -> str:
+    return _lane.get()
+
+
+class UpstreamLimiter:
+    """
+    Token bucket + concurrency limit with lane-ordered FIFO queues.
+    Runs on one event loop; state is reset if a different loop starts using it.
+    """
+
+    def __init__(self, rate: float = RATE_LIMIT, burst: int = BURST, min_rate: float = MIN_RATE,
+                 max_concurrency: int = MAX_CONCURRENCY, reserve: int = INTERACTIVE_RESERVE,
+                 max_queue: int = MAX_QUEUE, queue_timeout: float = QUEUE_TIMEOUT):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.reserve = min(reserve, max_concurrency - 1)
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.active = 0
+        self._waiters = {name: deque() for name in LANES}
+        self._timer = None
+        self._loop = None
+
+        self.granted = 0
+        self.queued_total = 0
+        self.throttled = 0
+        self.shed = {name: 0 for name in LANES}
+
+    # ---------- ACQUIRE / RELEASE ----------
+    async def acquire(self, lane_name: str = None):
+        """Wait for a token and a slot; raises UpstreamOverloaded instead of waiting too long"""
+        lane_name = lane_name or _lane.get()
+        self._bind()
+        now = time.monotonic()
+        self._refill(now)
+
+        # FIFO within a lane and strict priority across lanes: never overtake a waiter
+        ahead = any(self._waiters[name] for name in LANES[:LANES.index(lane_name) + 1])
+        if not ahead and self._can_grant(lane_name, now):
+            self._grant()
+            return
+
+        paused_for = self.paused_until - now
+        if paused_for > self.queue_timeout or self.queued() >= self.max_queue:
+            self.shed[lane_name] += 1
+            raise UpstreamOverloaded(max(paused_for, self.queue_timeout))
+
+        future = self._loop.create_future()
+        self._waiters[lane_name].append(future)
+        self.queued_total += 1
+        self._schedule(now)
+        try:
+            await asyncio.wait((future,), timeout=self.queue_timeout)
+        except asyncio.CancelledError:
+            self._abandon(lane_name, future)
+            raise
+        if not future.done():
+            self._abandon(lane_name, future)
+            self.shed[lane_name] += 1
+            raise UpstreamOverloaded(self.queue_timeout)
+
+    def release(self):
+        self.active = max(0, self.active - 1)
+        self._dispatch()
+
+    def record(self, status: int, retry_after: float = None):
+        """Adapt to Spotify's answer: halve the rate and pause on 429, creep back up on success"""
+        now = time.monotonic()
+        if status == 429:
+            self.throttled += 1
+            # Calls already in flight when the first 429 arrived back off only once
+            if now >= self.paused_until:
+                self.rate = max(self.min_rate, self.rate / 2)
+            self._refill(now)
+            self.tokens = 0.0
+            self.paused_until = max(self.paused_until, now + (retry_after if retry_after is not None else 1 / self.rate))
+        elif status < 500 and self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * RECOVERY)
+
+    # ---------- INTERNALS ----------
+    def _bind(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Waiters and slots of another (finished) loop can never be released
+            self._loop = loop
+            self.active = 0
+            self._timer = None
+            for queue in self._waiters.values():
+                queue.clear()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _can_grant(self, lane_name: str, now: float) -> bool:
+        limit = self.max_concurrency if lane_name == "interactive" else self.max_concurrency - self.reserve
+        return now >= self.paused_until and self.tokens >= 1.0 and self.active < limit
+
+    def _grant(self):
+        self.tokens -= 1.0
+        self.active += 1
+        self.granted += 1
+
+    def _abandon(self, lane_name: str, future: asyncio.Future):
+        if future.done() and not future.cancelled():
+            # Granted just as the caller gave up: hand the slot on
+            self.release()
+            return
+        future.cancel()
+        try:
+            self._waiters[lane_name].remove(future)
+        except ValueError:
+            pass
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._loop is None:
+            return
+        now = time.monotonic()
+        self._refill(now)
+        for name in LANES:
+            queue = self._waiters[name]
+            while queue and (queue[0].done() or self._can_grant(name, now)):
+                future = queue.popleft()
+                if not future.done():
+                    self._grant()
+                    future.set_result(None)
+            if queue:
+                break
+        self._schedule(now)
+
+    def _schedule(self, now: float):
+        """Wake up when the next token arrives or a pause ends (release() covers slots)"""
+        if self._timer is not None or not self.queued():
+            return
+        delay = max(self.paused_until - now, (1.0 - self.tokens) / self.rate)
+        if delay > 0:
+            self._timer = self._loop.call_later(delay, self._dispatch)
+
+    def queued(self) -> int:
+        return sum(len(queue) for queue in self._waiters.values())
+
+    def stats(self) -> dict:
+        return {
+            "rate": round(self.rate, 2),
+            "max_rate": self.max_rate,
+            "active": self.active,
+            "max_concurrency": self.max_concurrency,
+            "queued": {name: len(queue) for name, queue in self._waiters.items()},
+            "granted": self.granted,
+            "queued_total": self.queued_total,
+            "throttled": self.throttled,
+            "shed": dict(self.shed),
+            "paused_for": round(max(0.0, self.paused_until - time.monotonic()), 3)
+        }
+
+
+# Shared by every async Spotify call (see spotify_http.arequest)
+upstream_limiter = UpstreamLimiter()
+
+
+def _collect() -> list:
+    stats = upstream_limiter.stats()
+    samples = [
+        ("spotify_limiter_rate", "gauge", "Current adaptive Spotify call rate (per second)", {}, stats["rate"]),
+        ("spotify_limiter_active", "gauge", "Spotify calls holding a concurrency slot", {}, stats["active"]),
+        ("spotify_limiter_throttled_total", "counter", "429 answers fed back to the limiter", {}, stats["throttled"])
+    ]
+    for name in LANES:
+        samples.append(("spotify_limiter_queued", "gauge", "Callers waiting for a Spotify slot",
+                        {"lane": name}, stats["queued"][name]))
+        samples.append(("spotify_limiter_shed_total", "counter", "Calls rejected with 503 instead of queueing",
+                        {"lane": name}, stats["shed"][name]))
+    return samples
+
+
+registry.collector("upstream_limiter", _collect)